@@ -0,0 +1,255 @@
+from collections import deque
+from Utils import dictionary
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+_MISSING = object()
+
+
+class LazyField:
+    """Column accessor that decrypts on first read and remembers the result."""
+
+    __slots__ = ("index", "encrypted", "code")
+
+    def __init__(self, index: int, encrypted: bool, code: int = None):
+        self.index = index
+        self.encrypted = encrypted
+        # position of the dictionary code column, if the column has one
+        self.code = code
+
+    def __get__(self, row, owner=None):
+        if row is None:
+            return self
+        if self.code is not None and row._raw[self.code] is not None:
+            value = dictionary.decode(row._raw[self.code])
+            if value is not None:
+                return value
+        raw = row._raw[self.index]
+        if not self.encrypted:
+            return raw
+
+        value = row._plain[self.index]
+        if value is _MISSING and row.is_sealed():
+            row.open_envelope()
+            value = row._plain[self.index]
+        if value is _MISSING:
+            if raw is None:
+                return raw
+            try:
+                value = encryptor.decrypt_text(raw)
+            except Exception:
+                # fallback for unencrypted data
+                value = raw
+            row._plain[self.index] = value
+        return value
+
+
+class LazyRow:
+    """
+    Wraps a database row and decrypts each encrypted column only when it is
+    read. Subclasses list their COLUMNS in SELECT order and which of them
+    are ENCRYPTED; every column becomes an attribute. Tables with a "sealed"
+    column may store all ENCRYPTED values in one envelope instead (see
+    Utils.rowEnvelope); it is opened on the first read of any of them.
+    Columns in CODES are read from their dictionary code when the row has
+    one (see Utils.dictionary).
+    """
+
+    __slots__ = ("_raw", "_plain")
+
+    TABLE = ""
+    COLUMNS = ()
+    ENCRYPTED = ()
+    CODES = {}  # column -> its dictionary code column
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for i, name in enumerate(cls.COLUMNS):
+            code = cls.CODES.get(name)
+            setattr(
+                cls,
+                name,
+                LazyField(
+                    i,
+                    name in cls.ENCRYPTED,
+                    cls.COLUMNS.index(code) if code else None,
+                ),
+            )
+        cls._encrypted_positions = [cls.COLUMNS.index(n) for n in cls.ENCRYPTED]
+        cls._sealed_position = (
+            cls.COLUMNS.index("sealed") if "sealed" in cls.COLUMNS else None
+        )
+
+    def __init__(self, raw: tuple):
+        self._raw = raw
+        self._plain = [_MISSING] * len(raw)
+
+    def __getitem__(self, index: int):
+        return getattr(self, self.COLUMNS[index])
+
+    def __len__(self):
+        return len(self.COLUMNS)
+
+    def is_sealed(self) -> bool:
+        return (
+            self._sealed_position is not None
+            and self._raw[self._sealed_position] is not None
+        )
+
+    def open_envelope(self):
+        try:
+            values = encryptor.open_record(
+                self._raw[self._sealed_position], f"{self.TABLE}:{self._raw[0]}"
+            )
+        except Exception:
+            # fallback to the raw (empty) columns if the envelope is damaged
+            values = [self._raw[i] for i in self._encrypted_positions]
+        for i, value in zip(self._encrypted_positions, values):
+            self._plain[i] = value
+
+    def encrypted_values(self) -> dict:
+        return {name: getattr(self, name) for name in self.ENCRYPTED}
+
+    def upgraded_columns(self) -> dict:
+        """
+        Fresh tokens for the encrypted columns still stored by an older
+        cipher backend, for write paths to include in their UPDATE.
+        """
+        return {
+            name: encryptor.encrypt_value(getattr(self, name))
+            for name, i in zip(self.ENCRYPTED, self._encrypted_positions)
+            if self._raw[i] is not None and encryptor.needs_upgrade(self._raw[i])
+        }
+
+    @classmethod
+    def select_sql(cls) -> str:
+        return f"SELECT {', '.join(cls.COLUMNS)} FROM {cls.TABLE}"
+
+    @classmethod
+    def plain_sql(cls, name: str) -> str:
+        """
+        SQL expression for the plaintext of a column, using the functions
+        of db.functions, so filters on it can run inside SQLite.
+        """
+        if name not in cls.ENCRYPTED:
+            return name
+        if cls._sealed_position is None:
+            expression = f"decrypt({name})"
+        else:
+            position = cls.ENCRYPTED.index(name)
+            expression = (
+                f"CASE WHEN sealed IS NULL THEN decrypt({name}) "
+                f"ELSE open_field(sealed, '{cls.TABLE}:' || id, {position}) END"
+            )
+        if name in cls.CODES:
+            # Filters on the value itself are better written on the code
+            expression = f"COALESCE(dictionary_value({cls.CODES[name]}), {expression})"
+        return expression
+
+    @classmethod
+    def wrap_all(cls, raw_rows, prefetch=()):
+        """
+        Wrap raw rows, yielding them in order. Columns named in `prefetch` are
+        bulk-decrypted up front (in parallel for large inputs); everything
+        else stays lazy.
+        """
+        # Coded columns are decoded from the dictionary cache instead
+        positions = [
+            cls.COLUMNS.index(name) for name in prefetch if name not in cls.CODES
+        ]
+        if not positions:
+            for raw in raw_rows:
+                yield cls(raw)
+            return
+
+        # Rows are wrapped as the decryption pulls them in and handed out in
+        # the same order, so a streamed input is never held whole
+        pending = deque()
+        blank = (None,) * len(cls.COLUMNS)
+
+        def unsealed():
+            for raw in raw_rows:
+                row = cls(raw)
+                pending.append(row)
+                # Sealed rows are opened whole instead of decrypted column
+                # by column
+                yield blank if row.is_sealed() else raw
+
+        for decrypted in encryptor.decrypt_rows(unsealed(), positions):
+            row = pending.popleft()
+            if row.is_sealed():
+                row.open_envelope()
+                yield row
+                continue
+            raw = row._raw
+            for i in positions:
+                if raw[i] is not None:
+                    row._plain[i] = decrypted[i]
+            yield row
+
+
+class ScooterRow(LazyRow):
+    __slots__ = ()
+
+    TABLE = "scooters"
+    COLUMNS = (
+        "id",
+        "brand",
+        "model",
+        "serial_number",
+        "top_speed",
+        "battery_capacity",
+        "soc",
+        "target_range_min",
+        "target_range_max",
+        "latitude",
+        "longitude",
+        "out_of_service",
+        "mileage",
+        "last_maintenance",
+        "in_service_date",
+        "brand_code",
+    )
+    ENCRYPTED = (
+        "brand",
+        "model",
+        "serial_number",
+        "last_maintenance",
+        "in_service_date",
+    )
+    CODES = dictionary.CODED_COLUMNS["scooters"]
+
+
+class TravellerRow(LazyRow):
+    __slots__ = ()
+
+    TABLE = "travellers"
+    COLUMNS = (
+        "id",
+        "first_name",
+        "last_name",
+        "birthday",
+        "gender",
+        "street_name",
+        "house_number",
+        "zip_code",
+        "city",
+        "email",
+        "mobile_phone",
+        "driving_license_number",
+        "sealed",
+        "gender_code",
+        "city_code",
+    )
+    ENCRYPTED = COLUMNS[1:12]
+    CODES = dictionary.CODED_COLUMNS["travellers"]
+
+
+class UserRow(LazyRow):
+    __slots__ = ()
+
+    TABLE = "users"
+    COLUMNS = ("id", "username", "password_hash", "role", "role_code")
+    ENCRYPTED = ("username", "role")
+    CODES = dictionary.CODED_COLUMNS["users"]
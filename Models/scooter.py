@@ -1,7 +1,14 @@
 from datetime import datetime
 import re
-from db.database import get_connection
+from db.database import get_read_connection, stream_rows, transaction
+from db.pagination import browse_table
+from db.repositories import ScooterRepository
+from Utils import dictionary, fleetAnalytics, swapPlanner
 from Utils.encryption import Encryptor
+from Utils.fleetIndex import fleet
+from Utils.geoIndex import find_nearest
+from Utils.searchIndex import candidate_subquery, index_row, remove_row
+from Models.rows import ScooterRow
 
 encryptor = Encryptor()
 
@@ -86,43 +93,34 @@ class Scooter:
         self.inServiceDate = inServiceDate
 
     def add_to_db(self):
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-            INSERT INTO scooters (
-                brand, model, serial_number, top_speed, battery_capacity,
-                soc, target_range_min, target_range_max,
-                latitude, longitude, out_of_service,
-                mileage, last_maintenance, in_service_date
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    encryptor.encrypt_text(self.brand).decode(),
-                    encryptor.encrypt_text(self.model).decode(),
-                    encryptor.encrypt_text(self.serialNumber).decode(),
-                    self.topSpeed,
-                    self.batteryCapacity,
-                    self.SoC,
-                    self.targetRangeSoC[0],
-                    self.targetRangeSoC[1],
-                    self.location[0],
-                    self.location[1],
-                    int(self.outOfService),  # Store boolean as 0/1
-                    self.mileage,
-                    encryptor.encrypt_text(self.lastMaintenanceDate).decode(),
-                    encryptor.encrypt_text(self.inServiceDate).decode(),
-                ),
-            )
-        conn.commit()
+        ScooterRepository().add(
+            {
+                "brand": self.brand,
+                "model": self.model,
+                "serial_number": self.serialNumber,
+                "top_speed": self.topSpeed,
+                "battery_capacity": self.batteryCapacity,
+                "soc": self.SoC,
+                "target_range_min": self.targetRangeSoC[0],
+                "target_range_max": self.targetRangeSoC[1],
+                "latitude": self.location[0],
+                "longitude": self.location[1],
+                "out_of_service": int(self.outOfService),  # Store boolean as 0/1
+                "mileage": self.mileage,
+                "last_maintenance": self.lastMaintenanceDate,
+                "in_service_date": self.inServiceDate,
+            }
+        )
         print("[SUCCESS] Scooter added to database.")
 
-    def get_all_scooters():
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM scooters")
-            scooters = cursor.fetchall()
-            return scooters
+    @staticmethod
+    def list_scooters():
+        def show_page(rows):
+            for s in ScooterRow.wrap_all(rows, prefetch=ScooterRow.ENCRYPTED):
+                Scooter.print_info(s)
+
+        if not browse_table(ScooterRow.select_sql(), show_page):
+            print("[INFO] No scooters found.")
 
     @staticmethod
     def add_scooter():
@@ -310,11 +308,14 @@ class Scooter:
         print("=== Delete Scooter ===")
         scooter_id = input("Enter scooter ID to delete: ").strip()
 
-        with get_connection() as conn:
+        with transaction(immediate=True) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM scooters WHERE id = ?", (scooter_id,))
-            conn.commit()
-            print("[SUCCESS] Scooter deleted.")
+            deleted = cursor.rowcount
+            remove_row(cursor, "scooters", scooter_id)
+        if deleted:
+            fleet.remove(int(scooter_id))
+        print("[SUCCESS] Scooter deleted.")
 
     @staticmethod
     def update_scooter():
@@ -422,51 +423,54 @@ class Scooter:
         if field_choice == "out_of_service":
             new_value = 1 if new_value.lower() == "true" else 0
 
-        if field.get("encrypted"):
-            new_value = encryptor.encrypt_text(str(new_value)).decode()
+        plain_value = str(new_value)
+        coded = field_choice in ScooterRow.CODES
+        if field.get("encrypted") and not coded:
+            new_value = encryptor.encrypt_value(plain_value)
 
-        with get_connection() as conn:
+        with transaction(immediate=True) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                f"UPDATE scooters SET {field_choice} = ? WHERE id = ?",
-                (new_value, scooter_id),
-            )
-            conn.commit()
-            print(f"[SUCCESS] Scooter's {field_choice} updated.")
+            cursor.execute(f"{ScooterRow.select_sql()} WHERE id = ?", (scooter_id,))
+            raw = cursor.fetchone()
+            if raw:
+                # Encrypted columns still written by an older cipher backend
+                # are upgraded along with the changed field
+                columns = ScooterRow(raw).upgraded_columns()
+                if coded:
+                    columns.update(
+                        dictionary.encode_values(
+                            cursor, "scooters", {field_choice: plain_value}
+                        )
+                    )
+                else:
+                    columns[field_choice] = new_value
+                assignments = ", ".join(f"{name} = ?" for name in columns)
+                cursor.execute(
+                    f"UPDATE scooters SET {assignments} WHERE id = ?",
+                    (*columns.values(), scooter_id),
+                )
+                index_row(cursor, "scooters", scooter_id, {field_choice: plain_value})
+        if raw:
+            fleet.upsert(int(scooter_id), {field_choice: new_value})
+        print(f"[SUCCESS] Scooter's {field_choice} updated.")
 
     @staticmethod
-    def print_info(scooter_data: tuple):
-        encrypted_indices = [
-            1,
-            2,
-            3,
-            13,
-            14,
-        ]  # brand, model, serial_number, last_maintenance, in_service_date
-        decrypted_data = list(scooter_data)
-
-        for i in encrypted_indices:
-            value = scooter_data[i]
-            if value is not None:
-                try:
-                    decrypted_data[i] = encryptor.decrypt_text(value.encode())
-                except Exception:
-                    decrypted_data[i] = value
-
+    def print_info(scooter: ScooterRow):
+        # Each encrypted field is decrypted here, on first access
         print(
-            f"\nScooter ID: {decrypted_data[0]}"
-            f"\nBrand: {decrypted_data[1]}"
-            f"\nModel: {decrypted_data[2]}"
-            f"\nSerial Number: {decrypted_data[3]}"
-            f"\nTop Speed (km/h): {decrypted_data[4]}"
-            f"\nBattery Capacity (Wh): {decrypted_data[5]}"
-            f"\nState of Charge (%): {decrypted_data[6]}"
-            f"\nTarget Range SoC (%): {decrypted_data[7]} - {decrypted_data[8]}"
-            f"\nLocation (lat, long): {decrypted_data[9]}, {decrypted_data[10]}"
-            f"\nOut of Service: {'Yes' if decrypted_data[11] else 'No'}"
-            f"\nMileage (km): {decrypted_data[12]}"
-            f"\nLast Maintenance Date: {decrypted_data[13]}"
-            f"\nIn Service Date: {decrypted_data[14]}"
+            f"\nScooter ID: {scooter.id}"
+            f"\nBrand: {scooter.brand}"
+            f"\nModel: {scooter.model}"
+            f"\nSerial Number: {scooter.serial_number}"
+            f"\nTop Speed (km/h): {scooter.top_speed}"
+            f"\nBattery Capacity (Wh): {scooter.battery_capacity}"
+            f"\nState of Charge (%): {scooter.soc}"
+            f"\nTarget Range SoC (%): {scooter.target_range_min} - {scooter.target_range_max}"
+            f"\nLocation (lat, long): {scooter.latitude}, {scooter.longitude}"
+            f"\nOut of Service: {'Yes' if scooter.out_of_service else 'No'}"
+            f"\nMileage (km): {scooter.mileage}"
+            f"\nLast Maintenance Date: {scooter.last_maintenance}"
+            f"\nIn Service Date: {scooter.in_service_date}"
         )
 
     @staticmethod
@@ -476,7 +480,7 @@ class Scooter:
         print("2. By Brand or Model")
         choice = input("Choose option: ").strip()
 
-        with get_connection() as conn:
+        with get_read_connection() as conn:
             cursor = conn.cursor()
 
             if choice == "1":
@@ -484,39 +488,113 @@ class Scooter:
                 if not scooter_id.isdigit():
                     print("[ERROR] Scooter ID must be a number.")
                     return
-                cursor.execute("SELECT * FROM scooters WHERE id = ?", (scooter_id,))
-                results = cursor.fetchall()
+                cursor.execute(f"{ScooterRow.select_sql()} WHERE id = ?", (scooter_id,))
+                results = ScooterRow.wrap_all(cursor.fetchall())
 
             elif choice == "2":
                 term = input("Enter brand or model name: ").strip().lower()
 
-                # Fetch all scooters and decrypt in Python
-                cursor.execute("SELECT * FROM scooters")
-                all_scooters = cursor.fetchall()
-                results = []
+                # SQLite decrypts brand and model and filters on them
+                # itself, so only matches reach Python; the other fields are
+                # decrypted when a match gets printed
+                condition = (
+                    f"(text_contains({ScooterRow.plain_sql('brand')}, ?) "
+                    f"OR text_contains({ScooterRow.plain_sql('model')}, ?))"
+                )
+                params = [term, term]
 
-                for scooter in all_scooters:
-                    try:
-                        brand = encryptor.decrypt_text(scooter[1].encode()).lower()
-                        model = encryptor.decrypt_text(scooter[2].encode()).lower()
-                    except Exception:
-                        # fallback for unencrypted data
-                        brand = scooter[1].lower() if scooter[1] else ""
-                        model = scooter[2].lower() if scooter[2] else ""
+                # Narrow down to candidates through the token index first;
+                # terms too short for it scan the table
+                candidates = candidate_subquery("scooters", term)
+                if candidates:
+                    subquery, candidate_params = candidates
+                    condition = f"id IN ({subquery}) AND {condition}"
+                    params = [*candidate_params, *params]
 
-                    if term in brand or term in model:
-                        results.append(scooter)
+                cursor.execute(f"{ScooterRow.select_sql()} WHERE {condition}", params)
+                # Streamed: matches print while the rest is still being read
+                results = ScooterRow.wrap_all(stream_rows(cursor))
 
             else:
                 print("[ERROR] Invalid option.")
                 return
 
-            if results:
-                for scooter in results:
-                    Scooter.print_info(scooter)
-            else:
+            found = 0
+            for scooter in results:
+                Scooter.print_info(scooter)
+                found += 1
+            if not found:
                 print("[INFO] No scooters found.")
 
+    @staticmethod
+    def find_nearest_scooters():
+        print("=== Find Nearest Scooters ===")
+        coordinate = r"-?\d+(\.\d+)?"
+        latitude = get_valid_input(
+            "Latitude: ",
+            coordinate,
+            "Invalid latitude.",
+            validator=lambda v: (
+                float(v)
+                if -90 <= float(v) <= 90
+                else (_ for _ in ()).throw(
+                    ValueError("Latitude must be between -90 and 90.")
+                )
+            ),
+        )
+        if latitude is None:
+            return
+        longitude = get_valid_input(
+            "Longitude: ",
+            coordinate,
+            "Invalid longitude.",
+            validator=lambda v: (
+                float(v)
+                if -180 <= float(v) <= 180
+                else (_ for _ in ()).throw(
+                    ValueError("Longitude must be between -180 and 180.")
+                )
+            ),
+        )
+        if longitude is None:
+            return
+        radius = get_valid_input(
+            "Search radius in metres: ", r"\d+(\.\d+)?", "Invalid radius."
+        )
+        if radius is None:
+            return
+
+        nearest = find_nearest(latitude, longitude, max_radius=float(radius))
+        if not nearest:
+            print("[INFO] No scooters in service within that radius.")
+        for distance, scooter in nearest:
+            print(f"\n--- {distance:.0f} m away ---")
+            Scooter.print_info(scooter)
+
+    @staticmethod
+    def plan_battery_swaps():
+        print("=== Plan Battery Swaps ===")
+        max_stops = get_valid_input(
+            f"Maximum stops per crew (default {swapPlanner.MAX_STOPS}): ",
+            r"([1-9]\d*)?",
+            "Enter a positive whole number.",
+        )
+        if max_stops is None:
+            return
+        crews = get_valid_input(
+            "Number of crews (empty for all routes): ",
+            r"([1-9]\d*)?",
+            "Enter a positive whole number.",
+        )
+        if crews is None:
+            return
+
+        routes = swapPlanner.plan_routes(
+            int(max_stops) if max_stops else swapPlanner.MAX_STOPS,
+            int(crews) if crews else None,
+        )
+        swapPlanner.print_routes(routes)
+
 
 def get_valid_input(
     prompt, pattern=None, error_msg=None, validator=None, allow_back=True
@@ -545,7 +623,10 @@ def manage_scooter():
         print("3. Delete Scooter")
         print("4. Search Scooter")
         print("5. List All Scooters")
-        print("6. Exit")
+        print("6. Find Nearest Scooters")
+        print("7. Fleet Analytics")
+        print("8. Plan Battery Swaps")
+        print("9. Exit")
 
         choice = input("Select an option: ").strip()
 
@@ -562,14 +643,18 @@ def manage_scooter():
             Scooter.search_scooter()
 
         elif choice == "5":
-            scooters = Scooter.get_all_scooters()
-            if scooters:
-                for s in scooters:
-                    Scooter.print_info(s)
-            else:
-                print("[INFO] No scooters found.")
+            Scooter.list_scooters()
 
         elif choice == "6":
+            Scooter.find_nearest_scooters()
+
+        elif choice == "7":
+            fleetAnalytics.print_summary(fleetAnalytics.fleet_summary())
+
+        elif choice == "8":
+            Scooter.plan_battery_swaps()
+
+        elif choice == "9":
             print("Exiting...")
             break
 
@@ -1,8 +1,13 @@
 from datetime import datetime
 import re
-from db.database import get_connection
+from db.database import get_read_connection, stream_rows, transaction
+from db.pagination import browse_table
+from db.repositories import TravellerRepository
 from ui.terminal import clear_terminal
 from Utils.encryption import Encryptor
+from Utils.rowEnvelope import update_field
+from Utils.searchIndex import candidate_subquery, index_row, remove_row
+from Models.rows import TravellerRow
 
 encryptor = Encryptor()
 
@@ -58,31 +63,10 @@ class Traveller:
         self.driving_license_number = driving_license_number
 
     def add_to_db(self):
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO travellers (
-                    first_name, last_name, birthday, gender, street_name,
-                    house_number, zip_code, city, email, mobile_phone, driving_license_number
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    encryptor.encrypt_text(self.first_name).decode(),
-                    encryptor.encrypt_text(self.last_name).decode(),
-                    encryptor.encrypt_text(self.birthday).decode(),
-                    encryptor.encrypt_text(self.gender).decode(),
-                    encryptor.encrypt_text(self.street_name).decode(),
-                    encryptor.encrypt_text(self.house_number).decode(),
-                    encryptor.encrypt_text(self.zip_code).decode(),
-                    encryptor.encrypt_text(self.city).decode(),
-                    encryptor.encrypt_text(self.email).decode(),
-                    encryptor.encrypt_text(self.mobile_phone).decode(),
-                    encryptor.encrypt_text(self.driving_license_number).decode(),
-                ),
-            )
-            conn.commit()
-            print("[SUCCESS] Traveller added to database.")
+        TravellerRepository().add(
+            {name: getattr(self, name) for name in TravellerRow.ENCRYPTED}
+        )
+        print("[SUCCESS] Traveller added to database.")
 
     @staticmethod
     def update_traveller():
@@ -167,28 +151,25 @@ class Traveller:
         if new_value is None:
             return
 
-        if field.get("encrypted"):
-            new_value = encryptor.encrypt_text(new_value).decode()
-
-        with get_connection() as conn:
+        with transaction(immediate=True) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                f"UPDATE travellers SET {field_choice} = ? WHERE id = ?",
-                (new_value, traveller_id),
-            )
-            conn.commit()
-            print(f"[SUCCESS] Traveller's {field_choice} updated.")
+            # Handles both per-column tokens and sealed rows
+            if update_field(
+                cursor, "travellers", traveller_id, field_choice, new_value
+            ):
+                index_row(cursor, "travellers", traveller_id, {field_choice: new_value})
+        print(f"[SUCCESS] Traveller's {field_choice} updated.")
 
     @staticmethod
     def delete_traveller():
         print("=== Delete Traveller ===")
         traveller_id = input("Enter traveller ID to delete: ").strip()
 
-        with get_connection() as conn:
+        with transaction(immediate=True) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM travellers WHERE id = ?", (traveller_id,))
-            conn.commit()
-            print("[SUCCESS] Traveller deleted.")
+            remove_row(cursor, "travellers", traveller_id)
+        print("[SUCCESS] Traveller deleted.")
 
     @staticmethod
     def search_traveller():
@@ -197,74 +178,76 @@ class Traveller:
         print("2. By First or Last Name")
         choice = input("Choose option: ").strip()
 
-        with get_connection() as conn:
+        with get_read_connection() as conn:
             cursor = conn.cursor()
-            results = []
 
             if choice == "1":
                 traveller_id = input("Enter ID: ").strip()
-                cursor.execute("SELECT * FROM travellers WHERE id = ?", (traveller_id,))
-                results = cursor.fetchall()
+                cursor.execute(
+                    f"{TravellerRow.select_sql()} WHERE id = ?", (traveller_id,)
+                )
+                results = TravellerRow.wrap_all(cursor.fetchall())
 
             elif choice == "2":
                 term = input("Enter name to search: ").strip().lower()
-                cursor.execute("SELECT * FROM travellers")
-                all_travellers = cursor.fetchall()
-
-                for t in all_travellers:
-                    try:
-                        first_name = encryptor.decrypt_text(t[1].encode()).lower()
-                        last_name = encryptor.decrypt_text(t[2].encode()).lower()
-                    except Exception:
-                        first_name = t[1].lower() if t[1] else ""
-                        last_name = t[2].lower() if t[2] else ""
-
-                    if term in first_name or term in last_name:
-                        results.append(t)
+
+                # SQLite decrypts the names (or opens the envelope) and
+                # filters on them itself, so only matches reach Python
+                condition = (
+                    f"(text_contains({TravellerRow.plain_sql('first_name')}, ?) "
+                    f"OR text_contains({TravellerRow.plain_sql('last_name')}, ?))"
+                )
+                params = [term, term]
+
+                # Only the candidates found through the token index are
+                # checked; terms too short for it scan the table
+                candidates = candidate_subquery("travellers", term)
+                if candidates:
+                    subquery, candidate_params = candidates
+                    condition = f"id IN ({subquery}) AND {condition}"
+                    params = [*candidate_params, *params]
+
+                cursor.execute(f"{TravellerRow.select_sql()} WHERE {condition}", params)
+                # Streamed: matches print while the rest is still being read
+                results = TravellerRow.wrap_all(stream_rows(cursor))
             else:
                 print("[ERROR] Invalid option.")
                 return
 
-            if results:
-                for t in results:
-                    Traveller.print_info(t)
-            else:
+            found = 0
+            for t in results:
+                Traveller.print_info(t)
+                found += 1
+            if not found:
                 print("[INFO] No traveller found.")
 
     @staticmethod
-    def print_info(traveller_data: tuple):
-        encrypted_indices = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
-        decrypted_data = list(traveller_data)
-
-        for i in encrypted_indices:
-            value = traveller_data[i]
-            if value is not None:
-                try:
-                    decrypted_data[i] = encryptor.decrypt_text(value.encode())
-                except Exception:
-                    decrypted_data[i] = value
-
+    def print_info(traveller: TravellerRow):
+        # Each encrypted field is decrypted here, on first access
         print(
-            f"\nTraveller ID: {decrypted_data[0]}"
-            f"\nFirst Name: {decrypted_data[1]}"
-            f"\nLast Name: {decrypted_data[2]}"
-            f"\nBirthday: {decrypted_data[3]}"
-            f"\nGender: {decrypted_data[4]}"
-            f"\nStreet Name: {decrypted_data[5]}"
-            f"\nHouse Number: {decrypted_data[6]}"
-            f"\nZip Code: {decrypted_data[7]}"
-            f"\nCity: {decrypted_data[8]}"
-            f"\nEmail: {decrypted_data[9]}"
-            f"\nMobile Phone: {decrypted_data[10]}"
-            f"\nDriving License #: {decrypted_data[11]}"
+            f"\nTraveller ID: {traveller.id}"
+            f"\nFirst Name: {traveller.first_name}"
+            f"\nLast Name: {traveller.last_name}"
+            f"\nBirthday: {traveller.birthday}"
+            f"\nGender: {traveller.gender}"
+            f"\nStreet Name: {traveller.street_name}"
+            f"\nHouse Number: {traveller.house_number}"
+            f"\nZip Code: {traveller.zip_code}"
+            f"\nCity: {traveller.city}"
+            f"\nEmail: {traveller.email}"
+            f"\nMobile Phone: {traveller.mobile_phone}"
+            f"\nDriving License #: {traveller.driving_license_number}"
         )
 
     @staticmethod
-    def get_all_travellers():
-        with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM travellers")
-            return cursor.fetchall()
+    def list_travellers():
+        def show_page(rows):
+            for t in TravellerRow.wrap_all(rows, prefetch=TravellerRow.ENCRYPTED):
+                Traveller.print_info(t)
+
+        print("=== All Travellers ===")
+        if not browse_table(TravellerRow.select_sql(), show_page):
+            print("[INFO] No travellers found.")
 
 
 def get_valid_input(
@@ -410,13 +393,7 @@ def manage_traveller():
             Traveller.search_traveller()
 
         elif choice == "5":
-            travellers = Traveller.get_all_travellers()
-            if travellers:
-                print("=== All Travellers ===")
-                for t in travellers:
-                    Traveller.print_info(t)
-            else:
-                print("[INFO] No travellers found.")
+            Traveller.list_travellers()
 
         elif choice == "6":
             clear_terminal()
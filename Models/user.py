@@ -1,11 +1,14 @@
 import sqlite3
 from datetime import datetime
-from db.database import get_connection
+from db.database import get_read_connection, transaction
+from db.pagination import browse_table
 from auth.password import input_password, input_username, verify_password
 from auth.passwordHash import hash_password
 from ui.terminal import clear_terminal
 from Utils.encryption import Encryptor
 from Utils.getUserId import get_user_id_by_username
+from db.repositories import UserRepository
+from Models.rows import UserRow
 
 encryptor = Encryptor()
 
@@ -91,47 +94,25 @@ class User:
         last_name = input("Enter last name: ").strip()
 
         try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                # Check if username exists
-                user_id = get_user_id_by_username(username)
-
-                if user_id != None:
-                    print("Username already exists.")
-                    return
-
-                hashed_password = hash_password(password)
+            # Check if username exists
+            user_id = get_user_id_by_username(username)
 
-                # Insert into users table
-                cursor.execute(
-                    """
-                    INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)
-                """,
-                    (
-                        encryptor.encrypt_text(username).decode(),
-                        hashed_password,
-                        encryptor.encrypt_text(role).decode(),
-                    ),
-                )
-
-                reg_date = datetime.now().strftime("%Y-%m-%d")
-
-                # Insert into profiles table
-                cursor.execute(
-                    """
-                    INSERT INTO profiles (user_id, first_name, last_name, registration_date)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (
-                        user_id,
-                        encryptor.encrypt_text(first_name).decode(),
-                        encryptor.encrypt_text(last_name).decode(),
-                        encryptor.encrypt_text(reg_date).decode(),
-                    ),
-                )
+            if user_id != None:
+                print("Username already exists.")
+                return
 
-                conn.commit()
-                print(f"\nUser '{username}' added successfully with role '{role}'.\n")
+            # User and profile are written in one transaction
+            UserRepository().add(
+                {
+                    "username": username,
+                    "password_hash": hash_password(password),
+                    "role": role,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "registration_date": datetime.now().strftime("%Y-%m-%d"),
+                }
+            )
+            print(f"\nUser '{username}' added successfully with role '{role}'.\n")
 
         except sqlite3.Error as e:
             print("Database error:", e)
@@ -142,7 +123,7 @@ class User:
         password = input_password("Enter password: ").strip()
 
         try:
-            with get_connection() as conn:
+            with get_read_connection() as conn:
                 cursor = conn.cursor()
 
                 # Check if username exists
@@ -155,7 +136,7 @@ class User:
                 # test if passwords match
                 hashed_password = hash_password(password)
                 cursor.execute(
-                    "SELECT password_hash FROM users WHERE id = ?", (user_id)
+                    "SELECT password_hash FROM users WHERE id = ?", (user_id,)
                 )
                 stored_password_row = cursor.fetchone()
 
@@ -169,15 +150,8 @@ class User:
                     print("Password or username incorrect.")
                     return
 
-                cursor.execute(
-                    "SELECT role FROM users WHERE id = ?",
-                    (get_user_id_by_username(username),),
-                )
-
-                encrypted_user_subject_role = cursor.fetchone()
-                decrypted_user_subject_role = encryptor.decrypt_text(
-                    encrypted_user_subject_role.encode()
-                )
+                cursor.execute(f"{UserRow.select_sql()} WHERE id = ?", (user_id,))
+                decrypted_user_subject_role = UserRow(cursor.fetchone()).role
                 print("[ERROR] No user found.")
 
                 clear_terminal()
@@ -247,30 +221,37 @@ class User:
                 # Update users table
                 if choice == "1":
                     new_userName = input_username("Enter new username: ").strip()
-                    cursor.execute(
-                        "UPDATE users SET username = ? WHERE id = ?",
-                        (encryptor.encrypt_text(new_userName).decode(), user_id),
-                    )
+                    with transaction(immediate=True) as tx:
+                        tx.execute(
+                            "UPDATE users SET username = ?, username_bidx = ? WHERE id = ?",
+                            (
+                                encryptor.encrypt_value(new_userName),
+                                encryptor.blind_index(new_userName, "username"),
+                                user_id,
+                            ),
+                        )
                     clear_terminal()
                     print(f"[SUCCES] User {new_userName} updated succesfully")
 
                 # Update profiles table
                 elif choice == "2":
                     new_firstName = input("Enter new first name: ").strip()
-                    cursor.execute(
-                        "UPDATE profiles SET first_name = ? WHERE user_id = ?",
-                        (encryptor.encrypt_text(new_firstName).decode(), user_id),
-                    )
+                    with transaction(immediate=True) as tx:
+                        tx.execute(
+                            "UPDATE profiles SET first_name = ? WHERE user_id = ?",
+                            (encryptor.encrypt_value(new_firstName), user_id),
+                        )
                     clear_terminal()
                     print(f"[SUCCES] User {username} updated succesfully")
 
                 # Update profiles table
                 elif choice == "3":
                     new_lastName = input("Enter new last name: ").strip()
-                    cursor.execute(
-                        "UPDATE profiles SET last_name = ? WHERE user_id = ?",
-                        (encryptor.encrypt_text(new_lastName).decode(), user_id),
-                    )
+                    with transaction(immediate=True) as tx:
+                        tx.execute(
+                            "UPDATE profiles SET last_name = ? WHERE user_id = ?",
+                            (encryptor.encrypt_value(new_lastName), user_id),
+                        )
                     clear_terminal()
                     print(f"[SUCCES] User {username} updated succesfully")
 
@@ -278,8 +259,6 @@ class User:
                     print("[ERROR] Invalid choice.")
                     return
 
-                conn.commit()
-
         except sqlite3.Error as e:
             print("Database error:", e)
 
@@ -288,7 +267,7 @@ class User:
         password = input_password("Enter password: ").strip()
 
         try:
-            with get_connection() as conn:
+            with get_read_connection() as conn:
                 cursor = conn.cursor()
                 # Check if username exists
                 user_id = get_user_id_by_username(username)
@@ -313,17 +292,19 @@ class User:
                     print("Password or username incorrect.")
                     return
 
-                # delete user from profiles
-                cursor.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
-                if cursor.rowcount == 0:
-                    print("User not found or already deleted.")
+                with transaction(immediate=True) as tx:
+                    # delete user from profiles
+                    deleted = tx.execute(
+                        "DELETE FROM profiles WHERE user_id = ?", (user_id,)
+                    )
+                    if deleted.rowcount == 0:
+                        print("User not found or already deleted.")
 
-                # delete user from users
-                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                if cursor.rowcount == 0:
-                    print("User not found or already deleted.")
+                    # delete user from users
+                    deleted = tx.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                    if deleted.rowcount == 0:
+                        print("User not found or already deleted.")
 
-                conn.commit()
                 clear_terminal()
                 print(f"[SUCCES] User {username} deleted succesfully")
         except sqlite3.Error as e:
@@ -343,46 +324,25 @@ class User:
         last_name = input("Enter last name: ").strip()
 
         try:
-            with get_connection() as conn:
-                cursor = conn.cursor()
-                # Check if username exists
-                user_id = get_user_id_by_username(username)
+            # Check if username exists
+            user_id = get_user_id_by_username(username)
 
-                if user_id != None:
-                    print("Username already exists.")
-                    return
-
-                hashed_password = hash_password(password)
-
-                # Insert into users table
-                cursor.execute(
-                    """
-                    INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)
-                """,
-                    (username, hashed_password, "service_engineer"),
-                )
-
-                # get userId
-                cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-                user_id_row = cursor.fetchone()
-                if user_id_row is None:
-                    print("User not found after insert — unexpected.")
-                    return
-
-                user_id = user_id_row[0]
-                reg_date = datetime.now().strftime("%Y-%m-%d")
-
-                # Insert into profiles table
-                cursor.execute(
-                    """
-                    INSERT INTO profiles (user_id, first_name, last_name, registration_date)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (user_id, first_name, last_name, reg_date),
-                )
+            if user_id != None:
+                print("Username already exists.")
+                return
 
-                conn.commit()
-                print(f"[SUCCES] user: {username} succesfully added")
+            # User and profile are written in one transaction
+            UserRepository().add(
+                {
+                    "username": username,
+                    "password_hash": hash_password(password),
+                    "role": "service_engineer",
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "registration_date": datetime.now().strftime("%Y-%m-%d"),
+                }
+            )
+            print(f"[SUCCES] user: {username} succesfully added")
 
         except sqlite3.Error as e:
             print("Database error:", e)
@@ -471,7 +431,7 @@ class User:
         password = input_password("Enter password: ").strip()
 
         try:
-            with get_connection() as conn:
+            with get_read_connection() as conn:
                 cursor = conn.cursor()
                 # Check if username exists
                 user_id = get_user_id_by_username(username)
@@ -496,17 +456,19 @@ class User:
                     print("Password or username incorrect.")
                     return
 
-                # delete user from profiles
-                cursor.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
-                if cursor.rowcount == 0:
-                    print("User not found or already deleted.")
+                with transaction(immediate=True) as tx:
+                    # delete user from profiles
+                    deleted = tx.execute(
+                        "DELETE FROM profiles WHERE user_id = ?", (user_id,)
+                    )
+                    if deleted.rowcount == 0:
+                        print("User not found or already deleted.")
 
-                # delete user from users
-                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                if cursor.rowcount == 0:
-                    print("User not found or already deleted.")
+                    # delete user from users
+                    deleted = tx.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                    if deleted.rowcount == 0:
+                        print("User not found or already deleted.")
 
-                conn.commit()
                 clear_terminal()
                 print(f"[SUCCES] User {username} deleted succesfully")
         except sqlite3.Error as e:
@@ -517,32 +479,13 @@ class User:
         try:
             clear_terminal()
             print("=== User display ===")
-            start = input("Enter starting index (0 for beginning): ").strip()
-            if not start.isdigit():
-                print("Invalid input. Must be a non-negative number.")
-                return
 
-            offset = int(start)
+            def show_page(rows):
+                for user in UserRow.wrap_all(rows, prefetch=UserRow.ENCRYPTED):
+                    print(f"Username: {user.username} | Role: {user.role}")
 
-            with get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    "SELECT username, role FROM users LIMIT 100 OFFSET ?", (offset,)
-                )
-                users = cursor.fetchall()
-
-                if not users:
-                    print("\nNo users found from this starting point.")
-                    return
-
-                print(
-                    f"\n=== Users List (From {offset} to {offset + len(users) - 1}) ==="
-                )
-                for username, role in users:
-                    print(
-                        f"Username: {encryptor.decrypt_text(username.encode())} | Role: {encryptor.decrypt_text(role.encode())}"
-                    )
+            if not browse_table(UserRow.select_sql(), show_page):
+                print("\nNo users found.")
 
         except Exception as e:
             print("Error fetching users:", e)
@@ -564,12 +507,12 @@ class User:
             ).strip()
 
         try:
-            with get_connection() as conn:
+            with get_read_connection() as conn:
                 cursor = conn.cursor()
 
                 # Retrieve user info
                 cursor.execute(
-                    "SELECT id, role, password_hash FROM users WHERE id = ?",
+                    f"{UserRow.select_sql()} WHERE id = ?",
                     (get_user_id_by_username(target_username),),
                 )
                 target_row = cursor.fetchone()
@@ -577,7 +520,12 @@ class User:
                     print("[ERROR] Target username not found.")
                     return
 
-                target_id, target_role, stored_hash = target_row
+                target = UserRow(target_row)
+                target_id, target_role, stored_hash = (
+                    target.id,
+                    target.role,
+                    target.password_hash,
+                )
 
                 # --- Role validation ---
                 if self.role not in ROLE_LEVELS or target_role not in ROLE_LEVELS:
@@ -620,13 +568,13 @@ class User:
 
                 # --- Hash and encrypt new password ---
                 new_hash = hash_password(new_password)
-                encrypted_new_hash = encryptor.encrypt_text(new_hash).decode()
+                encrypted_new_hash = encryptor.encrypt_value(new_hash)
 
-                cursor.execute(
-                    "UPDATE users SET password_hash = ? WHERE id = ?",
-                    (encrypted_new_hash, target_id),
-                )
-                conn.commit()
+                with transaction(immediate=True) as tx:
+                    tx.execute(
+                        "UPDATE users SET password_hash = ? WHERE id = ?",
+                        (encrypted_new_hash, target_id),
+                    )
 
                 print(
                     f"[SUCCESS] Password for user '{target_username}' changed successfully."
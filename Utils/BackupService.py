@@ -1,18 +1,79 @@
 import os
+import sqlite3
 import sys
 import datetime
+import tempfile
 import uuid
 import zipfile
-from db.database import get_connection, DB_NAME
+from pathlib import Path
+from cryptography.fernet import InvalidToken
+from db.database import (
+    checkpoint,
+    get_connection,
+    get_read_connection,
+    initialize_db,
+    restore,
+    DB_NAME,
+)
+from db.maintenance import run_maintenance
+from db.pagination import browse_table
+from db.repositories import BackupRepository
 from Models.user import User
+from Utils import dictionary, fleetAnalytics
 from Utils.encryption import Encryptor
+from Utils.fleetIndex import fleet
+from Utils.keyRotation import reencrypt_database
 from Utils.logger import Logger
 
 
 BACKUP_DIR = "data/backups"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-logger = Logger(Encryptor())
+encryptor = Encryptor()
+logger = Logger(encryptor)
+backups = BackupRepository()
+
+
+def _readable(db_path: str) -> bool:
+    """Whether the database's encrypted values use a key that is still known."""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute(
+            "SELECT username FROM users WHERE username != '' LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return True
+    try:
+        encryptor.decrypt_text(row[0])
+    except (InvalidToken, ValueError, TypeError):
+        return False
+    return True
+
+
+def _restore_file(backup_path: str):
+    """Copy the database in a backup ZIP into the open database."""
+    if len(encryptor.entry.keys) > 1:
+        raise ValueError("A key rotation is in progress. Finish it first.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with zipfile.ZipFile(backup_path, "r") as zipf:
+            extracted = zipf.extract(os.path.basename(DB_NAME), path=tmp)
+        if not _readable(extracted):
+            raise ValueError("The backup was encrypted with a key that is not known.")
+        restore(extracted)
+
+    # A backup may predate the current schema; bring it up to date the way
+    # startup does before anything reads from it
+    initialize_db()
+    # and it may predate a key rotation: its values can use retired keys
+    reencrypt_database()
+
+    # Whatever is held in memory describes the replaced data
+    dictionary.clear()
+    fleet.clear()
+    fleetAnalytics.clear()
 
 
 class BackupService:
@@ -24,22 +85,20 @@ class BackupService:
         zip_path = os.path.join(BACKUP_DIR, zip_filename)
 
         try:
+            # Free pages would only make the backup bigger
+            run_maintenance(pages=0)
+            # Committed changes may still sit in the WAL file
+            checkpoint()
             with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
                 zipf.write(DB_NAME, arcname=os.path.basename(DB_NAME))
 
-            with get_connection() as conn:
-                conn.execute(
-                    """
-                    INSERT INTO backups (file_name, created_by, created_at)
-                    VALUES (?, ?, ?)
-                    """,
-                    (
-                        zip_filename,
-                        created_by,
-                        datetime.datetime.now().isoformat(),
-                    ),
-                )
-                conn.commit()
+            backups.add(
+                {
+                    "file_name": zip_filename,
+                    "created_by": created_by,
+                    "created_at": datetime.datetime.now().isoformat(),
+                }
+            )
 
             logger.log(
                 username=created_by,
@@ -63,19 +122,10 @@ class BackupService:
     def generate_restore_code(backup_filename: str, assigned_admin: str):
         restore_code = str(uuid.uuid4())
 
-        with get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                UPDATE backups
-                SET restore_code = ?, assigned_to = ?, used = 0
-                WHERE file_name = ?
-                """,
-                (restore_code, assigned_admin, backup_filename),
-            )
-            if cur.rowcount == 0:
-                raise ValueError("Backup not found.")
-            conn.commit()
+        if not backups.assign_restore_code(
+            backup_filename, restore_code, assigned_admin
+        ):
+            raise ValueError("Backup not found.")
 
         logger.log(
             username="super_admin",
@@ -88,17 +138,7 @@ class BackupService:
 
     @staticmethod
     def revoke_restore_code(restore_code: str):
-        with get_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                UPDATE backups
-                SET restore_code = NULL, assigned_to = NULL, used = 0
-                WHERE restore_code = ?
-                """,
-                (restore_code,),
-            )
-            conn.commit()
+        backups.revoke_restore_code(restore_code)
 
         logger.log(
             username="super_admin",
@@ -154,14 +194,8 @@ class BackupService:
             if not os.path.exists(backup_path):
                 raise FileNotFoundError("Backup file not found.")
 
-            with zipfile.ZipFile(backup_path, "r") as zipf:
-                zipf.extract(os.path.basename(DB_NAME), path="data/")
-
-            cur.execute(
-                "UPDATE backups SET used = 1 WHERE restore_code = ?",
-                (restore_code,),
-            )
-            conn.commit()
+        _restore_file(backup_path)
+        backups.mark_used(restore_code=restore_code)
 
         logger.log(
             username=requesting_admin,
@@ -189,19 +223,8 @@ class BackupService:
             raise FileNotFoundError("Backup file not found.")
 
         try:
-            with zipfile.ZipFile(backup_path, "r") as zipf:
-                zipf.extract(os.path.basename(DB_NAME), path="data/")
-
-            with get_connection() as conn:
-                conn.execute(
-                    """
-                    UPDATE backups
-                    SET used = 1
-                    WHERE file_name = ?
-                    """,
-                    (backup_filename,),
-                )
-                conn.commit()
+            _restore_file(backup_path)
+            backups.mark_used(file_name=backup_filename)
 
             logger.log(
                 username="super_admin",
@@ -222,6 +245,23 @@ class BackupService:
             raise
 
 
+def show_backups(records):
+    for (
+        _,
+        file_name,
+        created_by,
+        created_at,
+        restore_code,
+        assigned_to,
+        used,
+    ) in records:
+        status = "✅ Used" if used else "🕒 Active"
+        print(
+            f"{file_name} | Created by: {created_by} | Date: {created_at}\n"
+            f"   Restore code: {restore_code or '-'} | Assigned to: {assigned_to or '-'} | Status: {status}\n"
+        )
+
+
 def backup_menu(user: User):
     while True:
         print("\n=== Backup & Restore Menu ===")
@@ -243,9 +283,9 @@ def backup_menu(user: User):
 
         elif choice == "2":
             try:
-                with get_connection() as conn:
+                with get_read_connection() as conn:
                     cur = conn.cursor()
-                    cur.execute("SELECT file_name, created_at FROM backups")
+                    cur.execute("SELECT file_name, created_at FROM backups ORDER BY id")
                     backups = cur.fetchall()
 
                 if not backups:
@@ -264,22 +304,21 @@ def backup_menu(user: User):
                 backup_file = backups[int(index) - 1][0]
                 assigned_admin = input("Assign restore code to which admin? ").strip()
 
-                with get_connection() as conn:
+                # Find the admin through the username blind index and the
+                # role's dictionary code, without decrypting either
+                with get_read_connection() as conn:
                     cur = conn.cursor()
-                    cur.execute("SELECT username, role FROM users")
-                    users = cur.fetchall()
-
-                encryptor = Encryptor()
-                valid_admin = False
-                for enc_username, enc_role in users:
-                    username = encryptor.decrypt_text(enc_username)
-                    role = encryptor.decrypt_text(enc_role)
-                    if (
-                        username.lower() == assigned_admin.lower()
-                        and role.lower() == "system_administrator"
-                    ):
-                        valid_admin = True
-                        break
+                    role_code = dictionary.lookup(
+                        cur, "users", "role", "system_administrator"
+                    )
+                    valid_admin = cur.execute(
+                        "SELECT 1 FROM users WHERE username_bidx = ? AND "
+                        "role_code = ? LIMIT 1",
+                        (
+                            encryptor.blind_index(assigned_admin, "username"),
+                            role_code,
+                        ),
+                    ).fetchone()
 
                 if not valid_admin:
                     print(
@@ -307,9 +346,11 @@ def backup_menu(user: User):
 
         elif choice == "4":
             try:
-                with get_connection() as conn:
+                with get_read_connection() as conn:
                     cur = conn.cursor()
-                    cur.execute("SELECT file_name, created_by, created_at FROM backups")
+                    cur.execute(
+                        "SELECT file_name, created_by, created_at FROM backups ORDER BY id"
+                    )
                     backups = cur.fetchall()
 
                 if not backups:
@@ -350,31 +391,13 @@ def backup_menu(user: User):
 
         elif choice == "5":
             try:
-                with get_connection() as conn:
-                    cur = conn.cursor()
-                    cur.execute(
-                        "SELECT file_name, created_by, created_at, restore_code, assigned_to, used FROM backups"
-                    )
-                    records = cur.fetchall()
-
-                if not records:
-                    print("No backups found.")
-                    continue
-
                 print("\n=== Existing Backups ===")
-                for (
-                    file_name,
-                    created_by,
-                    created_at,
-                    restore_code,
-                    assigned_to,
-                    used,
-                ) in records:
-                    status = "✅ Used" if used else "🕒 Active"
-                    print(
-                        f"{file_name} | Created by: {created_by} | Date: {created_at}\n"
-                        f"   Restore code: {restore_code or '-'} | Assigned to: {assigned_to or '-'} | Status: {status}\n"
-                    )
+                if not browse_table(
+                    "SELECT id, file_name, created_by, created_at, restore_code, "
+                    "assigned_to, used FROM backups",
+                    show_backups,
+                ):
+                    print("No backups found.")
 
             except Exception as e:
                 print(f"[ERROR] Could not list backups: {e}")
@@ -411,8 +434,6 @@ def system_admin_backup_menu(admin_username: str):
                 if success:
                     print(f"[SUCCESS] Database restored successfully!")
 
-                    from auth.login import login
-
                     python = sys.executable
                     os.execl(python, python, *sys.argv)
 
@@ -0,0 +1,141 @@
+import base64
+import os
+import sys
+from db import database
+from db.database import get_connection, transaction
+from Utils.encryption import Encryptor, is_binary_token, raw_token
+from Utils.keyRotation import ROTATED_COLUMNS
+from Utils.rowEnvelope import ENVELOPE_TABLES, ensure_envelope_columns
+
+encryptor = Encryptor()
+
+# Encrypted values are stored either as base64 TEXT or as raw BLOBs (see
+# STORE_BINARY in Utils.encryption). Reads accept both, so a table can be
+# converted in place, batch by batch, while the application keeps running.
+# SQLite keeps BLOBs as they are in TEXT columns, so no table is rebuilt.
+BATCH_SIZE = 500
+
+
+def _columns(table: str) -> list:
+    columns = list(ROTATED_COLUMNS[table])
+    if table in ENVELOPE_TABLES:
+        columns.append("sealed")
+    return columns
+
+
+def _convert(value, column: str, binary: bool):
+    if value is None or is_binary_token(value) == binary:
+        return value
+    if not binary:
+        return base64.urlsafe_b64encode(bytes(value)).decode()
+    if column != "sealed":
+        # Only values that really are tokens are converted; password hashes
+        # and legacy plaintext are base64-like too
+        try:
+            encryptor.decrypt_text(value)
+        except Exception:
+            return value
+    return raw_token(value)
+
+
+def convert_table(table: str, binary: bool = True, batch_size: int = BATCH_SIZE):
+    """Convert the encrypted columns of one table in place, in short batches."""
+    columns = _columns(table)
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    converted = 0
+    last_rowid = 0
+
+    with transaction(immediate=True) as conn:
+        ensure_envelope_columns(conn.cursor())
+
+    while True:
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT rowid, {', '.join(columns)} FROM {table} "
+                f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size),
+            )
+            rows = cur.fetchall()
+
+            updates = []
+            for row in rows:
+                values = [
+                    _convert(value, column, binary)
+                    for column, value in zip(columns, row[1:])
+                ]
+                if values != list(row[1:]):
+                    updates.append((*values, row[0]))
+            cur.executemany(
+                f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates
+            )
+
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+        converted += len(updates)
+
+    print(
+        f"[INFO] Converted {converted} rows in {table} to "
+        f"{'binary' if binary else 'text'} storage."
+    )
+    return converted
+
+
+def storage_status() -> dict:
+    """Per table: number of values stored as text and as blobs."""
+    status = {}
+    with transaction() as conn:
+        cur = conn.cursor()
+        ensure_envelope_columns(cur)
+        for table in ROTATED_COLUMNS:
+            columns = _columns(table)
+            cur.execute(
+                "SELECT "
+                + ", ".join(
+                    f"SUM(typeof({c}) = 'text' AND {c} != ''), "
+                    f"SUM(typeof({c}) = 'blob')"
+                    for c in columns
+                )
+                + f" FROM {table}"
+            )
+            counts = [count or 0 for count in cur.fetchone()]
+            status[table] = (sum(counts[0::2]), sum(counts[1::2]))
+    return status
+
+
+def convert_all(binary: bool = True):
+    for table in ROTATED_COLUMNS:
+        convert_table(table, binary)
+
+    # Give the space freed by the shorter values back to the file system
+    database.checkpoint()
+    size_before = os.path.getsize(database.DB_NAME)
+    with get_connection() as conn:
+        conn.execute("VACUUM")
+    database.checkpoint()
+    print(
+        f"[INFO] Database file: {size_before // 1024} KiB -> "
+        f"{os.path.getsize(database.DB_NAME) // 1024} KiB."
+    )
+
+
+def main():
+    # python -m Utils.blobStorage to-blob | to-text | status
+    # Converting back to text only makes sense together with setting
+    # STORE_BINARY = False, e.g. before downgrading.
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "to-blob":
+        convert_all(binary=True)
+    elif command == "to-text":
+        convert_all(binary=False)
+    elif command == "status":
+        for table, (text, blob) in storage_status().items():
+            print(f"{table}: {text} text values, {blob} blob values")
+    else:
+        print(f"[ERROR] Unknown command '{command}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import sys
+import threading
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+# Low-cardinality encrypted columns stored as a small integer code into the
+# encrypted `dictionary` table instead of one token per row. Each distinct
+# value is encrypted once; rows carry its code, so decoding is a cached
+# lookup and filters or GROUP BYs on these columns run in plain SQL on the
+# code column. Values are matched through their blind index, so spellings
+# that differ only in case or surrounding blanks share the first one's code.
+# The original column is left empty ('') on encoded rows; rows written before
+# the code column existed (code NULL) are still read from it.
+CODED_COLUMNS = {
+    "scooters": {"brand": "brand_code"},
+    "travellers": {"gender": "gender_code", "city": "city_code"},
+    "users": {"role": "role_code"},
+}
+
+# code -> plaintext, loaded from committed rows only
+_values = {}
+_lock = threading.Lock()
+
+
+def _domain(table: str, column: str) -> str:
+    return f"{table}.{column}"
+
+
+def create_dictionary(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS dictionary (
+        code INTEGER PRIMARY KEY AUTOINCREMENT,
+        domain TEXT NOT NULL,
+        value_bidx TEXT NOT NULL,
+        value TEXT NOT NULL,
+        UNIQUE (domain, value_bidx)
+    )
+    """
+    )
+
+
+def ensure_code_columns(cur):
+    """Create the dictionary and add missing code columns and their indexes."""
+    create_dictionary(cur)
+    for table, columns in CODED_COLUMNS.items():
+        cur.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cur.fetchall()}
+        for code_column in columns.values():
+            if code_column not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {code_column} INTEGER")
+            cur.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_{code_column} "
+                f"ON {table}({code_column})"
+            )
+
+
+def lookup(cur, table: str, column: str, value):
+    """The code of a value, or None if it was never stored."""
+    if value is None:
+        return None
+    domain = _domain(table, column)
+    cur.execute(
+        "SELECT code FROM dictionary WHERE domain = ? AND value_bidx = ?",
+        (domain, encryptor.blind_index(str(value), domain)),
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def encode(cur, table: str, column: str, value, memo: dict = None):
+    """
+    The code of a value, adding it to the dictionary if it is new. Runs on
+    the caller's cursor, so a new entry is part of the caller's transaction.
+    `memo` may be shared over one batch in that transaction.
+    """
+    if value is None:
+        return None
+    key = (table, column, value)
+    if memo is not None and key in memo:
+        return memo[key]
+
+    code = lookup(cur, table, column, value)
+    if code is None:
+        domain = _domain(table, column)
+        cur.execute(
+            "INSERT INTO dictionary (domain, value_bidx, value) VALUES (?, ?, ?)",
+            (
+                domain,
+                encryptor.blind_index(str(value), domain),
+                encryptor.encrypt_value(str(value)),
+            ),
+        )
+        code = cur.lastrowid
+    if memo is not None:
+        memo[key] = code
+    return code
+
+
+def encode_values(cur, table: str, values: dict, memo: dict = None) -> dict:
+    """
+    The columns to write for the coded columns among `values`: the code
+    column set, the original column emptied.
+    """
+    columns = {}
+    for column, code_column in CODED_COLUMNS.get(table, {}).items():
+        if column in values:
+            columns[column] = ""
+            columns[code_column] = encode(cur, table, column, values[column], memo)
+    return columns
+
+
+def _load():
+    # Read on its own connection, so entries of a transaction that may still
+    # roll back (and free their code again) are never cached
+    from db.database import get_read_connection
+
+    with get_read_connection() as conn:
+        rows = conn.execute("SELECT code, value FROM dictionary").fetchall()
+    values = {}
+    for code, value in rows:
+        try:
+            values[code] = encryptor.decrypt_text(value)
+        except Exception:
+            # fallback for unencrypted data
+            values[code] = value
+    with _lock:
+        _values.update(values)
+
+
+def decode(code):
+    """
+    The plaintext of a code. The whole dictionary is loaded on a miss; None
+    if the code is still unknown (not committed yet).
+    """
+    if code is None:
+        return None
+    value = _values.get(code)
+    if value is None:
+        _load()
+        value = _values.get(code)
+    return value
+
+
+def clear():
+    """Forget the decoded values, e.g. at logout."""
+    with _lock:
+        _values.clear()
+
+
+def backfill(cur, row_cls) -> int:
+    """
+    Encode the rows of a row class's table written before its code columns
+    existed. Sealed rows keep their values in the envelope and only gain
+    the codes.
+    """
+    table = row_cls.TABLE
+    columns = CODED_COLUMNS[table]
+    pending = " OR ".join(f"{code} IS NULL" for code in columns.values())
+    cur.execute(f"{row_cls.select_sql()} WHERE {pending}")
+    rows = list(row_cls.wrap_all(cur.fetchall()))
+
+    memo = {}
+    for row in rows:
+        values = {column: getattr(row, column) for column in columns}
+        encoded = encode_values(cur, table, values, memo)
+        if row.is_sealed():
+            encoded = {name: encoded[name] for name in columns.values()}
+        assignments = ", ".join(f"{name} = ?" for name in encoded)
+        cur.execute(
+            f"UPDATE {table} SET {assignments} WHERE id = ?",
+            (*encoded.values(), row.id),
+        )
+    if rows:
+        print(f"[INFO] Dictionary-encoded {len(rows)} rows in {table}.")
+    return len(rows)
+
+
+def value_counts(table: str, column: str) -> dict:
+    """{value: number of rows}, grouped in SQL on the code column."""
+    from db.database import get_read_connection
+
+    code_column = CODED_COLUMNS[table][column]
+    with get_read_connection() as conn:
+        rows = conn.execute(
+            f"SELECT {code_column}, COUNT(*) FROM {table} "
+            f"WHERE {code_column} IS NOT NULL GROUP BY {code_column}"
+        ).fetchall()
+    counts = {}
+    for code, count in rows:
+        value = decode(code)
+        counts[value] = counts.get(value, 0) + count
+    return counts
+
+
+def main():
+    # python -m Utils.dictionary [table]    rows per dictionary value
+    tables = sys.argv[1:] or list(CODED_COLUMNS)
+
+    for table in tables:
+        if table not in CODED_COLUMNS:
+            print(f"[ERROR] Table '{table}' has no dictionary-encoded columns.")
+            continue
+        for column in CODED_COLUMNS[table]:
+            counts = value_counts(table, column)
+            print(f"{table}.{column}: {len(counts)} distinct values")
+            for value, count in sorted(counts.items(), key=lambda c: -c[1]):
+                print(f"  {count:>8}  {value}")
+
+
+if __name__ == "__main__":
+    main()
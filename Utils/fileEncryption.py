@@ -0,0 +1,115 @@
+import os
+import struct
+import zlib
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Streaming file format
+#
+#   header: MAGIC | version (1) | options (1) | chunk size (4) | file id (16)
+#   frame:  length (4) | final flag (1) | nonce (12) | AES-GCM ciphertext + tag
+#
+# Every frame is authenticated together with the header, its position and the
+# final flag, so frames cannot be swapped between files, reordered, dropped or
+# truncated without the decryptor noticing.
+MAGIC = b"UMSE"
+VERSION = 1
+OPTION_COMPRESSED = 0x01
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_HEADER = struct.Struct(">4sBBI16s")
+_FRAME = struct.Struct(">IB")
+_NONCE_SIZE = 12
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+def _associated_data(header: bytes, index: int, final: bool) -> bytes:
+    return header + struct.pack(">QB", index, final)
+
+
+def _read_exact(src, size: int) -> bytes:
+    data = src.read(size)
+    if len(data) != size:
+        raise StreamFormatError("Encrypted stream is truncated.")
+    return data
+
+
+def is_stream_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def encrypt_stream(src, dst, key: bytes, chunk_size=DEFAULT_CHUNK_SIZE, compress=False):
+    """
+    Encrypt the binary stream `src` into `dst` one chunk at a time, so memory
+    use is bounded by the chunk size regardless of the input size.
+    """
+    aesgcm = AESGCM(key)
+    options = OPTION_COMPRESSED if compress else 0
+    header = _HEADER.pack(MAGIC, VERSION, options, chunk_size, os.urandom(16))
+    dst.write(header)
+
+    index = 0
+    chunk = src.read(chunk_size)
+    while True:
+        # Read one chunk ahead to know whether the current one is the last
+        next_chunk = src.read(chunk_size) if chunk else b""
+        final = not next_chunk
+
+        if compress:
+            chunk = zlib.compress(chunk, 6)
+        nonce = os.urandom(_NONCE_SIZE)
+        ciphertext = aesgcm.encrypt(
+            nonce, chunk, _associated_data(header, index, final)
+        )
+        dst.write(_FRAME.pack(_NONCE_SIZE + len(ciphertext), final))
+        dst.write(nonce)
+        dst.write(ciphertext)
+
+        if final:
+            break
+        chunk = next_chunk
+        index += 1
+
+
+def decrypt_stream(src, dst, key: bytes):
+    """Decrypt a stream written by encrypt_stream into `dst`, chunk by chunk."""
+    aesgcm = AESGCM(key)
+    header = _read_exact(src, _HEADER.size)
+    magic, version, options, chunk_size, _ = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise StreamFormatError("Not an encrypted stream.")
+    if version != VERSION:
+        raise StreamFormatError(f"Unsupported stream version {version}.")
+
+    # A compressed chunk can be slightly larger than the original
+    max_frame = chunk_size + chunk_size // 100 + 1024
+    index = 0
+    while True:
+        frame_header = src.read(_FRAME.size)
+        if not frame_header:
+            raise StreamFormatError("Encrypted stream ended without a final chunk.")
+        if len(frame_header) != _FRAME.size:
+            raise StreamFormatError("Encrypted stream is truncated.")
+
+        length, final = _FRAME.unpack(frame_header)
+        if length > max_frame:
+            raise StreamFormatError("Encrypted frame is larger than the chunk size.")
+        frame = _read_exact(src, length)
+
+        chunk = aesgcm.decrypt(
+            frame[:_NONCE_SIZE],
+            frame[_NONCE_SIZE:],
+            _associated_data(header, index, bool(final)),
+        )
+        if options & OPTION_COMPRESSED:
+            chunk = zlib.decompress(chunk)
+        dst.write(chunk)
+
+        if final:
+            if src.read(1):
+                raise StreamFormatError("Unexpected data after the final chunk.")
+            return
+        index += 1
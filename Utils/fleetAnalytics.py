@@ -0,0 +1,170 @@
+import math
+import threading
+import time
+import numpy as np
+from db.database import get_read_connection
+from Utils import dictionary
+
+# Fleet-level figures for admins: charge against the target range, SoC per
+# brand, mileage distribution and the share out of service. Only numeric
+# columns are read (brand through its dictionary code), streamed into NumPy
+# arrays CHUNK_ROWS at a time; every figure is then computed on the arrays
+# as a whole. Fetching the rows is what costs time, so the arrays are kept
+# and reused for MAX_AGE_SECONDS before they are read again.
+#   python -m Utils.fleetAnalytics
+COLUMNS = (
+    "soc",
+    "target_range_min",
+    "target_range_max",
+    "mileage",
+    "out_of_service",
+    "brand_code",
+)
+CHUNK_ROWS = 20_000
+MAX_AGE_SECONDS = 60
+PERCENTILES = (10, 50, 90)
+# Upper bounds (km) of the mileage buckets; the last bucket is open
+MILEAGE_BINS = (500, 1_000, 2_500, 5_000, 10_000)
+
+_snapshot = None  # (loaded at, columns)
+_lock = threading.Lock()
+
+
+def load_columns(columns=COLUMNS) -> dict:
+    """Every scooter's `columns` as float arrays, NULL as NaN."""
+    chunks = []
+    with get_read_connection() as conn:
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM scooters")
+        while True:
+            rows = cursor.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+    table = np.concatenate(chunks) if chunks else np.empty((0, len(columns)))
+    # One contiguous array per column
+    return dict(zip(columns, table.T.copy()))
+
+
+def summarize(columns: dict) -> dict:
+    """The dashboard figures for arrays as returned by load_columns."""
+    soc = columns["soc"]
+    mileage = columns["mileage"]
+    brand = columns["brand_code"]
+    out_of_service = columns["out_of_service"] == 1
+    below = soc < columns["target_range_min"]
+    scooters = len(soc)
+
+    summary = {
+        "scooters": scooters,
+        "out_of_service": int(out_of_service.sum()),
+        "below_target": int(below.sum()),
+        "below_target_in_service": int((below & ~out_of_service).sum()),
+        "above_target": int((soc > columns["target_range_max"]).sum()),
+        "soc_mean": float(soc.mean()) if scooters else math.nan,
+        "soc_percentiles": (
+            dict(zip(PERCENTILES, np.percentile(soc, PERCENTILES).tolist()))
+            if scooters
+            else {}
+        ),
+    }
+
+    mileage = mileage[~np.isnan(mileage)]
+    summary["mileage_mean"] = float(mileage.mean()) if len(mileage) else math.nan
+    summary["mileage_median"] = float(np.median(mileage)) if len(mileage) else math.nan
+    summary["mileage_buckets"] = np.bincount(
+        np.searchsorted(MILEAGE_BINS, mileage, side="right"),
+        minlength=len(MILEAGE_BINS) + 1,
+    ).tolist()
+
+    # Per brand code: count, summed SoC and scooters below target, in one
+    # pass each; rows without a code (never encoded) are counted apart
+    coded = ~np.isnan(brand)
+    codes = brand[coded].astype(np.int64)
+    counts = np.bincount(codes)
+    soc_sums = np.bincount(codes, weights=soc[coded])
+    below_counts = np.bincount(codes, weights=below[coded])
+    brands = [
+        {
+            "brand": dictionary.decode(int(code)) or f"#{code}",
+            "scooters": int(counts[code]),
+            "soc_mean": float(soc_sums[code] / counts[code]),
+            "below_target": int(below_counts[code]),
+        }
+        for code in np.flatnonzero(counts)
+    ]
+    brands.sort(key=lambda b: (-b["scooters"], b["brand"]))
+    summary["brands"] = brands
+    summary["without_brand_code"] = int(scooters - coded.sum())
+    return summary
+
+
+def fleet_summary(max_age: float = MAX_AGE_SECONDS) -> dict:
+    """
+    summarize() over the fleet, read again once the kept arrays are older
+    than max_age seconds. `as_of` tells when they were read.
+    """
+    global _snapshot
+    with _lock:
+        if _snapshot is None or time.time() - _snapshot[0] > max_age:
+            _snapshot = (time.time(), load_columns())
+        loaded_at, columns = _snapshot
+    return {**summarize(columns), "as_of": loaded_at}
+
+
+def clear():
+    """Drop the kept arrays, e.g. at logout or after a restore."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def _share(part: int, whole: int) -> str:
+    return f"{part} ({part / whole:.1%})" if whole else str(part)
+
+
+def print_summary(summary: dict):
+    n = summary["scooters"]
+    as_of = time.strftime("%H:%M:%S", time.localtime(summary["as_of"]))
+    print(f"\n=== Fleet Analytics (as of {as_of}) ===")
+    print(f"Scooters: {n}")
+    if not n:
+        return
+    print(f"Out of service: {_share(summary['out_of_service'], n)}")
+    print(
+        f"Below target SoC: {_share(summary['below_target'], n)}, "
+        f"{summary['below_target_in_service']} of them in service"
+    )
+    print(f"Above target SoC: {_share(summary['above_target'], n)}")
+    percentiles = ", ".join(
+        f"p{p} {value:.1f}" for p, value in summary["soc_percentiles"].items()
+    )
+    print(f"SoC (%): mean {summary['soc_mean']:.1f}, {percentiles}")
+
+    print(
+        f"Mileage (km): mean {summary['mileage_mean']:.1f}, "
+        f"median {summary['mileage_median']:.1f}"
+    )
+    bounds = (0, *MILEAGE_BINS)
+    for i, count in enumerate(summary["mileage_buckets"]):
+        label = (
+            f"{bounds[i]}-{bounds[i + 1]}" if i + 1 < len(bounds) else f"{bounds[i]}+"
+        )
+        print(f"  {label:>12}: {count}")
+
+    print("SoC per brand:")
+    for brand in summary["brands"]:
+        print(
+            f"  {brand['brand']}: {brand['scooters']} scooters, "
+            f"mean SoC {brand['soc_mean']:.1f}, {brand['below_target']} below target"
+        )
+    if summary["without_brand_code"]:
+        print(f"  (brand not encoded): {summary['without_brand_code']} scooters")
+
+
+def main():
+    # python -m Utils.fleetAnalytics
+    print_summary(fleet_summary(max_age=0))
+
+
+if __name__ == "__main__":
+    main()
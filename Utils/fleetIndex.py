@@ -0,0 +1,311 @@
+import heapq
+import math
+import threading
+from db.database import get_read_connection, stream_rows
+from Utils.geoIndex import EARTH_RADIUS_M, bounding_boxes
+
+# Resident grid index of scooter positions and availability, for "what is
+# around me" questions asked far more often than the fleet changes. The
+# globe is cut into CELL_DEGREES x CELL_DEGREES cells (about 1.1 x 0.7 km
+# in Rotterdam); each cell holds the ids of the scooters inside it. It is
+# built from `scooters` by the first query that asks for it and then
+# patched by the write paths of this process; until then, patches are
+# ignored. Writes by other processes are not seen, which is why
+# Utils.geoIndex.find_nearest keeps to the R*Tree and only
+# find_nearest_resident asks this index.
+CELL_DEGREES = 0.01
+
+_LAT_CELLS = round(180 / CELL_DEGREES)
+_LON_CELLS = round(360 / CELL_DEGREES)
+
+# columns of `scooters` the index keeps, in entry order
+FIELDS = ("latitude", "longitude", "soc", "out_of_service")
+
+_HALF_RADIAN = math.pi / 360  # half a degree, in radians
+
+
+def _cell(lat: float, lon: float) -> tuple:
+    return (
+        min(int((lat + 90) / CELL_DEGREES), _LAT_CELLS - 1),
+        int((lon + 180) / CELL_DEGREES) % _LON_CELLS,
+    )
+
+
+def _entry(values) -> tuple:
+    lat, lon, soc, out_of_service = values
+    lat = float(lat)
+    # cos(latitude) is kept with the entry for the distance formula
+    return (
+        lat,
+        float(lon),
+        float(soc),
+        bool(int(out_of_service)),
+        math.cos(math.radians(lat)),
+    )
+
+
+def _to_a(metres: float) -> float:
+    """
+    The haversine of a distance (the `a` of the formula). Distances are
+    compared as `a`, which grows with them, so the asin and square root are
+    only taken for the results.
+    """
+    return math.sin(min(metres / (2 * EARTH_RADIUS_M), math.pi / 2)) ** 2
+
+
+def _to_metres(a: float) -> float:
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class FleetIndex:
+    """
+    Scooter id -> (latitude, longitude, soc, out_of_service), plus the ids per
+    grid cell. Queries return (distance in metres, scooter id) pairs, nearest
+    first; "available" means in service with at least `min_soc` charge.
+    """
+
+    def __init__(self):
+        self.built = False
+        self._entries = {}
+        self._cells = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def build(self) -> int:
+        """(Re)load every scooter. Returns how many were indexed."""
+        entries = {}
+        cells = {}
+        with get_read_connection() as conn:
+            cursor = conn.execute(f"SELECT id, {', '.join(FIELDS)} FROM scooters")
+            for row_id, *values in stream_rows(cursor):
+                entry = entries[row_id] = _entry(values)
+                cells.setdefault(_cell(entry[0], entry[1]), []).append(row_id)
+        with self._lock:
+            self._entries, self._cells = entries, cells
+            self.built = True
+        return len(entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries, self._cells = {}, {}
+            self.built = False
+
+    def upsert(self, row_id: int, values: dict):
+        """
+        Patch one scooter with the FIELDS among `values` (other keys are
+        ignored); a new scooter needs all of them.
+        """
+        self.upsert_many({row_id: values})
+
+    def upsert_many(self, changes: dict):
+        """upsert for {id: values}, under a single hold of the lock."""
+        if not self.built:
+            return
+        with self._lock:
+            for row_id, values in changes.items():
+                if not any(field in values for field in FIELDS):
+                    continue
+                old = self._entries.get(row_id)
+                if old is None:
+                    if not all(field in values for field in FIELDS):
+                        continue
+                    old_cell = None
+                    old = (None,) * len(FIELDS)
+                else:
+                    old_cell = _cell(old[0], old[1])
+                entry = _entry(
+                    values.get(field, old[i]) for i, field in enumerate(FIELDS)
+                )
+                self._entries[row_id] = entry
+
+                cell = _cell(entry[0], entry[1])
+                if cell != old_cell:
+                    if old_cell is not None:
+                        self._discard(old_cell, row_id)
+                    self._cells.setdefault(cell, []).append(row_id)
+
+    def remove(self, row_id: int):
+        if not self.built:
+            return
+        with self._lock:
+            entry = self._entries.pop(row_id, None)
+            if entry is not None:
+                self._discard(_cell(entry[0], entry[1]), row_id)
+
+    def get(self, row_id: int) -> dict:
+        entry = self._entries.get(row_id)
+        return dict(zip(FIELDS, entry)) if entry else None
+
+    def _discard(self, cell: tuple, row_id: int):
+        # Cells hold a handful of ids, so a list is smaller than a set and
+        # just as quick to search
+        ids = self._cells[cell]
+        ids.remove(row_id)
+        if not ids:
+            del self._cells[cell]
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        max_radius: float = 5_000,
+        only_available: bool = True,
+        min_soc: float = 0.0,
+    ) -> list:
+        """
+        The k nearest scooters within max_radius metres. Rings of cells are
+        searched outwards until nothing outside them can be closer than the
+        k-th scooter found.
+        """
+        cells = sum(
+            len(rows) * len(columns)
+            for rows, columns in map(_box_cells, bounding_boxes(lat, lon, max_radius))
+        )
+        if cells > len(self._cells):
+            # Few occupied cells (a small fleet, or near a pole): checking
+            # all of them within the radius is cheaper than walking rings
+            return self.within(lat, lon, max_radius, only_available, min_soc)[:k]
+
+        center = _cell(lat, lon)
+        cos_lat = math.cos(math.radians(lat))
+        limit = _to_a(max_radius)
+        sin = math.sin
+        best = []  # max-heap of the k closest so far, as (-a, -id)
+        ring = 0
+        with self._lock:
+            entries, grid = self._entries, self._cells
+            while True:
+                for cell in _ring(center, ring):
+                    for row_id in grid.get(cell, ()):
+                        row_lat, row_lon, soc, out_of_service, row_cos = entries[row_id]
+                        if only_available and (out_of_service or soc < min_soc):
+                            continue
+                        a = (
+                            sin((row_lat - lat) * _HALF_RADIAN) ** 2
+                            + cos_lat
+                            * row_cos
+                            * sin((row_lon - lon) * _HALF_RADIAN) ** 2
+                        )
+                        if a > limit:
+                            continue
+                        # Ties go to the lower id, as in the R*Tree search
+                        if len(best) < k:
+                            heapq.heappush(best, (-a, -row_id))
+                        elif (-a, -row_id) > best[0]:
+                            heapq.heapreplace(best, (-a, -row_id))
+
+                reach = _ring_reach(lat, lon, center, ring)
+                if (
+                    reach >= max_radius
+                    or (len(best) == k and _to_a(reach) >= -best[0][0])
+                    or 2 * ring + 1 >= _LON_CELLS
+                ):
+                    break
+                ring += 1
+        return sorted((_to_metres(-a), -row_id) for a, row_id in best)
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius: float,
+        only_available: bool = True,
+        min_soc: float = 0.0,
+    ) -> list:
+        """Every scooter within `radius` metres."""
+        cos_lat = math.cos(math.radians(lat))
+        limit = _to_a(radius)
+        sin = math.sin
+        found = []
+        with self._lock:
+            entries, grid = self._entries, self._cells
+            for box in bounding_boxes(lat, lon, radius):
+                lat_cells, lon_cells = _box_cells(box)
+                if len(lat_cells) * len(lon_cells) > len(grid):
+                    # Huge boxes: walk the occupied cells instead
+                    cells = [
+                        cell
+                        for cell in grid
+                        if cell[0] in lat_cells and cell[1] in lon_cells
+                    ]
+                else:
+                    cells = [(i, j) for i in lat_cells for j in lon_cells]
+
+                for cell in cells:
+                    for row_id in grid.get(cell, ()):
+                        row_lat, row_lon, soc, out_of_service, row_cos = entries[row_id]
+                        if only_available and (out_of_service or soc < min_soc):
+                            continue
+                        a = (
+                            sin((row_lat - lat) * _HALF_RADIAN) ** 2
+                            + cos_lat
+                            * row_cos
+                            * sin((row_lon - lon) * _HALF_RADIAN) ** 2
+                        )
+                        if a <= limit:
+                            found.append((a, row_id))
+        found.sort()
+        return [(_to_metres(a), row_id) for a, row_id in found]
+
+
+def _box_cells(box: tuple) -> tuple:
+    """The ranges of lat and lon cells a bounding box overlaps."""
+    min_lat, max_lat, min_lon, max_lon = box
+
+    def index(degrees, offset, cells):
+        # Not wrapped: a box ending at 180 degrees ends in the last cell
+        return min(int((degrees + offset) / CELL_DEGREES), cells - 1)
+
+    return (
+        range(index(min_lat, 90, _LAT_CELLS), index(max_lat, 90, _LAT_CELLS) + 1),
+        range(index(min_lon, 180, _LON_CELLS), index(max_lon, 180, _LON_CELLS) + 1),
+    )
+
+
+def _ring(center: tuple, ring: int):
+    """The cells exactly `ring` cells away from `center`."""
+    ci, cj = center
+    if ring == 0:
+        yield center
+        return
+    for i in range(ci - ring, ci + ring + 1):
+        if not 0 <= i < _LAT_CELLS:
+            continue
+        if i in (ci - ring, ci + ring):
+            columns = range(cj - ring, cj + ring + 1)
+        else:
+            columns = (cj - ring, cj + ring)
+        for j in columns:
+            yield (i, j % _LON_CELLS)
+
+
+def _ring_reach(lat: float, lon: float, center: tuple, ring: int) -> float:
+    """
+    Lower bound in metres on the distance from (lat, lon) to any point
+    outside the cells up to `ring` away from its cell.
+    """
+    ci, cj = center
+    bounds = []
+
+    south = (ci - ring) * CELL_DEGREES - 90
+    north = (ci + ring + 1) * CELL_DEGREES - 90
+    if south > -90:
+        bounds.append(lat - south)
+    if north < 90:
+        bounds.append(north - lat)
+    reach = math.radians(min(bounds)) * EARTH_RADIUS_M if bounds else math.inf
+
+    # Distance to the nearest meridian bounding the ring: asin(cos(lat) *
+    # sin(dlon)) on the unit sphere, wherever on the meridian it is reached
+    offset = (lon + 180) - cj * CELL_DEGREES
+    dlon = min(offset, CELL_DEGREES - offset) + ring * CELL_DEGREES
+    if dlon < 90:
+        across = math.cos(math.radians(lat)) * math.sin(math.radians(dlon))
+        reach = min(reach, math.asin(min(1.0, across)) * EARTH_RADIUS_M)
+    return reach
+
+
+fleet = FleetIndex()
@@ -0,0 +1,196 @@
+import heapq
+import math
+from db.database import get_read_connection
+from Models.rows import ScooterRow
+
+# Scooter locations in an R*Tree, for nearest-scooter queries without
+# loading the fleet. Triggers on `scooters` keep it in sync on every insert,
+# update and delete, whichever code path writes. The R*Tree stores 32-bit
+# floats rounded outwards, so it only prefilters by bounding box; distances
+# are computed exactly from the scooters' own columns.
+GEO_TABLE = "scooter_locations"
+
+EARTH_RADIUS_M = 6_371_000
+# Search radius of the first round; it doubles until k scooters are found
+# or max_radius is reached
+START_RADIUS_M = 250
+
+
+def create_geo_index(cur):
+    """Create the R*Tree and its triggers, and index the existing scooters."""
+    cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (GEO_TABLE,),
+    )
+    exists = cur.fetchone()
+    cur.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {GEO_TABLE} "
+        "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+    )
+    location = "new.id, new.latitude, new.latitude, new.longitude, new.longitude"
+    cur.execute(
+        f"""
+    CREATE TRIGGER IF NOT EXISTS scooters_location_insert
+    AFTER INSERT ON scooters BEGIN
+        INSERT INTO {GEO_TABLE} VALUES ({location});
+    END
+    """
+    )
+    create_update_trigger(cur)
+    cur.execute(
+        f"""
+    CREATE TRIGGER IF NOT EXISTS scooters_location_delete
+    AFTER DELETE ON scooters BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+    END
+    """
+    )
+    if not exists:
+        cur.execute(
+            f"INSERT INTO {GEO_TABLE} "
+            "SELECT id, latitude, latitude, longitude, longitude FROM scooters"
+        )
+        print(f"[INFO] Indexed {cur.rowcount} scooter locations.")
+
+
+def create_update_trigger(cur):
+    """
+    (Re)create the trigger that moves a scooter in the R*Tree. Rows whose
+    location does not change, such as the frequent reports of parked
+    scooters, leave the R*Tree alone.
+    """
+    location = "new.id, new.latitude, new.latitude, new.longitude, new.longitude"
+    cur.execute("DROP TRIGGER IF EXISTS scooters_location_update")
+    cur.execute(
+        f"""
+    CREATE TRIGGER scooters_location_update
+    AFTER UPDATE OF id, latitude, longitude ON scooters
+    WHEN old.id IS NOT new.id
+        OR old.latitude IS NOT new.latitude
+        OR old.longitude IS NOT new.longitude
+    BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+        INSERT INTO {GEO_TABLE} VALUES ({location});
+    END
+    """
+    )
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat: float, lon: float, radius: float) -> list:
+    """
+    (min_lat, max_lat, min_lon, max_lon) boxes covering every point within
+    `radius` metres: two of them when the circle crosses the antimeridian,
+    all longitudes when it reaches a pole.
+    """
+    dlat = math.degrees(radius / EARTH_RADIUS_M)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return [(max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0)]
+
+    # Longitude degrees shrink towards the poles; the widest point of the
+    # circle is at the latitude closest to one
+    dlon = math.degrees(
+        radius
+        / (EARTH_RADIUS_M * math.cos(math.radians(max(abs(min_lat), abs(max_lat)))))
+    )
+    if dlon >= 180:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [
+            (min_lat, max_lat, -180.0, max_lon),
+            (min_lat, max_lat, min_lon + 360, 180.0),
+        ]
+    if max_lon > 180:
+        return [
+            (min_lat, max_lat, min_lon, 180.0),
+            (min_lat, max_lat, -180.0, max_lon - 360),
+        ]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def _within(conn, lat, lon, radius, only_in_service) -> list:
+    condition = "AND s.out_of_service = 0" if only_in_service else ""
+    found = []
+    for box in bounding_boxes(lat, lon, radius):
+        cursor = conn.execute(
+            f"SELECT s.id, s.latitude, s.longitude FROM {GEO_TABLE} g "
+            "JOIN scooters s ON s.id = g.id "
+            "WHERE g.max_lat >= ? AND g.min_lat <= ? "
+            f"AND g.max_lon >= ? AND g.min_lon <= ? {condition}",
+            box,
+        )
+        for row_id, row_lat, row_lon in cursor:
+            distance = haversine(lat, lon, row_lat, row_lon)
+            if distance <= radius:
+                found.append((distance, row_id))
+    return found
+
+
+def _with_rows(conn, nearest: list) -> list:
+    """(distance, id) pairs as (distance, ScooterRow) pairs, in the same order."""
+    if not nearest:
+        return []
+    ids = [row_id for _, row_id in nearest]
+    cursor = conn.execute(
+        f"{ScooterRow.select_sql()} WHERE id IN ({', '.join('?' for _ in ids)})",
+        ids,
+    )
+    rows = {row.id: row for row in ScooterRow.wrap_all(cursor.fetchall())}
+    return [(distance, rows[row_id]) for distance, row_id in nearest]
+
+
+def find_nearest(
+    lat: float,
+    lon: float,
+    k: int = 5,
+    max_radius: float = 5_000,
+    only_in_service: bool = True,
+) -> list:
+    """
+    The k scooters closest to (lat, lon) within max_radius metres, nearest
+    first, as (distance in metres, ScooterRow) pairs. The search starts at
+    START_RADIUS_M and doubles the radius until k scooters are inside it, so
+    dense areas only look at the scooters around the point.
+    """
+    with get_read_connection() as conn:
+        radius = min(START_RADIUS_M, max_radius)
+        while True:
+            found = _within(conn, lat, lon, radius, only_in_service)
+            # Whatever lies outside the radius is further away than these
+            if len(found) >= k or radius >= max_radius:
+                break
+            radius = min(radius * 2, max_radius)
+        return _with_rows(conn, heapq.nsmallest(k, found))
+
+
+def find_nearest_resident(
+    lat: float,
+    lon: float,
+    k: int = 5,
+    max_radius: float = 5_000,
+    only_in_service: bool = True,
+) -> list:
+    """
+    find_nearest answered from the resident fleet index (Utils.fleetIndex)
+    instead of the R*Tree; the first call builds it. The index only follows
+    writes made by this process, so scooters moved by another one show up
+    where they were when it was built.
+    """
+    from Utils.fleetIndex import fleet
+
+    if not fleet.built:
+        fleet.build()
+    nearest = fleet.nearest(lat, lon, k, max_radius, only_in_service)
+    with get_read_connection() as conn:
+        return _with_rows(conn, nearest)
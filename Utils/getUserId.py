@@ -8,25 +8,20 @@ logger = Logger()
 
 def get_user_id_by_username(input_username: str):
     """
-    Retrieve a user's ID by comparing decrypted usernames.
+    Retrieve a user's ID through the username blind index, so the lookup is a
+    single indexed query instead of decrypting every stored username.
     Returns the user ID if found, or None otherwise.
     """
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id, username FROM users")
-            rows = cursor.fetchall()
+            cursor.execute(
+                "SELECT id FROM users WHERE username_bidx = ?",
+                (encryptor.blind_index(input_username, "username"),),
+            )
+            row = cursor.fetchone()
 
-        for user_id, encrypted_username in rows:
-            try:
-                decrypted_username = encryptor.decrypt_text(encrypted_username.encode())
-            except Exception as e:
-                continue
-
-            if decrypted_username.lower() == input_username.lower():
-                return user_id
-
-        return None
+        return row[0] if row else None
 
     except Exception as e:
         print(f"[ERROR] Failed to get user id: {e}")
@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from db.database import transaction
+from Utils.encryption import Encryptor, pin_index_keys, retire_keys, write_keys
+from Utils.logger import LOG_FILE, log_lock
+from Utils.rowEnvelope import ENVELOPE_TABLES
+
+encryptor = Encryptor()
+
+# Encrypted columns per table. Rows are walked in rowid order, so the
+# checkpoint is simply the last rowid that was re-encrypted.
+ROTATED_COLUMNS = {
+    "users": ["username", "password_hash", "role"],
+    "profiles": ["first_name", "last_name", "registration_date"],
+    "scooters": [
+        "brand",
+        "model",
+        "serial_number",
+        "last_maintenance",
+        "in_service_date",
+    ],
+    "travellers": [
+        "first_name",
+        "last_name",
+        "birthday",
+        "gender",
+        "street_name",
+        "house_number",
+        "zip_code",
+        "city",
+        "email",
+        "mobile_phone",
+        "driving_license_number",
+    ],
+    "dictionary": ["value"],
+}
+
+# Checkpoint name used for the encrypted log file
+LOG_CHECKPOINT = "logs.enc"
+
+BATCH_SIZE = 200
+MAX_ROWS_PER_SECOND = 2000  # keeps the interactive menus responsive
+
+
+def _create_checkpoint_table(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS key_rotation (
+        table_name TEXT PRIMARY KEY,
+        last_rowid INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0
+    )
+    """
+    )
+
+
+def _rotate_value(value, text: bool = False):
+    """
+    Re-encrypt a token under the primary key and the current cipher backend,
+    in the current column storage form (or as base64 text with text=True);
+    anything else is left as is.
+    """
+    if value is None:
+        return value
+    try:
+        if text:
+            return encryptor.rotate_token(value)
+        return encryptor.encrypt_value(encryptor.decrypt_text(value))
+    except (InvalidToken, ValueError, TypeError):
+        # plaintext such as password hashes or legacy rows
+        return value
+
+
+def _rotate_envelope(table: str, row_id: int, envelope):
+    if envelope is None:
+        return envelope
+    return encryptor.rotate_record(envelope, f"{table}:{row_id}")
+
+
+def _throttle(started: float, rows: int, max_rows_per_second: float):
+    if max_rows_per_second:
+        remaining = rows / max_rows_per_second - (time.monotonic() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def start_rotation() -> bool:
+    """
+    Make a fresh key the primary one. The old key stays listed for decryption
+    until every table and the log file have been re-encrypted.
+    """
+    if len(encryptor.entry.keys) > 1:
+        print("[INFO] A key rotation is already in progress. Resume it with 'run'.")
+        return False
+
+    pin_index_keys(encryptor.key_file)
+
+    with transaction(immediate=True) as conn:
+        cur = conn.cursor()
+        _create_checkpoint_table(cur)
+        cur.execute("DELETE FROM key_rotation")
+        cur.executemany(
+            "INSERT INTO key_rotation (table_name) VALUES (?)",
+            [(name,) for name in [*ROTATED_COLUMNS, LOG_CHECKPOINT]],
+        )
+
+    write_keys(encryptor.key_file, [Fernet.generate_key(), *encryptor.entry.keys])
+    encryptor.entry.load()
+    print("[INFO] New encryption key is active. Run 'run' to re-encrypt data.")
+    return True
+
+
+def _rotate_table(
+    table: str, last_rowid: int, batch_size: int, max_rows_per_second: float
+):
+    columns = ROTATED_COLUMNS[table]
+    sealed = table in ENVELOPE_TABLES
+    if sealed:
+        columns = [*columns, "sealed"]
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    rotated = 0
+
+    while True:
+        started = time.monotonic()
+        # One short write transaction per batch, committed together with
+        # its checkpoint, so a crash never loses or repeats a batch.
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT rowid, {', '.join(columns)} FROM {table} "
+                f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size),
+            )
+            rows = cur.fetchall()
+
+            if rows:
+                updates = []
+                for row in rows:
+                    values = [_rotate_value(v) for v in row[1:]]
+                    if sealed:
+                        # Envelopes are re-sealed rather than rotated as tokens
+                        values[-1] = _rotate_envelope(table, row[0], row[-1])
+                    updates.append((*values, row[0]))
+                cur.executemany(
+                    f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates
+                )
+                last_rowid = rows[-1][0]
+                cur.execute(
+                    "UPDATE key_rotation SET last_rowid = ? WHERE table_name = ?",
+                    (last_rowid, table),
+                )
+            else:
+                cur.execute(
+                    "UPDATE key_rotation SET done = 1 WHERE table_name = ?", (table,)
+                )
+
+        if not rows:
+            break
+        rotated += len(rows)
+        _throttle(started, len(rows), max_rows_per_second)
+
+    print(f"[INFO] Re-encrypted {rotated} rows in {table}.")
+
+
+def _rotate_log_file(batch_size: int, max_rows_per_second: float):
+    # The logger waits while the file is rewritten: an entry appended or a
+    # mark_as_read rewrite in between would be lost at os.replace
+    with log_lock:
+        _rewrite_log_file(batch_size, max_rows_per_second)
+
+    with transaction(immediate=True) as conn:
+        conn.execute(
+            "UPDATE key_rotation SET done = 1 WHERE table_name = ?",
+            (LOG_CHECKPOINT,),
+        )
+
+
+def _rewrite_log_file(batch_size: int, max_rows_per_second: float):
+    if os.path.exists(LOG_FILE):
+        tmp_file = LOG_FILE + ".rotating"
+        rotated = 0
+        with open(LOG_FILE, "rb") as src, open(tmp_file, "wb") as dst:
+            started = time.monotonic()
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                dst.write(_rotate_value(line, text=True) + b"\n")
+                rotated += 1
+                if rotated % batch_size == 0:
+                    _throttle(started, batch_size, max_rows_per_second)
+                    started = time.monotonic()
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_file, LOG_FILE)
+        print(f"[INFO] Re-encrypted {rotated} log entries.")
+
+
+def run_rotation(batch_size=BATCH_SIZE, max_rows_per_second=MAX_ROWS_PER_SECOND):
+    """Re-encrypt everything still pending, resuming from the last checkpoint."""
+    with transaction() as conn:
+        cur = conn.cursor()
+        _create_checkpoint_table(cur)
+        cur.execute(
+            "SELECT table_name, last_rowid FROM key_rotation WHERE done = 0 ORDER BY rowid"
+        )
+        pending = cur.fetchall()
+
+    if not pending:
+        print("[INFO] Nothing left to re-encrypt.")
+        return
+
+    for name, last_rowid in pending:
+        if name == LOG_CHECKPOINT:
+            _rotate_log_file(batch_size, max_rows_per_second)
+        else:
+            _rotate_table(name, last_rowid, batch_size, max_rows_per_second)
+
+
+def reencrypt_database(batch_size=BATCH_SIZE):
+    """
+    Re-encrypt every table under the primary key in one go, for a database
+    whose values may use retired keys, such as a restored backup. Checkpoints
+    it carries from a rotation running when it was made are dropped.
+    """
+    with transaction(immediate=True) as conn:
+        cur = conn.cursor()
+        _create_checkpoint_table(cur)
+        cur.execute("DELETE FROM key_rotation")
+    for table in ROTATED_COLUMNS:
+        _rotate_table(table, 0, batch_size, None)
+
+
+def rotation_status() -> list:
+    with transaction() as conn:
+        cur = conn.cursor()
+        _create_checkpoint_table(cur)
+        cur.execute("SELECT table_name, last_rowid, done FROM key_rotation")
+        return cur.fetchall()
+
+
+def finish_rotation() -> bool:
+    """
+    Drop the old keys once everything is re-encrypted. They are moved to
+    "<key file>.retired" and stay loaded for decryption only, because
+    backups made before the rotation still need them to be restored.
+    """
+    status = rotation_status()
+    if any(not done for _, _, done in status):
+        print("[ERROR] Rotation is not complete yet. Run 'run' first.")
+        return False
+
+    keys = encryptor.entry.keys
+    if len(keys) > 1:
+        retire_keys(encryptor.key_file, keys[1:])
+        write_keys(encryptor.key_file, keys[:1])
+        encryptor.entry.load()
+
+    with transaction(immediate=True) as conn:
+        conn.execute("DELETE FROM key_rotation")
+
+    print("[INFO] Key rotation finished. Old keys moved to the retired key file.")
+    return True
+
+
+def main():
+    # python -m Utils.keyRotation start | run [rows_per_second] | status | finish
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "start":
+        start_rotation()
+    elif command == "run":
+        rate = float(sys.argv[2]) if len(sys.argv) > 2 else MAX_ROWS_PER_SECOND
+        run_rotation(max_rows_per_second=rate)
+    elif command == "finish":
+        finish_rotation()
+    elif command == "status":
+        status = rotation_status()
+        if not status:
+            print("No key rotation in progress.")
+        for name, last_rowid, done in status:
+            print(f"{name}: {'done' if done else f'at rowid {last_rowid}'}")
+    else:
+        print(f"[ERROR] Unknown command '{command}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,67 @@
 import os
+import threading
 from datetime import datetime
+from db.pagination import PAGE_SIZE
 from Utils.encryption import Encryptor
 
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
 LOG_FILE = "data/logs.enc"
 
 
+class _LogLock:
+    """
+    Held by anything that appends to or rewrites LOG_FILE, so a rewrite
+    never drops an entry appended while it ran. Key rotation runs in its own
+    process, so besides a thread lock this locks "<log file>.lock" on disk.
+    Re-entrant within a thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            self._file = open(LOG_FILE + ".lock", "a+b")
+            if msvcrt:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after about ten seconds; a
+                        # rotation can hold the lock for longer
+                        continue
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if msvcrt:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+log_lock = _LogLock()
+
+
 class Logger:
     def __init__(self, encryptor: Encryptor = None):
         self.encryptor = encryptor or Encryptor()
@@ -19,7 +76,7 @@ class Logger:
         )
 
         encrypted = self.encryptor.encrypt_text(entry)
-        with open(LOG_FILE, "ab") as f:
+        with log_lock, open(LOG_FILE, "ab") as f:
             f.write(encrypted + b"\n")
 
     def read_logs(self, only_suspicious=False):
@@ -44,7 +101,43 @@ class Logger:
                     continue
         return logs
 
+    def read_log_page(self, offset=0, page_size=PAGE_SIZE, only_suspicious=False):
+        """
+        One page of log entries starting at a byte offset in the log file.
+        Returns (entries, offset of the next page), the latter None at the
+        end. Seeking to the offset keeps later pages as cheap as the first.
+        """
+        if not os.path.exists(LOG_FILE):
+            return [], None
+
+        logs = []
+        with open(LOG_FILE, "rb") as f:
+            f.seek(offset)
+            while len(logs) < page_size:
+                line = f.readline()
+                if not line:
+                    return logs, None
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    parts = self.encryptor.decrypt_text(line).split("|")
+                except Exception:
+                    continue
+                if len(parts) < 6:
+                    continue
+                if only_suspicious and parts[4] != "Yes":
+                    continue
+                logs.append(parts)
+
+            offset = f.tell()
+            return logs, offset if f.readline() else None
+
     def mark_as_read(self):
+        with log_lock:
+            self._mark_as_read()
+
+    def _mark_as_read(self):
         if not os.path.exists(LOG_FILE):
             return
 
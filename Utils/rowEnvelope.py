@@ -0,0 +1,225 @@
+import sys
+from Models.rows import TravellerRow
+from Utils import dictionary
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+# Tables that can store their encrypted columns as one sealed envelope per
+# row instead of one token per column. The envelope holds the values
+# of the row class's ENCRYPTED columns, in that order; the columns themselves
+# are left empty. Search tokens and blind indexes are kept separately.
+ENVELOPE_TABLES = {
+    "travellers": TravellerRow,
+}
+
+BATCH_SIZE = 200
+
+
+def _context(table: str, row_id: int) -> str:
+    return f"{table}:{row_id}"
+
+
+def _create_format_table(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS record_format (
+        table_name TEXT PRIMARY KEY,
+        sealed INTEGER NOT NULL DEFAULT 0
+    )
+    """
+    )
+
+
+def ensure_envelope_columns(cur):
+    """Add the `sealed` column to tables that do not have it yet."""
+    _create_format_table(cur)
+    for table in ENVELOPE_TABLES:
+        cur.execute(f"PRAGMA table_info({table})")
+        if "sealed" not in {row[1] for row in cur.fetchall()}:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN sealed TEXT")
+
+
+def envelope_enabled(cur, table: str) -> bool:
+    """True if new writes to the table should be sealed."""
+    if table not in ENVELOPE_TABLES:
+        return False
+    _create_format_table(cur)
+    cur.execute("SELECT sealed FROM record_format WHERE table_name = ?", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def _set_format(cur, table: str, sealed: bool):
+    _create_format_table(cur)
+    cur.execute(
+        "INSERT OR REPLACE INTO record_format (table_name, sealed) VALUES (?, ?)",
+        (table, int(sealed)),
+    )
+
+
+def seal_row(cur, table: str, row_id: int, values: dict):
+    """Store all encrypted values of a row as one envelope."""
+    row_cls = ENVELOPE_TABLES[table]
+    envelope = encryptor.seal_record(
+        [values[name] for name in row_cls.ENCRYPTED], _context(table, row_id)
+    )
+    assignments = ", ".join(f"{name} = ''" for name in row_cls.ENCRYPTED)
+    cur.execute(
+        f"UPDATE {table} SET {assignments}, sealed = ? WHERE id = ?",
+        (envelope, row_id),
+    )
+
+
+def unseal_row(cur, table: str, row_id: int, values: dict):
+    """Store the values of a row as one token per column again."""
+    row_cls = ENVELOPE_TABLES[table]
+    columns = {
+        name: encryptor.encrypt_value(values[name])
+        for name in row_cls.ENCRYPTED
+        if name not in row_cls.CODES
+    }
+    columns.update(dictionary.encode_values(cur, table, values))
+    assignments = ", ".join(f"{name} = ?" for name in columns)
+    cur.execute(
+        f"UPDATE {table} SET {assignments}, sealed = NULL WHERE id = ?",
+        (*columns.values(), row_id),
+    )
+
+
+def update_field(cur, table: str, row_id, field: str, value: str) -> bool:
+    """
+    Update one encrypted column in whichever format the row is stored in.
+    While the table is in envelope mode, rows still in the column format are
+    sealed as part of the update. Returns False if the row does not exist.
+    """
+    row_cls = ENVELOPE_TABLES[table]
+    cur.execute(f"{row_cls.select_sql()} WHERE id = ?", (row_id,))
+    raw = cur.fetchone()
+    if raw is None:
+        return False
+
+    row = row_cls(raw)
+    if row.sealed is None and not envelope_enabled(cur, table):
+        # Columns of this row still written by an older backend are upgraded
+        # in the same statement
+        columns = row.upgraded_columns()
+        if field in row_cls.CODES:
+            columns.update(dictionary.encode_values(cur, table, {field: value}))
+        else:
+            columns[field] = encryptor.encrypt_value(value)
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        cur.execute(
+            f"UPDATE {table} SET {assignments} WHERE id = ?",
+            (*columns.values(), row.id),
+        )
+        return True
+
+    values = row.encrypted_values()
+    values[field] = value
+    seal_row(cur, table, row.id, values)
+    if field in row_cls.CODES:
+        code_column = row_cls.CODES[field]
+        cur.execute(
+            f"UPDATE {table} SET {code_column} = ? WHERE id = ?",
+            (dictionary.encode(cur, table, field, value), row.id),
+        )
+    return True
+
+
+def migrate(table: str, seal: bool = True, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Convert every row of `table` to the envelope format (or back with
+    seal=False) in short batches, and switch the format used for new writes.
+    Rows already converted are skipped, so an interrupted run can be resumed.
+    """
+    from db.database import transaction
+
+    row_cls = ENVELOPE_TABLES[table]
+    condition = "sealed IS NULL" if seal else "sealed IS NOT NULL"
+    converted = 0
+
+    with transaction(immediate=True) as conn:
+        cur = conn.cursor()
+        ensure_envelope_columns(cur)
+        # Switch first, so rows written while the migration runs are
+        # already in the target format
+        _set_format(cur, table, seal)
+
+    last_id = 0
+    while True:
+        # One write transaction per batch, so other writers get a turn
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"{row_cls.select_sql()} WHERE {condition} AND id > ? "
+                f"ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            )
+            rows = list(row_cls.wrap_all(cur.fetchall()))
+            for row in rows:
+                if seal:
+                    seal_row(cur, table, row.id, row.encrypted_values())
+                else:
+                    unseal_row(cur, table, row.id, row.encrypted_values())
+        if not rows:
+            break
+        last_id = rows[-1].id
+        converted += len(rows)
+
+    print(
+        f"[INFO] Converted {converted} rows in {table} to the "
+        f"{'envelope' if seal else 'column'} format."
+    )
+    return converted
+
+
+def storage_stats(table: str) -> dict:
+    """Row counts and average stored bytes of the encrypted data per format."""
+    from db.database import transaction
+
+    row_cls = ENVELOPE_TABLES[table]
+    column_bytes = " + ".join(
+        f"COALESCE(LENGTH({name}), 0)" for name in row_cls.ENCRYPTED
+    )
+    with transaction() as conn:
+        cur = conn.cursor()
+        ensure_envelope_columns(cur)
+        cur.execute(
+            f"SELECT sealed IS NOT NULL, COUNT(*), "
+            f"AVG({column_bytes} + COALESCE(LENGTH(sealed), 0)) "
+            f"FROM {table} GROUP BY sealed IS NOT NULL"
+        )
+        stats = {"column": (0, 0.0), "envelope": (0, 0.0)}
+        for sealed, count, avg_bytes in cur.fetchall():
+            stats["envelope" if sealed else "column"] = (count, avg_bytes)
+        stats["enabled"] = envelope_enabled(cur, table)
+    return stats
+
+
+def main():
+    # python -m Utils.rowEnvelope seal | unseal | status [table]
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    tables = sys.argv[2:] or list(ENVELOPE_TABLES)
+
+    for table in tables:
+        if table not in ENVELOPE_TABLES:
+            print(f"[ERROR] Table '{table}' does not support envelopes.")
+            continue
+        if command == "seal":
+            migrate(table, seal=True)
+        elif command == "unseal":
+            migrate(table, seal=False)
+        elif command == "status":
+            stats = storage_stats(table)
+            print(f"{table}: new rows {'sealed' if stats['enabled'] else 'per column'}")
+            for name in ("column", "envelope"):
+                count, avg_bytes = stats[name]
+                print(f"  {name:>8}: {count} rows, {avg_bytes or 0:.0f} bytes/row")
+        else:
+            print(f"[ERROR] Unknown command '{command}'.")
+            return
+
+
+if __name__ == "__main__":
+    main()
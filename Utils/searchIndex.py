@@ -0,0 +1,207 @@
+import sys
+from db.database import stream_rows
+from Models.rows import ScooterRow, TravellerRow
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+# Substring search over encrypted columns.
+# table -> (token table, id column, indexed columns)
+SEARCH_INDEXES = {
+    "scooters": ("scooter_search_tokens", "scooter_id", ["brand", "model"]),
+    "travellers": (
+        "traveller_search_tokens",
+        "traveller_id",
+        ["first_name", "last_name"],
+    ),
+}
+
+ROW_TYPES = {"scooters": ScooterRow, "travellers": TravellerRow}
+
+# Bigrams serve two-character search terms, trigrams everything longer.
+GRAM_SIZES = (2, 3)
+
+
+def _grams(value: str, sizes=GRAM_SIZES) -> set:
+    value = value.strip().lower()
+    return {value[i : i + n] for n in sizes for i in range(len(value) - n + 1)}
+
+
+def _query_grams(term: str) -> set:
+    term = term.strip().lower()
+    if len(term) < min(GRAM_SIZES):
+        return set()
+    if len(term) < max(GRAM_SIZES):
+        return {term}
+    return _grams(term, (max(GRAM_SIZES),))
+
+
+def create_search_tables(cur):
+    """
+    Create the token side tables. Returns the names of the base tables whose
+    token table did not exist yet, so the caller can rebuild them.
+    """
+    created = []
+    for table, (token_table, id_column, _) in SEARCH_INDEXES.items():
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (token_table,),
+        )
+        if cur.fetchone():
+            continue
+
+        cur.execute(
+            f"""
+        CREATE TABLE {token_table} (
+            token TEXT NOT NULL,
+            field TEXT NOT NULL,
+            {id_column} INTEGER NOT NULL,
+            PRIMARY KEY (token, field, {id_column})
+        ) WITHOUT ROWID
+        """
+        )
+        cur.execute(
+            f"CREATE INDEX idx_{token_table}_{id_column} ON {token_table}({id_column})"
+        )
+        created.append(table)
+    return created
+
+
+def index_row(cur, table: str, row_id: int, values: dict):
+    """
+    (Re)index the given plaintext column values of one row. Only the columns
+    passed in are touched, so an update of one field keeps the others intact.
+    """
+    token_table, id_column, columns = SEARCH_INDEXES[table]
+    for field, value in values.items():
+        if field not in columns:
+            continue
+        cur.execute(
+            f"DELETE FROM {token_table} WHERE {id_column} = ? AND field = ?",
+            (row_id, field),
+        )
+        cur.executemany(
+            f"INSERT OR IGNORE INTO {token_table} (token, field, {id_column}) VALUES (?, ?, ?)",
+            (
+                (encryptor.search_token(gram, f"{table}.{field}"), field, row_id)
+                for gram in _grams(value or "")
+            ),
+        )
+
+
+def index_new_rows(cur, table: str, rows):
+    """
+    Index many freshly inserted rows with a single executemany. `rows` holds
+    (row id, {column: plaintext}) pairs; rows must not have tokens yet.
+    """
+    token_table, id_column, columns = SEARCH_INDEXES[table]
+    # The same grams come back over and over in a batch (brands, cities,
+    # common names), so each token is computed once
+    tokens = {}
+
+    def token(gram, field):
+        key = (gram, field)
+        if key not in tokens:
+            tokens[key] = encryptor.search_token(gram, f"{table}.{field}")
+        return tokens[key]
+
+    cur.executemany(
+        f"INSERT OR IGNORE INTO {token_table} (token, field, {id_column}) VALUES (?, ?, ?)",
+        (
+            (token(gram, field), field, row_id)
+            for row_id, values in rows
+            for field in columns
+            if field in values
+            for gram in _grams(values[field] or "")
+        ),
+    )
+
+
+def remove_row(cur, table: str, row_id: int):
+    token_table, id_column, _ = SEARCH_INDEXES[table]
+    cur.execute(f"DELETE FROM {token_table} WHERE {id_column} = ?", (row_id,))
+
+
+def remove_rows(cur, table: str, row_ids):
+    token_table, id_column, _ = SEARCH_INDEXES[table]
+    cur.executemany(
+        f"DELETE FROM {token_table} WHERE {id_column} = ?",
+        ((row_id,) for row_id in row_ids),
+    )
+
+
+def candidate_subquery(table: str, term: str):
+    """
+    Build a subquery selecting the ids of rows whose indexed columns may contain
+    the term. Returns (sql, params), or None when the term is too short to be
+    served by the index. Candidates can be false positives, so callers still
+    compare the decrypted values.
+    """
+    grams = _query_grams(term)
+    if not grams:
+        return None
+
+    token_table, id_column, columns = SEARCH_INDEXES[table]
+    placeholders = ", ".join("?" for _ in grams)
+    parts = []
+    params = []
+    for field in columns:
+        parts.append(
+            f"SELECT {id_column} FROM {token_table} "
+            f"WHERE field = ? AND token IN ({placeholders}) "
+            f"GROUP BY {id_column} HAVING COUNT(*) = ?"
+        )
+        params.append(field)
+        params.extend(encryptor.search_token(g, f"{table}.{field}") for g in grams)
+        params.append(len(grams))
+
+    return " UNION ".join(parts), params
+
+
+def rebuild_search_index(cur, table: str):
+    token_table, _, columns = SEARCH_INDEXES[table]
+    row_type = ROW_TYPES[table]
+    cur.execute(f"DELETE FROM {token_table}")
+
+    # Read through a second cursor: the rows stream in while `cur` writes
+    # their tokens
+    reader = cur.connection.cursor()
+    # Migration 3 rebuilds before later migrations add columns the row
+    # class selects, such as the dictionary codes; those read as NULL
+    reader.execute(f"PRAGMA table_info({table})")
+    existing = {column[1] for column in reader.fetchall()}
+    selected = ", ".join(
+        name if name in existing else f"NULL AS {name}" for name in row_type.COLUMNS
+    )
+    reader.execute(f"SELECT {selected} FROM {table}")
+    count = 0
+
+    def indexed_rows():
+        nonlocal count
+        for row in row_type.wrap_all(stream_rows(reader), prefetch=columns):
+            count += 1
+            yield row.id, {field: getattr(row, field) for field in columns}
+
+    index_new_rows(cur, table, indexed_rows())
+
+    print(f"[INFO] Rebuilt search index for {table} ({count} rows).")
+
+
+def main():
+    # Rebuild command for existing databases:
+    #   python -m Utils.searchIndex [scooters|travellers]
+    from db.database import transaction
+
+    tables = sys.argv[1:] or list(SEARCH_INDEXES)
+    with transaction(immediate=True) as conn:
+        cur = conn.cursor()
+        create_search_tables(cur)
+        for table in tables:
+            if table not in SEARCH_INDEXES:
+                print(f"[ERROR] No search index for table '{table}'.")
+                continue
+            rebuild_search_index(cur, table)
+
+
+if __name__ == "__main__":
+    main()
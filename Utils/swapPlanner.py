@@ -0,0 +1,267 @@
+import math
+import sys
+import numpy as np
+from db.database import get_read_connection
+from Models.rows import ScooterRow
+from Utils.geoIndex import EARTH_RADIUS_M
+
+# Daily battery swap work lists: every scooter in service whose soc is
+# below its target_range_min, grouped by location into routes of at most MAX_STOPS,
+# each in a sensible visiting order. The candidates are clustered with
+# k-means (about MAX_STOPS scooters per cluster); the stops of a cluster are
+# ordered nearest neighbour first and improved with 2-opt. k-means cannot
+# split scooters parked at (nearly) one spot, so clusters still above
+# MAX_STOPS are cut into spatially sorted chunks before the ordering,
+# whose cost grows with the square of the cluster size.
+# Positions are projected onto a plane around the fleet's mean latitude,
+# which is accurate enough for a regional fleet.
+#   python -m Utils.swapPlanner [max stops] [crews]
+MAX_STOPS = 40
+KMEANS_ITERATIONS = 15
+# Points per block when assigning them to centroids, bounding the
+# distance matrix held at once
+ASSIGN_CHUNK = 4_096
+# Rounds of 2-opt swaps per cluster at most; each swap shortens the route
+MAX_ROUNDS = 50
+SEED = 0
+
+
+def load_candidates() -> dict:
+    """
+    The scooters below their target SoC, as arrays. Scooters out of service
+    wait for maintenance rather than a fresh battery, so they are left out.
+    """
+    with get_read_connection() as conn:
+        rows = conn.execute(
+            "SELECT id, latitude, longitude, soc, target_range_min FROM scooters "
+            "WHERE soc < target_range_min AND out_of_service = 0 ORDER BY id"
+        ).fetchall()
+    table = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    return {
+        "id": table[:, 0].astype(np.int64),
+        "latitude": table[:, 1],
+        "longitude": table[:, 2],
+        "soc": table[:, 3],
+        "deficit": table[:, 4] - table[:, 3],
+    }
+
+
+def _project(lat, lon) -> np.ndarray:
+    """(x, y) in km on a plane through the mean latitude."""
+    cos_lat = math.cos(math.radians(float(lat.mean())))
+    scale = EARTH_RADIUS_M / 1000 * math.pi / 180
+    return np.column_stack((lon * cos_lat * scale, lat * scale))
+
+
+def _assign(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(points), dtype=np.int64)
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, and |p|^2 plays no part in argmin
+    norms = (centroids**2).sum(axis=1)
+    for start in range(0, len(points), ASSIGN_CHUNK):
+        block = points[start : start + ASSIGN_CHUNK]
+        labels[start : start + len(block)] = (norms - 2 * block @ centroids.T).argmin(
+            axis=1
+        )
+    return labels
+
+
+def kmeans(points: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS):
+    """Cluster labels for `points`, starting from k of them picked at random."""
+    rng = np.random.default_rng(SEED)
+    centroids = points[rng.choice(len(points), k, replace=False)]
+    labels = None
+    for _ in range(iterations):
+        new_labels = _assign(points, centroids)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        filled = counts > 0
+        # Empty clusters keep their centroid
+        for axis in range(points.shape[1]):
+            sums = np.bincount(labels, weights=points[:, axis], minlength=k)
+            centroids[filled, axis] = sums[filled] / counts[filled]
+    return labels
+
+
+def _groups(labels: np.ndarray) -> list:
+    """Indices per label, for the labels in use: one sort, not one scan each."""
+    by_label = np.argsort(labels, kind="stable")
+    return np.split(by_label, np.flatnonzero(np.diff(labels[by_label])) + 1)
+
+
+def _split(points: np.ndarray, members: np.ndarray, max_stops: int) -> list:
+    """members cut into chunks of at most max_stops along their widest axis."""
+    axis = int(np.ptp(points[members], axis=0).argmax())
+    ordered = members[np.argsort(points[members, axis], kind="stable")]
+    return [ordered[i : i + max_stops] for i in range(0, len(ordered), max_stops)]
+
+
+def cluster(points: np.ndarray, max_stops: int = MAX_STOPS) -> np.ndarray:
+    """
+    Cluster labels with at most max_stops points per cluster. k-means over
+    every point and all those clusters at once costs points x clusters per
+    round, so a coarse k-means (about the square root of the clusters)
+    comes first and each coarse cluster is then split up on its own.
+    Clusters k-means left too big, e.g. around duplicate points, are cut.
+    """
+    k = math.ceil(len(points) / max_stops)
+    labels = np.zeros(len(points), dtype=np.int64)
+    used = 0
+    for members in _groups(kmeans(points, math.ceil(math.sqrt(k)))):
+        parts = math.ceil(len(members) / max_stops)
+        if parts > 1:
+            labels[members] = used + kmeans(points[members], parts)
+        else:
+            labels[members] = used
+        used += parts
+
+    capped = np.empty_like(labels)
+    used = 0
+    for members in _groups(labels):
+        for chunk in (
+            _split(points, members, max_stops)
+            if len(members) > max_stops
+            else [members]
+        ):
+            capped[chunk] = used
+            used += 1
+    return capped
+
+
+def order_stops(points: np.ndarray) -> np.ndarray:
+    """
+    A short open path through `points`: nearest neighbour from the stop
+    furthest from the middle, then 2-opt. Returns the visiting order.
+    """
+    m = len(points)
+    if m <= 2:
+        return np.arange(m)
+    # An extra stop at distance 0 from all others makes the open path a
+    # closed tour, so plain 2-opt also moves the path's ends
+    dist = np.zeros((m + 1, m + 1))
+    delta = points[:, None, :] - points[None, :, :]
+    dist[:m, :m] = np.sqrt((delta**2).sum(axis=-1))
+
+    current = int(((points - points.mean(axis=0)) ** 2).sum(axis=1).argmax())
+    unvisited = np.ones(m, dtype=bool)
+    unvisited[current] = False
+    tour = [current]
+    for _ in range(m - 1):
+        current = int(np.where(unvisited, dist[current, :m], np.inf).argmin())
+        unvisited[current] = False
+        tour.append(current)
+    tour.append(m)
+    tour = np.array(tour)
+
+    # Swapping edges (t[i], t[i+1]) and (t[j], t[j+1]) for (t[i], t[j]) and
+    # (t[i+1], t[j+1]) reverses t[i+1..j]. All pairs are scored at once; a
+    # round then makes every shortening swap, best first, that leaves the
+    # edges of the swaps already made alone, as their scores still hold
+    n = m + 1
+    valid = np.triu(np.ones((n, n), dtype=bool), k=2)
+    valid[0, n - 1] = False  # these two edges share a stop
+    for _ in range(MAX_ROUNDS):
+        following = np.roll(tour, -1)
+        edges = dist[tour, following]
+        gain = (
+            edges[:, None]
+            + edges[None, :]
+            - dist[tour[:, None], tour[None, :]]
+            - dist[following[:, None], following[None, :]]
+        )
+        first, last = np.nonzero(valid & (gain > 1e-9))
+        if not len(first):
+            break
+        touched = np.zeros(n, dtype=bool)
+        for k in np.argsort(-gain[first, last]):
+            i, j = first[k], last[k]
+            if touched[i] or touched[j]:
+                continue
+            tour[i + 1 : j + 1] = tour[i + 1 : j + 1][::-1]
+            touched[i : j + 1] = True
+
+    # Open the tour at the extra stop
+    end = int(np.flatnonzero(tour == m)[0])
+    return np.concatenate((tour[end + 1 :], tour[:end]))
+
+
+def _length(points: np.ndarray) -> float:
+    return float(np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)).sum())
+
+
+def plan_routes(max_stops: int = MAX_STOPS, crews: int = None) -> list:
+    """
+    Routes as dicts with the scooter ids in visiting order ("ids"), their
+    "soc", "latitude" and "longitude", the path "length_km" and the summed
+    SoC "deficit" below target. Most urgent (largest deficit) first; with
+    `crews`, only that many routes.
+    """
+    candidates = load_candidates()
+    count = len(candidates["id"])
+    if not count:
+        return []
+    points = _project(candidates["latitude"], candidates["longitude"])
+    labels = cluster(points, max_stops)
+
+    routes = []
+    for members in _groups(labels):
+        stops = members[order_stops(points[members])]
+        routes.append(
+            {
+                "ids": candidates["id"][stops].tolist(),
+                "soc": candidates["soc"][stops].tolist(),
+                "latitude": candidates["latitude"][stops].tolist(),
+                "longitude": candidates["longitude"][stops].tolist(),
+                "length_km": _length(points[stops]),
+                "deficit": float(candidates["deficit"][stops].sum()),
+            }
+        )
+    routes.sort(key=lambda route: -route["deficit"])
+    return routes[:crews] if crews else routes
+
+
+def print_routes(routes: list):
+    if not routes:
+        print("[INFO] No scooters in service below their target SoC.")
+        return
+    ids = [row_id for route in routes for row_id in route["ids"]]
+    serials = {}
+    with get_read_connection() as conn:
+        # Serial numbers of the planned scooters only, decrypted in bulk
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            cursor = conn.execute(
+                f"{ScooterRow.select_sql()} WHERE id IN "
+                f"({', '.join('?' for _ in chunk)})",
+                chunk,
+            )
+            for row in ScooterRow.wrap_all(
+                cursor.fetchall(), prefetch=("serial_number",)
+            ):
+                serials[row.id] = row.serial_number
+
+    for number, route in enumerate(routes, start=1):
+        print(
+            f"\n--- Route {number}: {len(route['ids'])} stops, "
+            f"{route['length_km']:.1f} km ---"
+        )
+        for stop, (row_id, soc, lat, lon) in enumerate(
+            zip(route["ids"], route["soc"], route["latitude"], route["longitude"]),
+            start=1,
+        ):
+            print(
+                f"{stop:3}. {serials.get(row_id, row_id)} "
+                f"(SoC {soc:.0f}%) at {lat:.5f}, {lon:.5f}"
+            )
+
+
+def main():
+    # python -m Utils.swapPlanner [max stops] [crews]
+    max_stops = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_STOPS
+    crews = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print_routes(plan_routes(max_stops, crews))
+
+
+if __name__ == "__main__":
+    main()
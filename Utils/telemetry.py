@@ -0,0 +1,272 @@
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from db.database import get_read_connection
+from db.repositories import ScooterRepository
+
+# Ingestion of scooter telemetry: JSON Lines frames such as
+#   {"id": 17, "soc": 81.5, "latitude": 51.92, "longitude": 4.47, "mileage": 1203.4}
+# Any subset of the telemetry fields may be sent. Frames are validated as
+# they arrive and merged per scooter (later values win) for up to
+# FLUSH_INTERVAL seconds or MAX_PENDING scooters. Each merged batch is then
+# written by a writer thread in one transaction through ScooterRepository.
+# At most MAX_QUEUED_BATCHES wait for the writer; when it falls behind, the
+# reading side blocks, so a file or pipe is read only as fast as it is
+# stored.
+#   python -m Utils.telemetry [file]     read frames from a file or stdin
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 20_000
+MAX_QUEUED_BATCHES = 4
+# Rejected frames printed by the command line before it only counts them
+SHOWN_REJECTS = 10
+
+# field -> (lowest, highest) accepted value
+LIMITS = {
+    "soc": (0.0, 100.0),
+    "latitude": (-90.0, 90.0),
+    "longitude": (-180.0, 180.0),
+    "mileage": (0.0, math.inf),
+}
+
+_STOP = object()
+
+
+def parse_frame(line) -> tuple:
+    """
+    Validate one frame (a JSON line or an already decoded dict). Returns
+    (scooter id, {field: value}); raises ValueError for a bad frame.
+    """
+    try:
+        frame = json.loads(line) if isinstance(line, (str, bytes)) else line
+    except ValueError:
+        raise ValueError("not valid JSON") from None
+    if not isinstance(frame, dict):
+        raise ValueError("not a JSON object")
+
+    row_id = frame.get("id")
+    # bool is an int too, but never a scooter id
+    if type(row_id) is not int or row_id < 1:
+        raise ValueError("missing or invalid scooter id")
+    values = {}
+    for field, (low, high) in LIMITS.items():
+        value = frame.get(field)
+        if value is None:
+            continue
+        # Comparisons with NaN are false, so it is rejected here as well
+        if type(value) not in (int, float) or not low <= value <= high:
+            raise ValueError(f"invalid {field}")
+        values[field] = float(value)
+    if not values:
+        raise ValueError("no telemetry fields")
+    return row_id, values
+
+
+class TelemetryPipeline:
+    """
+    Validates, merges and writes telemetry frames; use it as a context
+    manager, or call close() to write what is still pending. Counters are
+    kept in `stats`.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING,
+        max_queued: int = MAX_QUEUED_BATCHES,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.repository = ScooterRepository()
+        self.stats = {
+            "frames": 0,
+            "rejected": 0,
+            "merged": 0,  # frames folded into an earlier one of the batch
+            "unknown": 0,  # scooters of a batch that do not exist
+            "written": 0,  # scooter rows updated
+            "batches": 0,
+            "stalled": 0.0,  # seconds the reader waited for the writer
+        }
+        self._pending = {}
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        # Held from taking the pending frames until they are queued, so
+        # batches reach the writer in the order they were taken
+        self._hand_over_lock = threading.Lock()
+        self._batches = queue.Queue(maxsize=max_queued)
+        self._error = None
+        self._writer = threading.Thread(
+            target=self._write_loop, name="telemetry-writer", daemon=True
+        )
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, frame) -> bool:
+        """Add one frame; False if it was rejected."""
+        try:
+            row_id, values = parse_frame(frame)
+        except ValueError:
+            self.stats["frames"] += 1
+            self.stats["rejected"] += 1
+            return False
+        self._add(row_id, values)
+        return True
+
+    def submit_lines(self, lines, on_reject=None):
+        """
+        Add every frame of an iterable of JSON lines. Blank lines are
+        skipped; on_reject(line number, line, reason) is called for bad ones.
+        """
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row_id, values = parse_frame(line)
+            except ValueError as e:
+                self.stats["frames"] += 1
+                self.stats["rejected"] += 1
+                if on_reject is not None:
+                    on_reject(number, line, str(e))
+                continue
+            self._add(row_id, values)
+
+    def _add(self, row_id: int, values: dict):
+        if self._error is not None:
+            raise self._error
+        self.stats["frames"] += 1
+        with self._lock:
+            merged = self._pending.get(row_id)
+            if merged is None:
+                self._pending[row_id] = values
+            else:
+                merged.update(values)
+                self.stats["merged"] += 1
+            full = (
+                len(self._pending) >= self.max_pending
+                or time.monotonic() - self._window_start >= self.flush_interval
+            )
+        if full:
+            self._hand_over()
+
+    def _take_pending(self) -> dict:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._window_start = time.monotonic()
+        return batch
+
+    def _hand_over(self):
+        with self._hand_over_lock:
+            batch = self._take_pending()
+            if not batch:
+                return
+            start = time.perf_counter()
+            # Blocks while MAX_QUEUED_BATCHES are waiting: the backpressure
+            self._batches.put(batch)
+            self.stats["stalled"] += time.perf_counter() - start
+
+    def _take_idle(self) -> dict:
+        """
+        The pending frames, for the writer when no batch came for a while.
+        Left alone while a hand-over is under way or a batch is queued:
+        those are older and must be written first.
+        """
+        if not self._hand_over_lock.acquire(blocking=False):
+            return None
+        try:
+            if not self._batches.empty():
+                return None
+            return self._take_pending()
+        finally:
+            self._hand_over_lock.release()
+
+    def _write_loop(self):
+        while True:
+            try:
+                batch = self._batches.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Frames trickle in: write what waits instead of holding it
+                # until the next frame arrives
+                batch = self._take_idle()
+            if batch is _STOP:
+                return
+            if not batch or self._error is not None:
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._error = e
+
+    def _write(self, batch: dict):
+        # Frames for scooters that do not exist are dropped in bulk
+        with get_read_connection() as conn:
+            known = {
+                row_id
+                for (row_id,) in conn.execute(
+                    "SELECT id FROM scooters "
+                    "WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(list(batch)),),
+                )
+            }
+        self.stats["unknown"] += len(batch) - len(known)
+        # In id order the updates walk the table's B-tree forwards
+        batch = {row_id: batch[row_id] for row_id in sorted(known)}
+        if batch:
+            self.repository.update_many(batch)
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+
+    def close(self):
+        """Write everything still pending and stop the writer."""
+        if self._writer.is_alive():
+            self._hand_over()
+            self._batches.put(_STOP)
+            self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+
+def ingest(lines, on_reject=None) -> dict:
+    """Run JSON lines through a pipeline; returns its stats."""
+    with TelemetryPipeline() as pipeline:
+        pipeline.submit_lines(lines, on_reject)
+    return pipeline.stats
+
+
+def main():
+    # python -m Utils.telemetry [file]    (stdin without a file or with '-')
+    path = sys.argv[1] if len(sys.argv) > 1 else "-"
+
+    def on_reject(number, line, reason):
+        if shown[0] < SHOWN_REJECTS:
+            print(f"[ERROR] Line {number}: {reason}: {line.strip()[:80]}")
+        shown[0] += 1
+
+    shown = [0]
+    start = time.perf_counter()
+    if path == "-":
+        stats = ingest(sys.stdin, on_reject)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            stats = ingest(f, on_reject)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"[INFO] {stats['frames']} frames in {elapsed:.2f} s "
+        f"({stats['frames'] / max(elapsed, 1e-9):.0f}/s): {stats['rejected']} rejected, "
+        f"{stats['merged']} merged, {stats['unknown']} for unknown scooters."
+    )
+    print(
+        f"[INFO] {stats['written']} scooter updates in {stats['batches']} batches; "
+        f"reader waited {stats['stalled']:.2f} s for the writer."
+    )
+
+
+if __name__ == "__main__":
+    main()
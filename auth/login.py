@@ -4,6 +4,7 @@ from db.database import get_connection
 from auth.password import verify_password
 from auth.passwordHash import hash_password
 from Models.user import User
+from Models.rows import UserRow
 from Utils.logger import Logger
 from ui.terminal import clear_terminal
 from Utils.encryption import Encryptor
@@ -20,31 +21,24 @@ def login():
     username = input("Username: ").strip()
     password = input_password_login("Password: ").strip()
     hashed_pw = hash_password(password)
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id, username, password_hash, role FROM users WHERE id = ?",
-        (get_user_id_by_username(username),),
-    )
-    try:
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"{UserRow.select_sql()} WHERE id = ?",
+            (get_user_id_by_username(username),),
+        )
         user = cur.fetchone()
-        conn.close()
-    except:
-        print("[ERROR] No user found.")
 
     if user:
-        id, stored_username, stored_hash, role = user
+        user = UserRow(user)
 
-        try:
-            stored_username = encryptor.decrypt_text(stored_username.encode())
-            role = encryptor.decrypt_text(role.encode())
-        except Exception:
-            pass
-
-        if verify_password(hashed_pw, stored_hash):
+        # username and role are only decrypted once the password matches
+        if verify_password(hashed_pw, user.password_hash):
+            stored_username = user.username
+            role = user.role
             print(f"[SUCCESS] Welcome, {stored_username} ({role})")
             logger.log(username, f"Logged in as {role}", "")
-            return User(id, stored_username, stored_hash, role)
+            return User(user.id, stored_username, user.password_hash, role)
         else:
             print("[ERROR] Invalid Input.")
             logger.log(username, "Failed login attempt", "Wrong password", True)
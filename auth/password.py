@@ -1,6 +1,6 @@
 import re
 import sys
-from db.database import get_connection
+from db.database import transaction
 from auth.passwordHash import hash_password
 import msvcrt
 
@@ -198,7 +198,7 @@ def update_password():
     hashed_old_password = hash_password(old_password)
     hashed_new_password = hash_password(new_password)
 
-    with get_connection() as conn:
+    with transaction(immediate=True) as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM users WHERE username=? AND password=?",
@@ -211,7 +211,6 @@ def update_password():
                 "UPDATE users SET password=? WHERE id=?",
                 (hashed_new_password, user_id[0]),
             )
-            conn.commit()
             print("Password updated successfully.")
         else:
             print("Invalid username or old password.")
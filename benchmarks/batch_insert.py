@@ -0,0 +1,70 @@
+# benchmarks/batch_insert.py
+#
+# Inserts dummy scooters into a scratch database, once row by row (one
+# encrypted INSERT and commit per scooter, as the menus used to do) and once
+# through ScooterRepository.add_many (bulk encryption, one executemany, one
+# transaction). Run from the project root:
+#   python -m benchmarks.batch_insert [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+from db import database
+from db.repositories import ScooterRepository
+from Utils.DummyDataScooter import generate_scooter
+from Utils.encryption import Encryptor
+from Utils.searchIndex import index_row
+
+encryptor = Encryptor()
+repository = ScooterRepository()
+
+
+def insert_one_by_one(records):
+    for record in records:
+        with database.get_connection() as conn:
+            cur = conn.cursor()
+            row = encryptor.encrypt_row(
+                tuple(record[column] for column in repository.COLUMNS),
+                [repository.COLUMNS.index(c) for c in repository.ENCRYPTED],
+            )
+            cur.execute(
+                f"INSERT INTO scooters ({', '.join(repository.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in row)})",
+                row,
+            )
+            index_row(cur, "scooters", cur.lastrowid, record)
+            conn.commit()
+
+
+def timed(label: str, function, records):
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM scooters")
+        conn.execute("DELETE FROM scooter_search_tokens")
+    start = time.perf_counter()
+    function(records)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} | {elapsed:7.2f} s | {len(records) / elapsed:8.0f} rows/s")
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = [generate_scooter() for _ in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        print(f"{n} scooters, 5 encrypted columns each")
+        # Row by row is slow enough that a sample says enough
+        sample = records[: min(n, 5_000)]
+        single = timed("row by row", insert_one_by_one, sample) / len(sample) * n
+        batched = timed("add_many", repository.add_many, records)
+        print(f"row by row extrapolated to {n} rows: {single:.1f} s")
+        print(f"speed-up: {single / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
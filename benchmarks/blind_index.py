@@ -0,0 +1,73 @@
+# benchmarks/blind_index.py
+#
+# Compares the blind index username lookup against the old approach of
+# decrypting every username. Run from the project root:
+#   python -m benchmarks.blind_index
+
+import os
+import tempfile
+import time
+
+import db.database as database
+from Utils.encryption import Encryptor
+from Utils.getUserId import get_user_id_by_username
+
+encryptor = Encryptor()
+
+SIZES = [10, 1_000, 10_000, 100_000]
+LOOKUPS = 200
+
+
+def fill_users(n):
+    with database.get_connection() as conn:
+        conn.execute("DELETE FROM users")
+        conn.executemany(
+            "INSERT INTO users (username, password_hash, role, username_bidx) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    encryptor.encrypt_text(f"user{i:06d}").decode(),
+                    "x",
+                    encryptor.encrypt_text("service_engineer").decode(),
+                    encryptor.blind_index(f"user{i:06d}", "username"),
+                )
+                for i in range(n)
+            ),
+        )
+        conn.commit()
+
+
+def scan_lookup(username):
+    with database.get_connection() as conn:
+        rows = conn.execute("SELECT id, username FROM users").fetchall()
+    for user_id, encrypted in rows:
+        if encryptor.decrypt_text(encrypted.encode()).lower() == username:
+            return user_id
+    return None
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        print(f"{'users':>8} | {'blind index (us)':>16} | {'full scan (us)':>14}")
+        for n in SIZES:
+            fill_users(n)
+            target = f"user{n - 1:06d}"
+
+            start = time.perf_counter()
+            for _ in range(LOOKUPS):
+                get_user_id_by_username(target)
+            indexed = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+            scan_runs = max(1, 1_000 // n)
+            start = time.perf_counter()
+            for _ in range(scan_runs):
+                scan_lookup(target)
+            scanned = (time.perf_counter() - start) / scan_runs * 1e6
+
+            print(f"{n:>8} | {indexed:>16.1f} | {scanned:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/blob_storage.py
+#
+# Compares base64 TEXT and raw BLOB storage of encrypted traveller columns:
+# database file size and the time to decrypt every row of a listing, with
+# the decrypt cache disabled. Run from the project root:
+#   python -m benchmarks.blob_storage [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+from db import database
+from Models.rows import TravellerRow
+from Utils import encryption
+from Utils.blobStorage import convert_all
+
+encryptor = encryption.Encryptor()
+
+FIELDS = (
+    "Jan", "Jansen", "1990-01-01", "M", "Coolsingel", "40", "3011AD",
+    "Rotterdam", "jan@example.com", "0612345678", "NL1234567",
+)  # fmt: skip
+
+
+def measure(label: str, n: int):
+    with database.get_connection() as conn:
+        raw_rows = conn.execute(TravellerRow.select_sql()).fetchall()
+    start = time.perf_counter()
+    for row in TravellerRow.wrap_all(raw_rows, prefetch=TravellerRow.ENCRYPTED):
+        row.encrypted_values()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(database.DB_NAME)
+    print(
+        f"{label:<5} | {size / 1024:8.0f} KiB | {size / n:6.0f} bytes/row"
+        f" | {elapsed / n * 1e6:6.1f} us/row decrypt"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    encryptor.configure_cache(max_size=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        encryption.STORE_BINARY = False
+        with database.get_connection() as conn:
+            conn.executemany(
+                f"INSERT INTO travellers ({', '.join(TravellerRow.ENCRYPTED)}) "
+                f"VALUES ({', '.join('?' for _ in FIELDS)})",
+                (tuple(encryptor.encrypt_value(f) for f in FIELDS) for _ in range(n)),
+            )
+            conn.commit()
+            conn.execute("VACUUM")
+
+        print(f"{n} traveller rows, 11 encrypted fields each")
+        measure("text", n)
+        encryption.STORE_BINARY = True
+        convert_all(binary=True)
+        measure("blob", n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bulk_decrypt.py
+#
+# Times Encryptor.decrypt_rows on synthetic traveller rows with a growing
+# number of worker processes. Every row is encrypted on its own and the
+# decrypt cache is off, so each field is really decrypted. Run from the
+# project root:
+#   python -m benchmarks.bulk_decrypt [rows]
+
+import os
+import sys
+import time
+
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+FIELDS = (
+    "Jan", "Jansen", "1990-01-01", "M", "Coolsingel", "40", "3011AD",
+    "Rotterdam", "jan@example.com", "0612345678", "NL1234567",
+)  # fmt: skip
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    encryptor.configure_cache(max_size=0)
+    columns = range(1, 12)
+    rows = list(encryptor.encrypt_rows(((i, *FIELDS) for i in range(n)), columns))
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores})
+
+    print(f"Decrypting {n} traveller rows (11 fields each), {cores} cores")
+    baseline = None
+    for workers in worker_counts:
+        if workers > cores:
+            continue
+        start = time.perf_counter()
+        count = sum(1 for _ in encryptor.decrypt_rows(rows, columns, workers=workers))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"workers={workers:>3} | {elapsed:7.2f}s | {count / elapsed:>9.0f} rows/s"
+            f" | speedup x{baseline / elapsed:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/concurrent_access.py
+#
+# Reader threads scan the scooters table inside read-only snapshots while a
+# writer thread keeps inserting and updating scooters through the
+# repository. Checks that:
+#   - every snapshot keeps seeing the same rows, however many commits land
+#     while it is open;
+#   - snapshot connections refuse writes;
+#   - the writer is not held up by the readers (commit latency is printed).
+# Exits with status 1 when a check fails. Run from the project root:
+#   python -m benchmarks.concurrent_access [seconds] [readers]
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from db import database
+from db.repositories import ScooterRepository
+from Utils.DummyDataScooter import generate_scooter
+
+ROWS = 20_000
+
+
+def reader(stop: threading.Event, results: dict, lock: threading.Lock):
+    snapshots = failures = 0
+    while not stop.is_set():
+        with database.snapshot() as conn:
+            before = conn.execute("SELECT COUNT(*), SUM(soc) FROM scooters").fetchone()
+            cursor = conn.execute("SELECT id, soc FROM scooters")
+            scanned = 0
+            soc = 0.0
+            for _, value in database.stream_rows(cursor):
+                scanned += 1
+                soc += value
+            after = conn.execute("SELECT COUNT(*), SUM(soc) FROM scooters").fetchone()
+        if before != after or scanned != before[0] or round(soc - before[1], 6):
+            failures += 1
+        snapshots += 1
+
+    with database.get_read_connection() as conn:
+        try:
+            conn.execute("DELETE FROM scooters")
+            failures += 1
+        except sqlite3.OperationalError:
+            pass
+
+    with lock:
+        results["snapshots"] += snapshots
+        results["failures"] += failures
+
+
+def writer(stop: threading.Event, latencies: list):
+    repository = ScooterRepository()
+    while not stop.is_set():
+        start = time.perf_counter()
+        row_id = repository.add(generate_scooter())
+        repository.update(row_id, {"soc": 50.0})
+        latencies.append(time.perf_counter() - start)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        ScooterRepository().add_many(generate_scooter() for _ in range(ROWS))
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        results = {"snapshots": 0, "failures": 0}
+        latencies = []
+        threads = [
+            threading.Thread(target=reader, args=(stop, results, lock))
+            for _ in range(readers)
+        ]
+        threads.append(threading.Thread(target=writer, args=(stop, latencies)))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        database.close_connections()
+
+    latencies.sort()
+    print(f"{readers} readers, 1 writer, {seconds:.0f} s, {ROWS} scooters")
+    print(f"snapshots scanned: {results['snapshots']}")
+    print(
+        f"writer: {len(latencies)} commits | median "
+        f"{statistics.median(latencies) * 1e3:.2f} ms | p99 "
+        f"{latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms"
+    )
+    if results["failures"]:
+        print(f"[ERROR] {results['failures']} inconsistent snapshots or writes")
+        sys.exit(1)
+    print("[SUCCESS] Every snapshot stayed consistent; read-only writes refused.")
+
+
+if __name__ == "__main__":
+    main()
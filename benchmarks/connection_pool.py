@@ -0,0 +1,55 @@
+# benchmarks/connection_pool.py
+#
+# Times a short indexed lookup done the old way (a fresh sqlite3.connect per
+# call) against the pooled get_connection(), and prints the pool counters.
+# Run from the project root:
+#   python -m benchmarks.connection_pool [calls]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from db import database
+
+QUERY = "SELECT id FROM users WHERE username_bidx = ?"
+
+
+def fresh_connection():
+    conn = sqlite3.connect(database.DB_NAME)
+    try:
+        return conn.execute(QUERY, ("missing",)).fetchone()
+    finally:
+        conn.close()
+
+
+def pooled_connection():
+    with database.get_connection() as conn:
+        return conn.execute(QUERY, ("missing",)).fetchone()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        print(f"{n} lookups")
+        for label, lookup in (
+            ("fresh", fresh_connection),
+            ("pooled", pooled_connection),
+        ):
+            start = time.perf_counter()
+            for _ in range(n):
+                lookup()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<7} | {elapsed:6.2f}s | {elapsed / n * 1e6:7.1f} us/lookup")
+
+        print(database.connection_stats())
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
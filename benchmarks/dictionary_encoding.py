@@ -0,0 +1,68 @@
+# benchmarks/dictionary_encoding.py
+#
+# Scooters per brand, two ways:
+#   - decrypt: decrypt every row's brand and count in Python (what a count
+#              over a per-row token costs);
+#   - codes:   GROUP BY brand_code in SQL and decode the few codes.
+# Also prints the stored bytes per row of a brand token against its code.
+# The decrypt cache is disabled, so every run decrypts. Run from the
+# project root:
+#   python -m benchmarks.dictionary_encoding [rows]
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from db import database
+from db.repositories import ScooterRepository
+from Utils import dictionary
+from Utils.DummyDataScooter import generate_scooter
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+
+def by_decrypting(conn) -> dict:
+    # The token each row would hold without the dictionary
+    cursor = conn.execute(
+        "SELECT value FROM dictionary JOIN scooters ON code = brand_code"
+    )
+    return Counter(encryptor.decrypt_text(token) for (token,) in cursor)
+
+
+def by_codes(conn) -> dict:
+    return dictionary.value_counts("scooters", "brand")
+
+
+def measure(label: str, function, conn):
+    start = time.perf_counter()
+    counts = function(conn)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} | {elapsed * 1e3:8.1f} ms | {len(counts)} brands")
+    return counts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    encryptor.configure_cache(max_size=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        ScooterRepository().add_many(generate_scooter() for _ in range(n))
+
+        print(f"{n} scooters")
+        with database.get_read_connection() as conn:
+            decrypted = measure("decrypt", by_decrypting, conn)
+            coded = measure("codes", by_codes, conn)
+            token_bytes = conn.execute(
+                "SELECT AVG(LENGTH(value)) FROM dictionary WHERE domain = 'scooters.brand'"
+            ).fetchone()[0]
+        assert decrypted == coded, "both ways must count the same"
+        print(f"brand per row: {token_bytes:.0f} bytes as a token, 1-2 bytes as a code")
+
+
+if __name__ == "__main__":
+    main()
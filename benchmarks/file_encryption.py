@@ -0,0 +1,84 @@
+# benchmarks/file_encryption.py
+#
+# Throughput and peak Python memory of the one-shot Fernet file encryption
+# versus the chunked streaming format. Run from the project root:
+#   python -m benchmarks.file_encryption [size in MB]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+
+def one_shot_encrypt(input_path, output_path):
+    with open(input_path, "rb") as f:
+        data = f.read()
+    with open(output_path, "wb") as f:
+        f.write(encryptor.fernet.encrypt(data))
+
+
+def measure(label, func, size_mb):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} | {size_mb / elapsed:8.1f} MB/s | peak {peak / 2**20:8.1f} MB")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, "plain.bin")
+        encrypted = os.path.join(tmp, "encrypted.bin")
+        restored = os.path.join(tmp, "restored.bin")
+
+        # Half random, half repetitive, roughly like a database snapshot
+        with open(plain, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(512 * 1024))
+                f.write(b"scooter|Rotterdam|51.92|4.47|" * (512 * 1024 // 30 + 1))
+
+        print(f"{size_mb} MB input")
+        measure(
+            "one-shot Fernet encrypt",
+            lambda: one_shot_encrypt(plain, encrypted),
+            size_mb,
+        )
+        measure(
+            "one-shot Fernet decrypt",
+            lambda: encryptor.decrypt_file(encrypted, restored),
+            size_mb,
+        )
+        measure(
+            "streaming encrypt",
+            lambda: encryptor.encrypt_file(plain, encrypted),
+            size_mb,
+        )
+        measure(
+            "streaming decrypt",
+            lambda: encryptor.decrypt_file(encrypted, restored),
+            size_mb,
+        )
+        measure(
+            "streaming encrypt (compressed)",
+            lambda: encryptor.encrypt_file(plain, encrypted, compress=True),
+            size_mb,
+        )
+        print(f"compressed size: {os.path.getsize(encrypted) / 2**20:.1f} MB")
+        measure(
+            "streaming decrypt (compressed)",
+            lambda: encryptor.decrypt_file(encrypted, restored),
+            size_mb,
+        )
+
+
+if __name__ == "__main__":
+    main()
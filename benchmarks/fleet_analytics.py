@@ -0,0 +1,132 @@
+# benchmarks/fleet_analytics.py
+#
+# The fleet dashboard (Utils.fleetAnalytics) for a synthetic fleet:
+#   - loop:      fetch the same numeric columns and aggregate them row by
+#                row in Python (without decrypting anything, so a lower
+#                bound for the old way);
+#   - load:      load_columns, streaming the columns into NumPy arrays;
+#   - summarize: every figure computed on the arrays;
+#   - cached:    fleet_summary while its arrays are fresh, as admins see it.
+# Both ways must agree. Run from the project root:
+#   python -m benchmarks.fleet_analytics [rows]
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.nearest_scooters import LAT_RANGE, LON_RANGE
+from db import database
+from Utils import dictionary, fleetAnalytics
+
+BRANDS = ("Segway", "NIU", "Xiaomi", "Ninebot", "Okai")
+
+
+def rows(n: int, codes: list):
+    for i in range(n):
+        target_min = random.choice((15.0, 20.0, 25.0))
+        yield (
+            f"SN{i:010d}",
+            round(random.uniform(0, 100), 1),
+            target_min,
+            target_min + 60,
+            random.uniform(*LAT_RANGE),
+            random.uniform(*LON_RANGE),
+            int(random.random() < 0.1),
+            None if random.random() < 0.01 else random.randint(0, 20_000),
+            random.choice(codes),
+        )
+
+
+def loop(conn) -> dict:
+    scooters = out_of_service = below = below_in_service = above = 0
+    soc_total = 0.0
+    brands = {}
+    for soc, low, high, mileage, oos, code in database.stream_rows(
+        conn.execute(f"SELECT {', '.join(fleetAnalytics.COLUMNS)} FROM scooters")
+    ):
+        scooters += 1
+        soc_total += soc
+        out_of_service += oos == 1
+        is_below = soc < low
+        below += is_below
+        below_in_service += is_below and oos != 1
+        above += soc > high
+        brand = brands.setdefault(code, [0, 0.0, 0])
+        brand[0] += 1
+        brand[1] += soc
+        brand[2] += is_below
+    return {
+        "scooters": scooters,
+        "out_of_service": out_of_service,
+        "below_target": below,
+        "below_target_in_service": below_in_service,
+        "above_target": above,
+        "soc_mean": soc_total / scooters,
+        "brands": brands,
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        with database.transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            codes = [
+                dictionary.encode(cur, "scooters", "brand", brand) for brand in BRANDS
+            ]
+            cur.executemany(
+                "INSERT INTO scooters (brand, model, serial_number, top_speed, "
+                "battery_capacity, soc, target_range_min, target_range_max, "
+                "latitude, longitude, out_of_service, mileage, in_service_date, "
+                "brand_code) "
+                "VALUES ('', 'model', ?, 25, 400, ?, ?, ?, ?, ?, ?, ?, "
+                "'2024-01-01', ?)",
+                rows(n, codes),
+            )
+
+        with database.get_read_connection() as conn:
+            start = time.perf_counter()
+            expected = loop(conn)
+            looped = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns = fleetAnalytics.load_columns()
+        loaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = fleetAnalytics.summarize(columns)
+        summarized = time.perf_counter() - start
+
+        fleetAnalytics.fleet_summary()
+        start = time.perf_counter()
+        fleetAnalytics.fleet_summary()
+        cached = time.perf_counter() - start
+
+    for key, value in expected.items():
+        if key == "brands":
+            for brand in summary["brands"]:
+                count, soc_total, below = value[codes[BRANDS.index(brand["brand"])]]
+                assert brand["scooters"] == count and brand["below_target"] == below
+                assert math.isclose(brand["soc_mean"], soc_total / count)
+        elif key == "soc_mean":
+            assert math.isclose(summary[key], value), key
+        else:
+            assert summary[key] == value, key
+
+    print(f"{n} scooters")
+    print(f"loop      | {looped:8.3f} s")
+    print(f"load      | {loaded:8.3f} s")
+    print(f"summarize | {summarized:8.3f} s")
+    print(f"cached    | {cached:8.3f} s  (fleet_summary with fresh arrays)")
+    fleetAnalytics.print_summary(summary | {"as_of": time.time()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/fleet_index.py
+#
+# The resident fleet index (Utils.fleetIndex) for a fleet spread over the
+# Netherlands:
+#   - build time and memory held, also per 100k scooters;
+#   - k-nearest (k=5) and 500 m radius queries, against find_nearest on the
+#     R*Tree for the same points (both must return the same scooters), and
+#     find_nearest_resident, which also loads the rows;
+#   - an incremental patch: moving a scooter and changing its SoC.
+# Run from the project root:
+#   python -m benchmarks.fleet_index [rows] [queries]
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.nearest_scooters import LAT_RANGE, LON_RANGE, scooters
+from db import database
+from Utils.fleetIndex import FleetIndex, fleet
+from Utils.geoIndex import find_nearest, find_nearest_resident
+
+K = 5
+RADIUS = 500
+
+
+def timed(function, arguments) -> tuple:
+    start = time.perf_counter()
+    results = [function(*args) for args in arguments]
+    return results, (time.perf_counter() - start) / len(arguments)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        with database.transaction(immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO scooters (brand, model, serial_number, top_speed, "
+                "battery_capacity, soc, target_range_min, target_range_max, "
+                "latitude, longitude, out_of_service, in_service_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                scooters(n),
+            )
+        points = [
+            (random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE))
+            for _ in range(queries)
+        ]
+
+        expected, rtree = timed(
+            lambda lat, lon: [row.id for _, row in find_nearest(lat, lon, K)], points
+        )
+
+        start = time.perf_counter()
+        fleet.build()
+        build = time.perf_counter() - start
+
+        tracemalloc.start()
+        measured = FleetIndex()
+        measured.build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del measured
+
+        found, nearest = timed(
+            lambda lat, lon: [row_id for _, row_id in fleet.nearest(lat, lon, K)],
+            points,
+        )
+        assert found == expected, "grid and R*Tree disagree"
+        found, resident = timed(
+            lambda lat, lon: [row.id for _, row in find_nearest_resident(lat, lon, K)],
+            points,
+        )
+        assert found == expected, "grid and R*Tree disagree"
+        _, within = timed(lambda lat, lon: fleet.within(lat, lon, RADIUS), points)
+
+        ids = random.sample(range(1, n + 1), min(queries, n))
+        moves = [
+            (row_id, {"latitude": lat, "longitude": lon, "soc": 50.0})
+            for row_id, (lat, lon) in zip(ids, points)
+        ]
+        _, patch = timed(fleet.upsert, moves)
+
+    per_100k = 100_000 / n
+    print(f"{n} scooters, {queries} queries")
+    print(
+        f"build    | {build:8.2f} s   | {build * per_100k:6.2f} s per 100k | "
+        f"{memory / 2**20:7.1f} MiB ({memory * per_100k / 2**20:.1f} MiB per 100k)"
+    )
+    print(f"rtree    | {rtree * 1e6:8.1f} us | k={K}, rows loaded")
+    print(f"nearest  | {nearest * 1e6:8.1f} us | k={K}")
+    print(f"resident | {resident * 1e6:8.1f} us | k={K}, rows loaded")
+    print(f"within   | {within * 1e6:8.1f} us | {RADIUS} m")
+    print(f"patch    | {patch * 1e6:8.1f} us | move + SoC")
+
+
+if __name__ == "__main__":
+    main()
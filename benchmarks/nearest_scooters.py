@@ -0,0 +1,107 @@
+# benchmarks/nearest_scooters.py
+#
+# The 5 nearest scooters in service around random points, for a fleet spread
+# over the Netherlands:
+#   - scan:  load every scooter's location and rank them all by haversine
+#            distance (the only way before the R*Tree);
+#   - rtree: Utils.geoIndex.find_nearest, bounding-box prefilter in the
+#            R*Tree, then exact ranking of the candidates.
+# Both must return the same scooters. The scooters are inserted with plain
+# SQL (the insert triggers fill the R*Tree), as encrypting the other columns
+# plays no part here. Run from the project root:
+#   python -m benchmarks.nearest_scooters [rows] [queries]
+
+import heapq
+import os
+import random
+import sys
+import tempfile
+import time
+
+from db import database
+from Utils.geoIndex import find_nearest, haversine
+
+K = 5
+MAX_RADIUS = 50_000
+# Roughly the Netherlands
+LAT_RANGE = (50.75, 53.55)
+LON_RANGE = (3.35, 7.20)
+
+
+def scooters(n: int):
+    for i in range(n):
+        yield (
+            "brand",
+            "model",
+            f"SN{i:010d}",
+            25,
+            400,
+            50.0,
+            20.0,
+            80.0,
+            random.uniform(*LAT_RANGE),
+            random.uniform(*LON_RANGE),
+            int(random.random() < 0.2),
+            "2024-01-01",
+        )
+
+
+def scan(conn, lat: float, lon: float) -> list:
+    cursor = conn.execute(
+        "SELECT id, latitude, longitude FROM scooters WHERE out_of_service = 0"
+    )
+    return heapq.nsmallest(
+        K,
+        (
+            (haversine(lat, lon, row_lat, row_lon), row_id)
+            for row_id, row_lat, row_lon in database.stream_rows(cursor)
+        ),
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        start = time.perf_counter()
+        with database.transaction(immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO scooters (brand, model, serial_number, top_speed, "
+                "battery_capacity, soc, target_range_min, target_range_max, "
+                "latitude, longitude, out_of_service, in_service_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                scooters(n),
+            )
+        print(
+            f"{n} scooters inserted and indexed in {time.perf_counter() - start:.1f} s"
+        )
+
+        points = [
+            (random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE))
+            for _ in range(queries)
+        ]
+        start = time.perf_counter()
+        results = [find_nearest(lat, lon, K, MAX_RADIUS) for lat, lon in points]
+        rtree = (time.perf_counter() - start) / queries
+
+        # The scan is slow, so it only runs for the first few points
+        checked = points[:3]
+        with database.get_read_connection() as conn:
+            start = time.perf_counter()
+            expected = [scan(conn, lat, lon) for lat, lon in checked]
+            full_scan = (time.perf_counter() - start) / len(checked)
+
+        for found, nearest in zip(results, expected):
+            assert [row.id for _, row in found] == [row_id for _, row_id in nearest]
+
+        print(f"scan  | {full_scan * 1e3:9.2f} ms/query")
+        print(f"rtree | {rtree * 1e3:9.2f} ms/query ({queries} queries)")
+        print(f"speed-up: {full_scan / rtree:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/pagination.py
+#
+# Time to fetch one page of scooters at increasing depths, with the old
+# LIMIT/OFFSET query and with keyset pagination (db.pagination.fetch_page).
+# Only the query is timed; decryption is the same for both. Run from the
+# project root:
+#   python -m benchmarks.pagination [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+from db import database
+from db.pagination import PAGE_SIZE, fetch_page
+from db.repositories import ScooterRepository
+from Models.rows import ScooterRow
+from Utils.DummyDataScooter import generate_scooter
+
+REPEAT = 20
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return (time.perf_counter() - start) / REPEAT * 1e3
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        ScooterRepository().add_many(generate_scooter() for _ in range(n))
+
+        print(f"{n} scooters, {PAGE_SIZE} per page")
+        print(f"{'page':>6} | {'offset':>9} | {'keyset':>9}")
+        with database.get_connection() as conn:
+            for page in (1, 10, 100, 1000, n // PAGE_SIZE):
+                skipped = (page - 1) * PAGE_SIZE
+                # The cursor a user would hold after paging this far
+                after_id = skipped
+                offset_ms = timed(
+                    lambda: conn.execute(
+                        f"{ScooterRow.select_sql()} LIMIT ? OFFSET ?",
+                        (PAGE_SIZE, skipped),
+                    ).fetchall()
+                )
+                keyset_ms = timed(lambda: fetch_page(ScooterRow.select_sql(), after_id))
+                print(f"{page:>6} | {offset_ms:6.2f} ms | {keyset_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
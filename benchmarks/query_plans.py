@@ -0,0 +1,79 @@
+# benchmarks/query_plans.py
+#
+# Runs EXPLAIN QUERY PLAN for the hot lookups on a freshly migrated database
+# and reports any that still scan a whole table. Exits with status 1 if one
+# does. Run from the project root:
+#   python -m benchmarks.query_plans
+
+import os
+import sys
+import tempfile
+
+from db import database
+from Utils.searchIndex import candidate_subquery
+
+HOT_QUERIES = {
+    "login lookup": (
+        "SELECT id FROM users WHERE username_bidx = ?",
+        ("x",),
+    ),
+    "restore by code": (
+        "SELECT file_name, assigned_to, used FROM backups WHERE restore_code = ?",
+        ("x",),
+    ),
+    "backup by file": (
+        "UPDATE backups SET used = 1 WHERE file_name = ?",
+        ("x",),
+    ),
+    "logs by date": (
+        "SELECT * FROM logs WHERE log_date BETWEEN ? AND ? ORDER BY log_date, log_time",
+        ("2025-01-01", "2025-01-31"),
+    ),
+    "logs by user": (
+        "SELECT * FROM logs WHERE username = ?",
+        ("x",),
+    ),
+    "suspicious logs": (
+        "SELECT * FROM logs WHERE suspicious = 1 ORDER BY log_date",
+        (),
+    ),
+}
+
+
+def full_scans(plan) -> list:
+    # "SCAN t" reads every row; "SCAN t USING ... INDEX" walks an index
+    return [
+        detail
+        for *_, detail in plan
+        if detail.startswith("SCAN") and "INDEX" not in detail
+    ]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        queries = dict(HOT_QUERIES)
+        subquery, params = candidate_subquery("scooters", "nine")
+        queries["scooter search"] = (
+            f"SELECT id FROM scooters WHERE id IN ({subquery})",
+            params,
+        )
+
+        failed = False
+        with database.get_connection() as conn:
+            for label, (sql, params) in queries.items():
+                plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+                scans = full_scans(plan)
+                failed = failed or bool(scans)
+                print(f"{'SCAN' if scans else 'ok':<4} | {label}")
+                for *_, detail in plan:
+                    print(f"     |   {detail}")
+        database.close_connections()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
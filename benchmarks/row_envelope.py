@@ -0,0 +1,79 @@
+# benchmarks/row_envelope.py
+#
+# Compares the two traveller storage formats: one Fernet token per column
+# against one sealed envelope per row. Reports stored bytes of encrypted
+# data per row and the time to decrypt a full row, with the decrypt cache
+# disabled. Run from the project root:
+#   python -m benchmarks.row_envelope [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+from db import database
+from Models.rows import TravellerRow
+from Utils.encryption import Encryptor
+from Utils.rowEnvelope import migrate, storage_stats
+
+encryptor = Encryptor()
+
+FIELDS = (
+    "Jan", "Jansen", "1990-01-01", "M", "Coolsingel", "40", "3011AD",
+    "Rotterdam", "jan@example.com", "0612345678", "NL1234567",
+)  # fmt: skip
+
+
+def read_all() -> float:
+    with database.get_connection() as conn:
+        raw_rows = conn.execute(TravellerRow.select_sql()).fetchall()
+    start = time.perf_counter()
+    for row in TravellerRow.wrap_all(raw_rows):
+        row.encrypted_values()
+    return time.perf_counter() - start
+
+
+def report(label: str, n: int, elapsed: float, stats: dict, fmt: str):
+    _, avg_bytes = stats[fmt]
+    print(
+        f"{label:<16} | {avg_bytes:7.0f} bytes/row"
+        f" | {elapsed / n * 1e6:8.1f} us/row decrypt"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    encryptor.configure_cache(max_size=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+
+        with database.get_connection() as conn:
+            conn.executemany(
+                f"INSERT INTO travellers ({', '.join(TravellerRow.ENCRYPTED)}) "
+                f"VALUES ({', '.join('?' for _ in FIELDS)})",
+                (
+                    tuple(encryptor.encrypt_text(f).decode() for f in FIELDS)
+                    for _ in range(n)
+                ),
+            )
+            conn.commit()
+
+        plain_bytes = sum(len(f) for f in FIELDS)
+        print(f"{n} traveller rows, {plain_bytes} bytes of plaintext per row")
+
+        report("column tokens", n, read_all(), storage_stats("travellers"), "column")
+
+        start = time.perf_counter()
+        migrate("travellers", seal=True)
+        migration = time.perf_counter() - start
+
+        report(
+            "sealed envelope", n, read_all(), storage_stats("travellers"), "envelope"
+        )
+        print(f"migration: {migration:.2f}s ({n / migration:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/sql_functions.py
+#
+# Substring filter on encrypted scooter brand/model, for a term too short
+# for the token index (so every row is a candidate):
+#   - loop:   fetch every row, bulk-decrypt brand and model, filter in Python
+#             (the search before the SQL functions);
+#   - sql:    the same filter inside SQLite with decrypt()/text_contains();
+#   - sql+10: the SQL filter with LIMIT 10, as a first screen of results.
+# The decrypt cache is disabled, so every run decrypts. Run from the
+# project root:
+#   python -m benchmarks.sql_functions [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+from db import database
+from db.database import stream_rows
+from db.repositories import ScooterRepository
+from Models.rows import ScooterRow
+from Utils.DummyDataScooter import generate_scooter
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+TERM = "x"  # in "Xiaomi" and in all "XIA..." models: about one row in five
+
+FILTER = (
+    f"text_contains({ScooterRow.plain_sql('brand')}, ?) "
+    f"OR text_contains({ScooterRow.plain_sql('model')}, ?)"
+)
+
+
+def loop(conn):
+    cursor = conn.execute(ScooterRow.select_sql())
+    return [
+        s
+        for s in ScooterRow.wrap_all(stream_rows(cursor), prefetch=("brand", "model"))
+        if TERM in (s.brand or "").lower() or TERM in (s.model or "").lower()
+    ]
+
+
+def sql(conn, limit=-1):
+    cursor = conn.execute(
+        f"{ScooterRow.select_sql()} WHERE {FILTER} LIMIT ?", (TERM, TERM, limit)
+    )
+    return list(ScooterRow.wrap_all(stream_rows(cursor)))
+
+
+def measure(label: str, function, conn):
+    start = time.perf_counter()
+    rows = function(conn)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<7} | {elapsed * 1e3:8.1f} ms | {len(rows):6} rows to Python")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    encryptor.configure_cache(max_size=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        ScooterRepository().add_many(generate_scooter() for _ in range(n))
+
+        print(f"{n} scooters, term '{TERM}'")
+        with database.get_read_connection() as conn:
+            measure("loop", loop, conn)
+            measure("sql", sql, conn)
+            measure("sql+10", lambda c: sql(c, 10), conn)
+
+
+if __name__ == "__main__":
+    main()
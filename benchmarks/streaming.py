@@ -0,0 +1,70 @@
+# benchmarks/streaming.py
+#
+# Full scan of the scooters table with brand and model decrypted to filter,
+# as the search does for terms too short for the token index: once through
+# fetchall and a list of rows, once streamed with stream_rows. Reports the
+# time until the first row is available, the total time and the peak
+# Python memory. tracemalloc slows both runs down alike, and the process
+# pool's workers are not counted.
+# Run from the project root:
+#   python -m benchmarks.streaming [rows]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from db import database
+from db.database import stream_rows
+from db.repositories import ScooterRepository
+from Models.rows import ScooterRow
+from Utils.DummyDataScooter import generate_scooter
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+
+def as_list(cursor):
+    return list(ScooterRow.wrap_all(cursor.fetchall(), prefetch=("brand", "model")))
+
+
+def streamed(cursor):
+    return ScooterRow.wrap_all(stream_rows(cursor), prefetch=("brand", "model"))
+
+
+def measure(label: str, read):
+    encryptor.clear_cache()
+    tracemalloc.start()
+    with database.get_connection() as conn:
+        cursor = conn.execute(ScooterRow.select_sql())
+        start = time.perf_counter()
+        first = None
+        for row in read(cursor):
+            if first is None:
+                first = time.perf_counter() - start
+            row.brand
+        total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{label:<9} | first row {first * 1e3:7.1f} ms | total {total:5.2f} s"
+        f" | peak {peak / 2**20:6.1f} MiB"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        ScooterRepository().add_many(generate_scooter() for _ in range(n))
+
+        print(f"{n} scooters")
+        measure("fetchall", as_list)
+        measure("streamed", streamed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/swap_planner.py
+#
+# Battery swap planning (Utils.swapPlanner) for a synthetic fleet around
+# Rotterdam: scooters gathered around HOTSPOTS with a uniform sprinkle in
+# between, about a fifth of them below their target SoC and one in ten out
+# of service (those are not planned). Reported:
+#   - the time for plan_routes, with load, k-means and stop ordering apart;
+#   - the total route length with nearest neighbour only, with 2-opt on
+#     top, and for the stops of each route in id order (no ordering).
+# Every candidate must be in exactly one route of at most max_stops.
+# Run from the project root:
+#   python -m benchmarks.swap_planner [scooters] [max stops]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from db import database
+from Utils import swapPlanner
+
+LAT_RANGE = (51.85, 52.00)
+LON_RANGE = (4.30, 4.60)
+HOTSPOTS = 30
+BELOW_TARGET = 0.2
+OUT_OF_SERVICE = 0.1
+
+
+def scooters(n: int):
+    hotspots = [
+        (random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE))
+        for _ in range(HOTSPOTS)
+    ]
+    for i in range(n):
+        if random.random() < 0.8:
+            lat, lon = random.choice(hotspots)
+            lat, lon = random.gauss(lat, 0.004), random.gauss(lon, 0.006)
+        else:
+            lat, lon = random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE)
+        target_min = 20.0
+        soc = (
+            random.uniform(0, target_min)
+            if random.random() < BELOW_TARGET
+            else random.uniform(target_min, 100)
+        )
+        out_of_service = int(random.random() < OUT_OF_SERVICE)
+        yield (f"SN{i:010d}", round(soc, 1), target_min, lat, lon, out_of_service)
+
+
+def total_length(routes: list) -> float:
+    return sum(route["length_km"] for route in routes)
+
+
+def unordered_length(routes: list) -> float:
+    total = 0.0
+    for route in routes:
+        order = np.argsort(route["ids"])
+        lat = np.array(route["latitude"])[order]
+        lon = np.array(route["longitude"])[order]
+        points = swapPlanner._project(lat, lon)
+        total += swapPlanner._length(points)
+    return total
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 250_000
+    max_stops = int(sys.argv[2]) if len(sys.argv) > 2 else swapPlanner.MAX_STOPS
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        with database.transaction(immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO scooters (brand, model, serial_number, top_speed, "
+                "battery_capacity, soc, target_range_min, target_range_max, "
+                "latitude, longitude, out_of_service, in_service_date) "
+                "VALUES ('brand', 'model', ?, 25, 400, ?, ?, 90, ?, ?, ?, "
+                "'2024-01-01')",
+                scooters(n),
+            )
+
+        with database.get_read_connection() as conn:
+            out_of_service = [
+                row_id
+                for (row_id,) in conn.execute(
+                    "SELECT id FROM scooters WHERE out_of_service = 1"
+                )
+            ]
+
+        start = time.perf_counter()
+        candidates = swapPlanner.load_candidates()
+        loaded = time.perf_counter() - start
+        count = len(candidates["id"])
+        points = swapPlanner._project(candidates["latitude"], candidates["longitude"])
+        start = time.perf_counter()
+        swapPlanner.cluster(points, max_stops)
+        clustered = time.perf_counter() - start
+
+        start = time.perf_counter()
+        routes = swapPlanner.plan_routes(max_stops)
+        planned = time.perf_counter() - start
+
+        rounds = swapPlanner.MAX_ROUNDS
+        swapPlanner.MAX_ROUNDS = 0
+        start = time.perf_counter()
+        greedy = swapPlanner.plan_routes(max_stops)
+        greedy_time = time.perf_counter() - start
+        swapPlanner.MAX_ROUNDS = rounds
+
+    planned_ids = [row_id for route in routes for row_id in route["ids"]]
+    assert sorted(planned_ids) == candidates["id"].tolist()
+    assert not set(planned_ids) & set(out_of_service)
+    assert all(len(route["ids"]) <= max_stops for route in routes)
+
+    print(
+        f"{n} scooters, {count} in service below target, at most {max_stops} stops per route"
+    )
+    print(f"plan       | {planned:6.2f} s | {len(routes)} routes")
+    print(f"  load     | {loaded:6.2f} s")
+    print(f"  k-means  | {clustered:6.2f} s")
+    print(
+        f"  ordering | {planned - loaded - clustered:6.2f} s (nearest neighbour + 2-opt)"
+    )
+    print(f"nn only    | {greedy_time:6.2f} s")
+    print(f"length     | {unordered_length(routes):9.0f} km in id order")
+    print(f"           | {total_length(greedy):9.0f} km nearest neighbour")
+    print(f"           | {total_length(routes):9.0f} km nearest neighbour + 2-opt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/telemetry_ingest.py
+#
+# Telemetry frames (JSON lines with soc, latitude, longitude and mileage)
+# for a fleet spread over the Netherlands, each scooter reporting several
+# times. Most scooters are parked and report the same position; a MOVING
+# share rides on. About 1% of the frames are malformed or for unknown
+# scooters:
+#   - naive:    parse each frame and UPDATE its scooter in a transaction of
+#               its own (only for the first frames, it is slow);
+#   - pipeline: Utils.telemetry.ingest, validation as frames arrive, merging
+#               per scooter and batched writes on a writer thread.
+# The resident fleet index is built, so the pipeline also keeps it current.
+# Run from the project root:
+#   python -m benchmarks.telemetry_ingest [scooters] [frames]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.nearest_scooters import scooters
+from db import database
+from Utils.fleetIndex import fleet
+from Utils.telemetry import ingest, parse_frame
+
+NAIVE_FRAMES = 2_000
+MOVING = 0.2
+STEP = 0.0005  # degrees a moving scooter travels between two frames
+
+
+def frames(n: int, positions: dict):
+    moving = {row_id for row_id in positions if random.random() < MOVING}
+    soc = dict.fromkeys(positions, 100.0)
+    mileage = dict.fromkeys(positions, 0.0)
+    for _ in range(n):
+        roll = random.random()
+        if roll < 0.005:
+            yield '{"id": 1, "soc": 140}'
+            continue
+        if roll < 0.01:
+            yield '{"id": %d, "soc": 50}' % (len(positions) + 1)
+            continue
+        row_id = random.randint(1, len(positions))
+        lat, lon = positions[row_id]
+        if row_id in moving:
+            lat += random.uniform(-STEP, STEP)
+            lon += random.uniform(-STEP, STEP)
+            positions[row_id] = lat, lon
+            soc[row_id] = max(0.0, soc[row_id] - 0.1)
+            mileage[row_id] += 0.05
+        yield json.dumps(
+            {
+                "id": row_id,
+                "soc": round(soc[row_id], 1),
+                "latitude": lat,
+                "longitude": lon,
+                "mileage": round(mileage[row_id], 2),
+            }
+        )
+
+
+def naive(lines):
+    for line in lines:
+        try:
+            row_id, values = parse_frame(line)
+        except ValueError:
+            continue
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with database.transaction(immediate=True) as conn:
+            conn.execute(
+                f"UPDATE scooters SET {assignments} WHERE id = ?",
+                (*values.values(), row_id),
+            )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    random.seed(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.initialize_db()
+        with database.transaction(immediate=True) as conn:
+            conn.executemany(
+                "INSERT INTO scooters (brand, model, serial_number, top_speed, "
+                "battery_capacity, soc, target_range_min, target_range_max, "
+                "latitude, longitude, out_of_service, in_service_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                scooters(n),
+            )
+        fleet.build()
+        with database.get_read_connection() as conn:
+            positions = {
+                row_id: (lat, lon)
+                for row_id, lat, lon in conn.execute(
+                    "SELECT id, latitude, longitude FROM scooters"
+                )
+            }
+        lines = list(frames(count, positions))
+
+        start = time.perf_counter()
+        naive(lines[:NAIVE_FRAMES])
+        per_frame = (time.perf_counter() - start) / NAIVE_FRAMES
+
+        start = time.perf_counter()
+        stats = ingest(lines)
+        elapsed = time.perf_counter() - start
+
+        # The last valid frame of every scooter is what the table must hold
+        latest = {}
+        for line in lines:
+            try:
+                row_id, values = parse_frame(line)
+            except ValueError:
+                continue
+            latest.setdefault(row_id, {}).update(values)
+        with database.get_read_connection() as conn:
+            stored = {
+                row_id: (soc, lat, lon, mileage)
+                for row_id, soc, lat, lon, mileage in conn.execute(
+                    "SELECT id, soc, latitude, longitude, mileage FROM scooters"
+                )
+            }
+        for row_id, values in latest.items():
+            if row_id in stored:
+                assert stored[row_id] == tuple(values.values()), row_id
+                assert fleet.get(row_id)["soc"] == values["soc"], row_id
+
+    print(f"{n} scooters, {count} frames")
+    print(f"naive    | {1 / per_frame:10.0f} frames/s ({NAIVE_FRAMES} frames)")
+    print(f"pipeline | {count / elapsed:10.0f} frames/s ({elapsed:.2f} s)")
+    print(
+        f"  {stats['rejected']} rejected, {stats['unknown']} unknown, "
+        f"{stats['merged']} merged; {stats['written']} rows written in "
+        f"{stats['batches']} batches; reader waited {stats['stalled']:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
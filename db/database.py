@@ -2,16 +2,272 @@
 
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 from auth.passwordHash import hash_password
+from db import functions, tracing
 from Utils.encryption import Encryptor
 
 encryptor = Encryptor()
 
 DB_NAME = "data/urban_mobility.db"
 
+# Encrypted columns that get a keyed blind index for exact-match lookups.
+# table -> [(encrypted column, blind index column)]
+BLIND_INDEXES = {
+    "users": [("username", "username_bidx")],
+}
 
-def get_connection():
-    return sqlite3.connect(DB_NAME)
+
+# Applied to every new connection. WAL lets readers run next to a writer,
+# and NORMAL is still crash-safe in WAL mode (only the last commits before a
+# power loss can be lost). auto_vacuum only takes effect on a database
+# without tables yet; older ones are switched over by db.maintenance.
+PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 64 * 1024 * 1024,
+    "cache_size": -16_000,  # in KiB
+    "temp_store": "MEMORY",
+}
+# Read-only connections cannot change the journal mode, how it syncs or the
+# vacuum mode; these are properties of the database file and apply to them
+# all the same
+READ_PRAGMAS = {
+    name: value
+    for name, value in PRAGMAS.items()
+    if name not in ("auto_vacuum", "journal_mode", "synchronous")
+}
+STATEMENT_CACHE_SIZE = 256
+# Rows per fetchmany call when a result is streamed
+FETCH_SIZE = 500
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection that is reused by its thread. close() and leaving a `with`
+    block hand it back instead of closing it; when the outermost user gives
+    it back, an unfinished transaction is rolled back, as a real close would.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.users = 0
+
+    def __exit__(self, *exc_info):
+        result = super().__exit__(*exc_info)
+        self.close()
+        return result
+
+    def close(self):
+        self.users = max(self.users - 1, 0)
+        if not self.users and self.in_transaction:
+            self.rollback()
+
+
+class TracedConnection(PooledConnection):
+    """
+    PooledConnection whose statements are timed by db.tracing. Only opened
+    while tracing is enabled, so untraced connections pay nothing for it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        tracing.watch(self)
+
+    def cursor(self, factory=tracing.TracingCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute does not go through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_pool = threading.local()
+_all_connections = []
+_stats_lock = threading.Lock()
+_stats = {"opened": 0, "reused": 0}
+# Bumped by close_connections(), so every thread drops its closed connections
+_generation = 0
+# Mutations go through transaction(), one at a time per process; BEGIN
+# IMMEDIATE serializes them against other processes
+_write_lock = threading.RLock()
+
+
+def _pooled_connection(read_only: bool) -> PooledConnection:
+    if getattr(_pool, "generation", None) != _generation:
+        _pool.generation = _generation
+        _pool.connections = {}
+    connections = _pool.connections
+
+    key = (DB_NAME, read_only)
+    conn = connections.get(key)
+    if conn is None:
+        if read_only:
+            # mode=ro makes SQLite itself refuse every write
+            database = Path(DB_NAME).resolve().as_uri() + "?mode=ro"
+        else:
+            database = DB_NAME
+        conn = sqlite3.connect(
+            database,
+            uri=read_only,
+            factory=TracedConnection if tracing.enabled else PooledConnection,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        for name, value in (READ_PRAGMAS if read_only else PRAGMAS).items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        functions.register(conn)
+        conn.read_only = read_only
+        connections[key] = conn
+        with _stats_lock:
+            _stats["opened"] += 1
+            _all_connections.append(conn)
+    else:
+        with _stats_lock:
+            _stats["reused"] += 1
+
+    conn.users += 1
+    return conn
+
+
+def get_connection() -> PooledConnection:
+    """The calling thread's connection to DB_NAME, opened on first use."""
+    return _pooled_connection(read_only=False)
+
+
+def get_read_connection() -> PooledConnection:
+    """
+    The calling thread's read-only connection to DB_NAME. Reports and
+    listings read through it, so they never hold a write lock; under WAL
+    they do not wait for the writer either.
+    """
+    return _pooled_connection(read_only=True)
+
+
+@contextmanager
+def snapshot():
+    """
+    Read-only connection that sees one consistent state of the database for
+    the whole block; commits made in the meantime show up only afterwards.
+    """
+    conn = get_read_connection()
+    try:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            # Nothing to commit; ending the read lets checkpoints move on
+            conn.rollback()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(immediate: bool = False):
+    """
+    Run a block in one transaction: commit on success, roll back on error.
+    immediate=True takes the database write lock up front. Transactions are
+    serialized within the process, and nested blocks become savepoints of
+    the outer transaction.
+    """
+    conn = get_connection()
+    try:
+        if conn.in_transaction:
+            savepoint = f"sp_{conn.users}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                raise
+            finally:
+                conn.execute(f"RELEASE {savepoint}")
+        else:
+            with _write_lock:
+                conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.rollback()
+                    raise
+                conn.commit()
+    finally:
+        conn.close()
+
+
+def stream_rows(cur, size: int = FETCH_SIZE):
+    """
+    Yield the rows of an executed cursor, fetched `size` at a time, so a
+    large result never sits in memory whole. The cursor must not run other
+    statements until the stream is exhausted.
+    """
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def connection_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "open": len(_all_connections)}
+
+
+def checkpoint():
+    """Copy the WAL into the database file, so the file alone is complete."""
+    with get_connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def close_connections():
+    """
+    Really close every pooled connection, e.g. at exit. Threads open a new
+    one on their next get_connection(). Read-only connections can neither
+    checkpoint nor remove the WAL, so they go first; the WAL is then
+    checkpointed, and the last writer to close deletes it with the -shm.
+    """
+    global _generation
+    with _stats_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+    # False sorts first: the read-only connections
+    connections.sort(key=lambda conn: not conn.read_only)
+    for conn in connections:
+        if not conn.read_only and not conn.in_transaction:
+            sqlite3.Connection.execute(conn, "PRAGMA wal_checkpoint(TRUNCATE)")
+        sqlite3.Connection.close(conn)
+
+
+def restore(source: str):
+    """
+    Replace the contents of the open database with the database file at
+    `source`, through SQLite's backup API. The copy is written through the
+    writer connection like any transaction, so the database file, its WAL
+    and -shm are never swapped under SQLite, and pooled connections stay
+    valid.
+    """
+    with _write_lock:
+        conn = get_connection()
+        try:
+            backup = sqlite3.connect(
+                Path(source).resolve().as_uri() + "?mode=ro", uri=True
+            )
+            try:
+                backup.backup(conn)
+            finally:
+                backup.close()
+        finally:
+            conn.close()
 
 
 def initialize_db():
@@ -26,7 +282,8 @@ def initialize_db():
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT NOT NULL,
         password_hash TEXT NOT NULL,
-        role TEXT NOT NULL
+        role TEXT NOT NULL,
+        username_bidx TEXT
     )
     """
     )
@@ -82,7 +339,8 @@ def initialize_db():
         city TEXT NOT NULL,
         email TEXT NOT NULL,
         mobile_phone TEXT NOT NULL,
-        driving_license_number TEXT NOT NULL
+        driving_license_number TEXT NOT NULL,
+        sealed TEXT
     )
     """
     )
@@ -117,21 +375,72 @@ def initialize_db():
     """
     )
 
+    # Columns, side tables and indexes added after the first release
+    from db.migrations import run_migrations
+
+    run_migrations()
+
     # Check if super_admin exists
     cur.execute(
-        "SELECT * FROM users WHERE LOWER(username) = LOWER(?)", ("super_admin",)
+        "SELECT 1 FROM users WHERE username_bidx = ?",
+        (encryptor.blind_index("super_admin", "username"),),
     )
     if not cur.fetchone():
-        hashed_pw = hash_password("Admin_123?")
-        cur.execute(
-            "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-            (
-                encryptor.encrypt_text("super_admin").decode(),  # encrypt username
-                hashed_pw,  # keep password hashed
-                encryptor.encrypt_text("super_administrator").decode(),
-            ),
+        from db.repositories import UserRepository
+
+        UserRepository().add(
+            {
+                "username": "super_admin",
+                "password_hash": hash_password("Admin_123?"),  # keep password hashed
+                "role": "super_administrator",
+            }
         )
         print("[INFO] Super Admin created with username: super_admin")
 
     conn.commit()
     conn.close()
+
+    # Databases created before auto_vacuum was set are converted once
+    from db.maintenance import ensure_incremental_vacuum
+
+    ensure_incremental_vacuum()
+
+
+def ensure_blind_indexes(cur):
+    """
+    Add any missing blind index columns and their SQL indexes, then backfill
+    rows written before the column existed.
+    """
+    for table, columns in BLIND_INDEXES.items():
+        cur.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cur.fetchall()}
+
+        for source_column, index_column in columns:
+            if index_column not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {index_column} TEXT")
+            cur.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_{index_column} "
+                f"ON {table}({index_column})"
+            )
+            backfill_blind_index(cur, table, source_column, index_column)
+
+
+def backfill_blind_index(cur, table, source_column, index_column):
+    cur.execute(f"SELECT id, {source_column} FROM {table} WHERE {index_column} IS NULL")
+    rows = cur.fetchall()
+
+    updates = []
+    for row_id, stored_value in rows:
+        try:
+            value = encryptor.decrypt_text(stored_value)
+        except Exception:
+            # fallback for rows that were stored unencrypted
+            value = stored_value
+        updates.append((encryptor.blind_index(value, source_column), row_id))
+
+    cur.executemany(
+        f"UPDATE {table} SET {index_column} = ? WHERE id = ?",
+        updates,
+    )
+    if updates:
+        print(f"[INFO] Backfilled {len(updates)} blind index values in {table}.")
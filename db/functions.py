@@ -0,0 +1,106 @@
+# db/functions.py
+
+import threading
+from Utils import dictionary
+from Utils.encryption import Encryptor
+
+encryptor = Encryptor()
+
+# SQL functions over encrypted columns, registered on every pooled
+# connection. With them a filter or projection on decrypted values runs in
+# SQLite's own loop: rows that do not match never reach Python, and a LIMIT
+# ends the scan as soon as it is met. See LazyRow.plain_sql for the
+# expression that decrypts a column of a row class.
+#
+# They are declared deterministic (same arguments, same result for a given
+# key), so SQLite may evaluate them once per distinct argument in a
+# statement. A key rotation changes their results, so never use them in an
+# index, a generated column or a CHECK constraint.
+
+_last_envelope = threading.local()
+
+
+def _normalize(value) -> str:
+    return str(value).strip().lower()
+
+
+def decrypt(value):
+    """decrypt(column): the plaintext, or the value itself if it is no token."""
+    if value is None:
+        return None
+    try:
+        return encryptor.decrypt_text(value)
+    except Exception:
+        # Same fallback as the row classes: unencrypted legacy data
+        return value
+
+
+def open_field(envelope, context, position):
+    """open_field(sealed, 'table:' || id, n): value n of a row envelope."""
+    if envelope is None:
+        return None
+    # Filters read several fields of the same row in a row, so the last
+    # envelope stays open
+    last = getattr(_last_envelope, "value", None)
+    if last is None or last[0] != envelope or last[1] != context:
+        try:
+            values = encryptor.open_record(envelope, context)
+        except Exception:
+            return None
+        last = _last_envelope.value = (envelope, context, values)
+    return last[2][position]
+
+
+def dictionary_value(code):
+    """dictionary_value(code): the plaintext of a dictionary code."""
+    return dictionary.decode(code)
+
+
+def text_contains(value, term) -> int:
+    """text_contains(value, term): 1 if term occurs in value, ignoring case."""
+    if value is None or term is None:
+        return 0
+    return int(_normalize(term) in _normalize(value))
+
+
+def text_equals(value, other) -> int:
+    """text_equals(a, b): 1 if both are equal, ignoring case and blanks."""
+    if value is None or other is None:
+        return 0
+    return int(_normalize(value) == _normalize(other))
+
+
+def blind_index(value, column):
+    """blind_index(value, 'column'): the keyed exact-match token."""
+    if value is None:
+        return None
+    return encryptor.blind_index(str(value), column)
+
+
+def search_token(gram, column):
+    """search_token(gram, 'table.column'): the keyed n-gram search token."""
+    if gram is None:
+        return None
+    return encryptor.search_token(str(gram), column)
+
+
+# name -> (number of arguments, function)
+FUNCTIONS = {
+    "decrypt": (1, decrypt),
+    "open_field": (3, open_field),
+    "dictionary_value": (1, dictionary_value),
+    "text_contains": (2, text_contains),
+    "text_equals": (2, text_equals),
+    "blind_index": (2, blind_index),
+    "search_token": (2, search_token),
+}
+
+
+def register(conn):
+    for name, (arguments, function) in FUNCTIONS.items():
+        conn.create_function(name, arguments, function, deterministic=True)
+
+
+def clear():
+    """Forget the envelope kept open by open_field, e.g. at logout."""
+    _last_envelope.value = None
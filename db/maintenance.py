@@ -0,0 +1,208 @@
+# db/maintenance.py
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from db import database
+from db.database import get_connection, get_read_connection, transaction
+
+# Space reclamation and planner statistics. The database runs with
+# auto_vacuum=INCREMENTAL: pages freed by deletes, key rotation and restores
+# stay on the free list until `PRAGMA incremental_vacuum` gives them back to
+# the file system, PAGES_PER_RUN at a time, so the write lock is only held
+# briefly. Each run also refreshes the ANALYZE statistics (sampling at most
+# ANALYSIS_LIMIT rows per index) and records the file size and free pages in
+# maintenance_runs, so growth and fragmentation can be followed over time.
+#   python main.py                          runs it every INTERVAL_SECONDS
+#   python -m db.maintenance run [pages]    one run now (0: every free page)
+#   python -m db.maintenance report [n]     the last n runs
+PAGES_PER_RUN = 256
+INTERVAL_SECONDS = 15 * 60
+ANALYSIS_LIMIT = 1000
+
+AUTO_VACUUM_INCREMENTAL = 2  # as reported by PRAGMA auto_vacuum
+
+_stop = threading.Event()
+_thread = None
+
+
+def create_history_table(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_at TEXT NOT NULL,
+        file_bytes INTEGER NOT NULL,
+        page_count INTEGER NOT NULL,
+        free_pages INTEGER NOT NULL,
+        reclaimed INTEGER NOT NULL,
+        analyze_ms REAL NOT NULL
+    )
+    """
+    )
+
+
+def _pragma(conn, name: str) -> int:
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def ensure_incremental_vacuum() -> bool:
+    """
+    Switch a database created without auto_vacuum to INCREMENTAL. That takes
+    one full VACUUM, so it only runs once; returns True if it did.
+    """
+    with get_connection() as conn:
+        if _pragma(conn, "auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+            return False
+        print("[INFO] Enabling incremental auto-vacuum (one-time VACUUM)...")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    return True
+
+
+def run_maintenance(pages: int = PAGES_PER_RUN) -> dict:
+    """
+    Reclaim up to `pages` free pages (0: all of them), refresh the planner
+    statistics and record the result. Returns the recorded run.
+    """
+    with transaction(immediate=True) as conn:
+        free_before = _pragma(conn, "freelist_count")
+        # Every step of the statement frees one page, but sqlite3 steps a
+        # statement without result columns only once, so it runs per page
+        for _ in range(min(pages, free_before) if pages else free_before):
+            conn.execute("PRAGMA incremental_vacuum(1)")
+
+        start = time.perf_counter()
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
+        analyze_ms = (time.perf_counter() - start) * 1000
+
+        free_after = _pragma(conn, "freelist_count")
+        run = {
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "page_count": _pragma(conn, "page_count"),
+            "free_pages": free_after,
+            "reclaimed": free_before - free_after,
+            "analyze_ms": analyze_ms,
+        }
+
+    # Under WAL the file only shrinks once the freed pages are checkpointed;
+    # PASSIVE does not wait for readers, the next run catches up otherwise
+    with get_connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    run["file_bytes"] = os.path.getsize(database.DB_NAME)
+
+    with transaction() as conn:
+        create_history_table(conn)
+        conn.execute(
+            f"INSERT INTO maintenance_runs ({', '.join(run)}) "
+            f"VALUES ({', '.join('?' for _ in run)})",
+            tuple(run.values()),
+        )
+    return run
+
+
+def _loop(interval: float):
+    while not _stop.wait(interval):
+        try:
+            run_maintenance()
+        except sqlite3.Error:
+            # Busy or locked by another process; the next run tries again.
+            # Nothing is printed, so the menus are not interrupted.
+            pass
+
+
+def start(interval: float = INTERVAL_SECONDS):
+    """Run maintenance in a background thread every `interval` seconds."""
+    global _thread
+    if _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_loop, args=(interval,), name="db-maintenance", daemon=True
+    )
+    _thread.start()
+
+
+def stop():
+    """Stop the background thread, letting a run in progress finish."""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join()
+    _thread = None
+
+
+def space_status() -> dict:
+    with get_read_connection() as conn:
+        page_size = _pragma(conn, "page_size")
+        page_count = _pragma(conn, "page_count")
+        free_pages = _pragma(conn, "freelist_count")
+        auto_vacuum = _pragma(conn, "auto_vacuum")
+    return {
+        "file_bytes": os.path.getsize(database.DB_NAME),
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_pages": free_pages,
+        "incremental": auto_vacuum == AUTO_VACUUM_INCREMENTAL,
+    }
+
+
+def report(limit: int = 20):
+    status = space_status()
+    free_share = status["free_pages"] / max(status["page_count"], 1)
+    print(
+        f"Now: {status['file_bytes'] / 1024:.0f} KiB, {status['page_count']} pages "
+        f"of {status['page_size']} bytes, {status['free_pages']} free "
+        f"({free_share:.1%}), incremental auto-vacuum "
+        f"{'on' if status['incremental'] else 'off'}"
+    )
+
+    with get_read_connection() as conn:
+        try:
+            runs = conn.execute(
+                "SELECT run_at, file_bytes, page_count, free_pages, reclaimed, "
+                "analyze_ms FROM maintenance_runs ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            runs = []
+    if not runs:
+        print("[INFO] No maintenance runs recorded yet.")
+        return
+
+    print(
+        f"{'run at':<19} {'file KiB':>9} {'pages':>8} {'free':>7} {'free %':>7}"
+        f" {'reclaimed':>9} {'analyze ms':>10}"
+    )
+    for run_at, size, pages, free, reclaimed, analyze_ms in reversed(runs):
+        print(
+            f"{run_at:<19} {size / 1024:9.0f} {pages:8} {free:7}"
+            f" {free / max(pages, 1):7.1%} {reclaimed:9} {analyze_ms:10.1f}"
+        )
+
+
+def main():
+    # python -m db.maintenance run [pages] | report [n]
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+    if command == "run":
+        pages = int(sys.argv[2]) if len(sys.argv) > 2 else PAGES_PER_RUN
+        ensure_incremental_vacuum()
+        run = run_maintenance(pages)
+        print(
+            f"[INFO] Reclaimed {run['reclaimed']} pages; {run['free_pages']} free "
+            f"pages left, file {run['file_bytes'] / 1024:.0f} KiB."
+        )
+    elif command == "report":
+        report(int(sys.argv[2]) if len(sys.argv) > 2 else 20)
+    else:
+        print(f"[ERROR] Unknown command '{command}'.")
+
+
+if __name__ == "__main__":
+    main()
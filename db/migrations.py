@@ -0,0 +1,124 @@
+# db/migrations.py
+
+import datetime
+import sys
+from db.database import ensure_blind_indexes, transaction
+from Models.rows import ScooterRow, TravellerRow, UserRow
+from Utils.dictionary import backfill, ensure_code_columns
+from Utils.geoIndex import create_geo_index, create_update_trigger
+from Utils.rowEnvelope import ensure_envelope_columns
+from Utils.searchIndex import create_search_tables, rebuild_search_index
+
+# Forward-only schema migrations. Each one runs in its own transaction and
+# is recorded in schema_version, so it is applied exactly once per database.
+# Databases created before this table existed start at version 0; the early
+# migrations check what is already there, so they are safe to run on them.
+
+
+def _add_blind_indexes(cur):
+    ensure_blind_indexes(cur)
+
+
+def _add_envelope_columns(cur):
+    ensure_envelope_columns(cur)
+
+
+def _add_search_tables(cur):
+    for table in create_search_tables(cur):
+        rebuild_search_index(cur, table)
+
+
+def _add_lookup_indexes(cur):
+    # Restore codes and file names are looked up on every restore
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_backups_restore_code ON backups(restore_code)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_backups_file_name ON backups(file_name)"
+    )
+    # Log review filters by date and user; suspicious entries are few, so a
+    # partial index keeps them cheap to find
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_date ON logs(log_date, log_time)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_username ON logs(username)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_logs_suspicious "
+        "ON logs(log_date) WHERE suspicious = 1"
+    )
+
+
+def _add_dictionary(cur):
+    ensure_code_columns(cur)
+    for row_cls in (ScooterRow, TravellerRow, UserRow):
+        backfill(cur, row_cls)
+
+
+# (version, description, function); append only, never reorder or edit
+MIGRATIONS = [
+    (1, "Blind index for usernames", _add_blind_indexes),
+    (2, "Row envelope columns", _add_envelope_columns),
+    (3, "Substring search token tables", _add_search_tables),
+    (4, "Indexes for backup and log lookups", _add_lookup_indexes),
+    (5, "Dictionary encoding for brand, gender, city and role", _add_dictionary),
+    (6, "R*Tree index of scooter locations", create_geo_index),
+    (7, "Skip unmoved scooters in the location trigger", create_update_trigger),
+]
+
+
+def _create_version_table(cur):
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+    """
+    )
+
+
+def current_version() -> int:
+    with transaction() as conn:
+        cur = conn.cursor()
+        _create_version_table(cur)
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cur.fetchone()[0]
+
+
+def run_migrations() -> int:
+    """Apply every pending migration in order. Returns how many ran."""
+    applied = 0
+    for version, description, migrate in MIGRATIONS:
+        # Checked per migration inside the write lock, so two processes
+        # starting at once never apply the same migration twice
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            _create_version_table(cur)
+            cur.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cur.fetchone():
+                continue
+
+            migrate(cur)
+            cur.execute(
+                "INSERT INTO schema_version (version, description, applied_at) "
+                "VALUES (?, ?, ?)",
+                (version, description, datetime.datetime.now().isoformat()),
+            )
+        print(f"[INFO] Applied schema migration {version}: {description}")
+        applied += 1
+    return applied
+
+
+def main():
+    # python -m db.migrations        apply pending migrations
+    # python -m db.migrations status
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        version = current_version()
+        for number, description, _ in MIGRATIONS:
+            state = "applied" if number <= version else "pending"
+            print(f"{number:>3} {state:<8} {description}")
+    else:
+        run_migrations()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# db/pagination.py
+
+from db.database import get_read_connection
+
+# Listings are read one page at a time, keyed on id: every page continues
+# after the last id of the previous one, so the primary key finds its start
+# directly and page 1000 costs the same as page 1. OFFSET would read and
+# throw away all rows before the page instead.
+PAGE_SIZE = 25
+
+
+def fetch_page(
+    select_sql: str, after_id=0, page_size: int = PAGE_SIZE, where="", params=()
+):
+    """
+    One page of `select_sql` (a plain SELECT ... FROM table whose first
+    column is id), holding the rows with an id greater than after_id.
+    Returns (rows, cursor); the cursor continues the listing and is None on
+    the last page.
+    """
+    condition = f"({where}) AND id > ?" if where else "id > ?"
+    with get_read_connection() as conn:
+        # One row more than asked tells whether another page follows
+        rows = conn.execute(
+            f"{select_sql} WHERE {condition} ORDER BY id LIMIT ?",
+            (*params, after_id, page_size + 1),
+        ).fetchall()
+    if len(rows) > page_size:
+        return rows[:page_size], rows[page_size - 1][0]
+    return rows, None
+
+
+def browse(fetch, show_page, start=0) -> bool:
+    """
+    Show pages until they run out or the user stops. fetch(cursor) returns
+    (rows, next cursor) like fetch_page; show_page prints one list of rows.
+    Returns False when there was nothing to show.
+    """
+    cursor = start
+    number = 0
+    while True:
+        rows, cursor = fetch(cursor)
+        if not rows:
+            return number > 0
+        number += 1
+        print(f"\n--- Page {number} ---")
+        show_page(rows)
+        if cursor is None:
+            return True
+        if input("[Enter] next page, 'q' to stop: ").strip().lower() == "q":
+            return True
+
+
+def browse_table(
+    select_sql: str, show_page, page_size: int = PAGE_SIZE, where="", params=()
+) -> bool:
+    return browse(
+        lambda after_id: fetch_page(select_sql, after_id, page_size, where, params),
+        show_page,
+    )
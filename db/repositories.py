@@ -0,0 +1,313 @@
+# db/repositories.py
+
+from db.database import transaction
+from Models.rows import ScooterRow, TravellerRow
+from Utils import dictionary
+from Utils.encryption import Encryptor
+from Utils.fleetIndex import fleet
+from Utils.rowEnvelope import envelope_enabled, update_field
+from Utils.searchIndex import SEARCH_INDEXES, index_new_rows, index_row, remove_rows
+
+encryptor = Encryptor()
+
+
+class Repository:
+    """
+    Batched writes for one table. Records are dicts of plaintext values keyed
+    by column name. The ENCRYPTED columns of a whole batch are encrypted in
+    bulk, the batch is written with executemany, and every batch call runs
+    in a single transaction (together with its search index tokens).
+    Dictionary-encoded columns (Utils.dictionary) are written as their code.
+    """
+
+    TABLE = ""
+    COLUMNS = ()  # insertable columns, without id
+    ENCRYPTED = ()
+
+    def add(self, record: dict) -> int:
+        return self.add_many([record])[0]
+
+    def add_many(self, records) -> list:
+        """Insert all records and return their new ids, in order."""
+        records = list(records)
+        if not records:
+            return []
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            ids = self._next_ids(cur, len(records))
+            self._insert(cur, ids, records)
+            if self.TABLE in SEARCH_INDEXES:
+                index_new_rows(cur, self.TABLE, zip(ids, records))
+        return list(ids)
+
+    def update(self, row_id: int, values: dict):
+        self.update_many({row_id: values})
+
+    def update_many(self, changes: dict):
+        """
+        Apply {id: {column: new plaintext value}}. Rows that change the same
+        set of columns share one executemany.
+        """
+        groups = {}
+        for row_id, values in changes.items():
+            groups.setdefault(tuple(sorted(values)), []).append((row_id, values))
+
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            for columns, items in groups.items():
+                self._update(cur, columns, items)
+                if self.TABLE in SEARCH_INDEXES:
+                    for row_id, values in items:
+                        index_row(cur, self.TABLE, row_id, values)
+
+    def delete(self, row_id: int):
+        self.delete_many([row_id])
+
+    def delete_many(self, row_ids):
+        row_ids = [(row_id,) for row_id in row_ids]
+        with transaction(immediate=True) as conn:
+            cur = conn.cursor()
+            self._delete(cur, row_ids)
+            if self.TABLE in SEARCH_INDEXES:
+                remove_rows(cur, self.TABLE, (row_id for (row_id,) in row_ids))
+
+    def _next_ids(self, cur, count: int) -> range:
+        # executemany does not report the ids it inserted, so they are
+        # handed out up front, while the transaction holds the write lock.
+        # Starting past sqlite_sequence keeps AUTOINCREMENT's promise that
+        # ids of deleted rows are never reused.
+        cur.execute(
+            f"SELECT MAX(COALESCE(MAX(id), 0), COALESCE("
+            f"(SELECT seq FROM sqlite_sequence WHERE name = ?), 0)) FROM {self.TABLE}",
+            (self.TABLE,),
+        )
+        start = cur.fetchone()[0] + 1
+        return range(start, start + count)
+
+    def _coded(self) -> dict:
+        return dictionary.CODED_COLUMNS.get(self.TABLE, {})
+
+    def _encode(self, cur, records) -> list:
+        coded = self._coded()
+        if not coded:
+            return records
+        memo = {}
+        return [
+            {**record, **dictionary.encode_values(cur, self.TABLE, record, memo)}
+            for record in records
+        ]
+
+    def _encrypted_rows(self, columns, records):
+        # Coded columns hold '' once encoded, so there is nothing to encrypt
+        positions = [
+            columns.index(column)
+            for column in self.ENCRYPTED
+            if column in columns and column not in self._coded()
+        ]
+        return encryptor.encrypt_rows(
+            (tuple(record.get(column) for column in columns) for record in records),
+            positions,
+        )
+
+    def _insert(self, cur, ids, records):
+        columns = (*self.COLUMNS, *self._coded().values())
+        cur.executemany(
+            f"INSERT INTO {self.TABLE} (id, {', '.join(columns)}) "
+            f"VALUES (?, {', '.join('?' for _ in columns)})",
+            (
+                (row_id, *row)
+                for row_id, row in zip(
+                    ids, self._encrypted_rows(columns, self._encode(cur, records))
+                )
+            ),
+        )
+
+    def _update(self, cur, columns, items):
+        coded = self._coded()
+        if any(column in coded for column in columns):
+            memo = {}
+            items = [
+                (
+                    row_id,
+                    {
+                        **values,
+                        **dictionary.encode_values(cur, self.TABLE, values, memo),
+                    },
+                )
+                for row_id, values in items
+            ]
+            columns = tuple(sorted(items[0][1]))
+        positions = [
+            i
+            for i, column in enumerate(columns)
+            if column in self.ENCRYPTED and column not in coded
+        ]
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        cur.executemany(
+            f"UPDATE {self.TABLE} SET {assignments} WHERE id = ?",
+            encryptor.encrypt_rows(
+                (
+                    (*(values[column] for column in columns), row_id)
+                    for row_id, values in items
+                ),
+                positions,
+            ),
+        )
+
+    def _delete(self, cur, row_ids):
+        cur.executemany(f"DELETE FROM {self.TABLE} WHERE id = ?", row_ids)
+
+
+class ScooterRepository(Repository):
+    """Also patches the resident fleet index once each batch is committed."""
+
+    TABLE = "scooters"
+    COLUMNS = tuple(
+        column
+        for column in ScooterRow.COLUMNS[1:]
+        if column not in ScooterRow.CODES.values()
+    )
+    ENCRYPTED = ScooterRow.ENCRYPTED
+
+    def add_many(self, records) -> list:
+        records = list(records)
+        ids = super().add_many(records)
+        fleet.upsert_many(dict(zip(ids, records)))
+        return ids
+
+    def update_many(self, changes: dict):
+        super().update_many(changes)
+        fleet.upsert_many(changes)
+
+    def delete_many(self, row_ids):
+        row_ids = list(row_ids)
+        super().delete_many(row_ids)
+        for row_id in row_ids:
+            fleet.remove(row_id)
+
+
+class TravellerRepository(Repository):
+    TABLE = "travellers"
+    COLUMNS = TravellerRow.ENCRYPTED
+    ENCRYPTED = TravellerRow.ENCRYPTED
+
+    def _insert(self, cur, ids, records):
+        if not envelope_enabled(cur, self.TABLE):
+            super()._insert(cur, ids, records)
+            return
+
+        # Envelope mode: the ids are known up front, so every envelope can be
+        # sealed before the single insert. The envelope holds the coded
+        # values too; the codes are only written alongside.
+        codes = tuple(self._coded().values())
+        empty = ", ".join("''" for _ in self.COLUMNS)
+        cur.executemany(
+            f"INSERT INTO {self.TABLE} "
+            f"(id, {', '.join(self.COLUMNS)}, sealed, {', '.join(codes)}) "
+            f"VALUES (?, {empty}, ?, {', '.join('?' for _ in codes)})",
+            (
+                (
+                    row_id,
+                    encryptor.seal_record(
+                        [record[column] for column in self.COLUMNS],
+                        f"{self.TABLE}:{row_id}",
+                    ),
+                    *(encoded[code] for code in codes),
+                )
+                for row_id, record, encoded in zip(
+                    ids, records, self._encode(cur, records)
+                )
+            ),
+        )
+
+    def _update(self, cur, columns, items):
+        # Sealed rows have to be reopened, so updates go row by row, still
+        # inside the batch's transaction
+        for row_id, values in items:
+            for column in columns:
+                update_field(cur, self.TABLE, row_id, column, values[column])
+
+
+class UserRepository(Repository):
+    """
+    Users together with their profile. Records may carry first_name,
+    last_name and registration_date for the profiles table.
+    """
+
+    TABLE = "users"
+    COLUMNS = ("username", "password_hash", "role", "username_bidx")
+    ENCRYPTED = ("username", "role")
+    PROFILE_COLUMNS = ("first_name", "last_name", "registration_date")
+
+    def _with_blind_index(self, values: dict) -> dict:
+        if "username" in values:
+            values = {
+                **values,
+                "username_bidx": encryptor.blind_index(values["username"], "username"),
+            }
+        return values
+
+    def _insert(self, cur, ids, records):
+        records = [self._with_blind_index(record) for record in records]
+        super()._insert(cur, ids, records)
+
+        profiles = [
+            (row_id, *(record[column] for column in self.PROFILE_COLUMNS))
+            for row_id, record in zip(ids, records)
+            if "first_name" in record
+        ]
+        cur.executemany(
+            "INSERT INTO profiles (user_id, first_name, last_name, registration_date) "
+            "VALUES (?, ?, ?, ?)",
+            encryptor.encrypt_rows(profiles, (1, 2, 3)),
+        )
+
+    def _update(self, cur, columns, items):
+        items = [(row_id, self._with_blind_index(values)) for row_id, values in items]
+        columns = tuple(sorted(items[0][1]))
+        super()._update(cur, columns, items)
+
+    def _delete(self, cur, row_ids):
+        cur.executemany("DELETE FROM profiles WHERE user_id = ?", row_ids)
+        super()._delete(cur, row_ids)
+
+
+class BackupRepository(Repository):
+    TABLE = "backups"
+    COLUMNS = (
+        "file_name",
+        "created_by",
+        "created_at",
+        "restore_code",
+        "assigned_to",
+        "used",
+    )
+
+    def assign_restore_code(self, file_name: str, code: str, admin: str) -> bool:
+        with transaction() as conn:
+            cur = conn.execute(
+                "UPDATE backups SET restore_code = ?, assigned_to = ?, used = 0 "
+                "WHERE file_name = ?",
+                (code, admin, file_name),
+            )
+            return cur.rowcount > 0
+
+    def revoke_restore_code(self, code: str):
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE backups SET restore_code = NULL, assigned_to = NULL, used = 0 "
+                "WHERE restore_code = ?",
+                (code,),
+            )
+
+    def mark_used(self, file_name: str = None, restore_code: str = None):
+        with transaction() as conn:
+            if restore_code is not None:
+                conn.execute(
+                    "UPDATE backups SET used = 1 WHERE restore_code = ?",
+                    (restore_code,),
+                )
+            else:
+                conn.execute(
+                    "UPDATE backups SET used = 1 WHERE file_name = ?", (file_name,)
+                )
@@ -0,0 +1,301 @@
+# db/tracing.py
+
+import atexit
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Opt-in SQL instrumentation. Once enabled, every statement run through a
+# pooled connection is timed, from execute until its last row is fetched.
+# Per distinct statement it records the count, total time, rows returned
+# (or changed), SQLite VM steps and a latency histogram for percentiles.
+# Statements slower than SLOW_QUERY_MS also go to the slow-query log. The
+# statistics are merged into STATS_FILE on exit, so they add up over runs.
+#   python main.py --trace-sql        run the app with tracing
+#   python -m db.tracing report [n]   top statements by total time
+#   python -m db.tracing reset
+STATS_FILE = "data/sql_stats.json"
+SLOW_QUERY_LOG = "data/slow_queries.log"
+SLOW_QUERY_MS = 100
+# SQLite calls the progress handler every this many VM instructions
+PROGRESS_STEPS = 1000
+
+enabled = False
+_stats = {}
+_lock = threading.Lock()
+_current = threading.local()
+
+
+def enable():
+    """
+    Trace connections opened from now on; close_connections() makes every
+    thread open a traced one.
+    """
+    global enabled
+    if not enabled:
+        enabled = True
+        atexit.register(save_stats)
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def normalize(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class Histogram:
+    """
+    Latency histogram with buckets a quarter octave wide (about 19%), so
+    percentiles come out within that precision at constant memory.
+    """
+
+    PER_OCTAVE = 4
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets or {}
+
+    def add(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        index = int(math.log2(micros) * self.PER_OCTAVE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "Histogram"):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, in seconds."""
+        total = sum(self.buckets.values())
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= total * p / 100:
+                return 2 ** ((index + 1) / self.PER_OCTAVE) / 1e6
+        return 0.0
+
+
+class StatementStats:
+    __slots__ = ("count", "total", "rows", "steps", "histogram")
+
+    def __init__(self, count=0, total=0.0, rows=0, steps=0, buckets=None):
+        self.count = count
+        self.total = total
+        self.rows = rows
+        self.steps = steps
+        self.histogram = Histogram(buckets)
+
+    def to_json(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "rows": self.rows,
+            "steps": self.steps,
+            # JSON keys are strings
+            "buckets": {str(i): n for i, n in self.histogram.buckets.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "StatementStats":
+        buckets = {int(i): n for i, n in data["buckets"].items()}
+        return cls(data["count"], data["total"], data["rows"], data["steps"], buckets)
+
+
+def _count_step():
+    _current.steps = getattr(_current, "steps", 0) + PROGRESS_STEPS
+    return 0  # non-zero would abort the statement
+
+
+def watch(conn: sqlite3.Connection):
+    """Count the VM steps of the statements run on a connection."""
+    conn.set_progress_handler(_count_step, PROGRESS_STEPS)
+
+
+def record(sql: str, seconds: float, rows: int, steps: int):
+    key = normalize(sql)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = StatementStats()
+        stats.count += 1
+        stats.total += seconds
+        stats.rows += rows
+        stats.steps += steps
+        stats.histogram.add(seconds)
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        with _lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(
+                f"{datetime.now().isoformat(timespec='seconds')} | "
+                f"{seconds * 1000:.1f} ms | {rows} rows | {key}\n"
+            )
+
+
+class TracingCursor(sqlite3.Cursor):
+    """
+    Cursor that times its statements. A statement stays open while its rows
+    are fetched and is recorded when they run out, when the cursor runs the
+    next statement, or when it is closed.
+    """
+
+    _sql = None
+
+    def _start(self, sql: str):
+        self._finish()
+        self._sql = sql
+        self._rows = 0
+        self._elapsed = 0.0
+        _current.steps = 0
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            record(sql, self._elapsed, self._rows, getattr(_current, "steps", 0))
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._start(sql)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            # Nothing to fetch; count the rows it changed instead
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._rows = max(self.rowcount, 0)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._sql is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size or self.arraysize)
+        if self._sql is not None:
+            self._rows += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._sql is not None:
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._sql is not None:
+            self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # conn.execute() cursors are often dropped without being read to
+        # the end or closed
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+def _load() -> dict:
+    if not os.path.exists(STATS_FILE):
+        return {}
+    with open(STATS_FILE, "r", encoding="utf-8") as f:
+        return {sql: StatementStats.from_json(s) for sql, s in json.load(f).items()}
+
+
+def save_stats():
+    """Merge this process's statistics into STATS_FILE."""
+    with _lock:
+        current = dict(_stats)
+        _stats.clear()
+    if not current:
+        return
+
+    merged = _load()
+    for sql, stats in current.items():
+        total = merged.setdefault(sql, StatementStats())
+        total.count += stats.count
+        total.total += stats.total
+        total.rows += stats.rows
+        total.steps += stats.steps
+        total.histogram.merge(stats.histogram)
+
+    with open(STATS_FILE, "w", encoding="utf-8") as f:
+        json.dump({sql: s.to_json() for sql, s in merged.items()}, f)
+
+
+def statement_stats() -> dict:
+    """Statistics of this process so far, by normalized statement."""
+    with _lock:
+        return dict(_stats)
+
+
+def report(limit: int = 15, stats: dict = None):
+    stats = stats if stats is not None else _load()
+    if not stats:
+        print("[INFO] No SQL statistics recorded yet (run with --trace-sql).")
+        return
+
+    print(
+        f"{'total ms':>10} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'rows/exec':>9} {'steps/exec':>10}  statement"
+    )
+    ranked = sorted(stats.items(), key=lambda item: item[1].total, reverse=True)
+    for sql, s in ranked[:limit]:
+        p50, p95, p99 = (s.histogram.percentile(p) * 1000 for p in (50, 95, 99))
+        print(
+            f"{s.total * 1000:10.1f} {s.count:7} {p50:8.2f} {p95:8.2f} {p99:8.2f}"
+            f" {s.rows / s.count:9.1f} {s.steps / s.count:10.0f}  {sql[:90]}"
+        )
+
+
+def main():
+    # python -m db.tracing report [n] | reset
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+    if command == "report":
+        report(int(sys.argv[2]) if len(sys.argv) > 2 else 15)
+    elif command == "reset":
+        for path in (STATS_FILE, SLOW_QUERY_LOG):
+            if os.path.exists(path):
+                os.remove(path)
+        print("[INFO] SQL statistics and slow-query log removed.")
+    else:
+        print(f"[ERROR] Unknown command '{command}'.")
+
+
+if __name__ == "__main__":
+    main()
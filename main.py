@@ -1,16 +1,26 @@
 import sys
-from db.database import initialize_db
+from db import maintenance, tracing
+from db.database import close_connections, initialize_db
 from ui.main_menu import start_app
 from Utils.DummyDataScooter import insert_dummy_scooters
 
 
 def main():
+    if "--trace-sql" in sys.argv:
+        # Statement statistics: python -m db.tracing report
+        tracing.enable()
     try:
-        # initialize_db()
+        initialize_db()
+        # Reclaims free pages and refreshes statistics in the background
+        maintenance.start()
         # insert_dummy_scooters(100)
         start_app()
     except Exception as e:
         print("[FATAL ERROR]", str(e))
+    finally:
+        maintenance.stop()
+        # Lets SQLite fold the WAL back into the database file
+        close_connections()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+# tests/test_backup_restore.py
+#
+# Restoring a backup made before a key rotation: its values use a key that
+# is only kept in the retired key file. Each step runs in its own process
+# in a scratch directory, since the modules open the database and key file
+# relative to the working directory when they are imported.
+
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRELUDE = """
+import subprocess, sys, types
+import concurrent.futures.process
+from db.database import initialize_db
+import Utils.logger
+
+# auth.password reads keys through msvcrt, which only exists on Windows
+if "msvcrt" not in sys.modules and sys.platform != "win32":
+    sys.modules["msvcrt"] = types.ModuleType("msvcrt")
+
+import builtins
+from auth import login as auth_login
+
+
+def login(username, password):
+    builtins.input = lambda prompt="": username
+    auth_login.input_password_login = lambda prompt="": password
+    return auth_login.login()
+"""
+
+
+def run(cwd, script: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", PRELUDE + textwrap.dedent(script)],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": ROOT, "TERM": "dumb"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_restore_backup_from_before_key_rotation(tmp_path):
+    run(
+        tmp_path,
+        """
+        from Utils import keyRotation
+        from Utils.BackupService import BackupService
+
+        initialize_db()
+        name = BackupService.make_backup("super_admin")
+        open("backup_name", "w").write(name)
+
+        assert keyRotation.start_rotation()
+        keyRotation.run_rotation(max_rows_per_second=None)
+        assert keyRotation.finish_rotation()
+        """,
+    )
+    assert os.path.exists(tmp_path / "encryption.key.retired")
+
+    run(
+        tmp_path,
+        """
+        from Utils.BackupService import BackupService
+
+        initialize_db()
+        assert BackupService.restore_backup_superadmin(open("backup_name").read())
+        user = login("super_admin", "Admin_123?")
+        assert user is not None and user.role == "super_administrator", user
+        """,
+    )
+
+    # The restore re-encrypted everything under the current key, so the
+    # retired key is no longer needed to log in
+    os.remove(tmp_path / "encryption.key.retired")
+    run(
+        tmp_path,
+        """
+        user = login("super_admin", "Admin_123?")
+        assert user is not None and user.role == "super_administrator", user
+        """,
+    )
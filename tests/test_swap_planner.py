@@ -0,0 +1,27 @@
+# tests/test_swap_planner.py
+
+import numpy as np
+
+from Utils import swapPlanner
+
+
+def test_cluster_caps_duplicate_points():
+    # k-means cannot split points at one spot: 1995 of 2000 are identical
+    points = np.zeros((2000, 2))
+    points[:5] = np.random.default_rng(0).random((5, 2)) * 10
+    labels = swapPlanner.cluster(points, max_stops=40)
+    sizes = np.bincount(labels)
+    assert sizes.max() <= 40
+    assert sizes.sum() == len(points)
+
+
+def test_cluster_caps_spread_points():
+    points = np.random.default_rng(1).random((5000, 2)) * 50
+    labels = swapPlanner.cluster(points, max_stops=25)
+    assert np.bincount(labels).max() <= 25
+
+
+def test_order_stops_visits_every_stop_once():
+    points = np.zeros((40, 2))
+    order = swapPlanner.order_stops(points)
+    assert sorted(order.tolist()) == list(range(40))
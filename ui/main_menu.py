@@ -1,31 +1,51 @@
 # ui/main_menu.py
 
 from auth.login import login
+from db import functions
+from db.pagination import browse
 from Models.user import User
 from Models.scooter import Scooter, manage_scooter
 from Models.traveler import manage_traveller
+from Utils import dictionary, fleetAnalytics
 from Utils.logger import Logger
+from Utils.encryption import Encryptor
 from ui.terminal import clear_terminal
 from Utils.BackupService import backup_menu, system_admin_backup_menu
 
 logger = Logger()
 
 
+def view_logs():
+    def show_page(logs):
+        for timestamp, username, description, extra, suspicious, status in logs:
+            print(
+                f"[{timestamp}] {username} | {description} | {extra} | Suspicious: {suspicious} | {status}"
+            )
+
+    if not browse(logger.read_log_page, show_page):
+        print("No logs found.")
+    logger.mark_as_read()
+
+
 def start_app():
     user = login()
     if not user:
         print("Login failed. Exiting application.")
         return
 
-    if user.role == "super_administrator":
-        superAdmin(user)
-        return
-    elif user.role == "system_administrator":
-        systemAdmin(user)
-        return
-    elif user.role == "service_engineer":
-        serviceEngineer(user)
-        return
+    try:
+        if user.role == "super_administrator":
+            superAdmin(user)
+        elif user.role == "system_administrator":
+            systemAdmin(user)
+        elif user.role == "service_engineer":
+            serviceEngineer(user)
+    finally:
+        # Session is over: drop every decrypted value kept in memory
+        Encryptor().clear_cache()
+        functions.clear()
+        dictionary.clear()
+        fleetAnalytics.clear()
 
 
 def serviceEngineer(user: User):
@@ -87,16 +107,7 @@ def systemAdmin(user: User):
 
         elif choice == "6":
             clear_terminal()
-            logs = logger.read_logs()
-            if not logs:
-                print("No logs found.")
-            else:
-                for log in logs:
-                    timestamp, username, description, extra, suspicious, status = log
-                    print(
-                        f"[{timestamp}] {username} | {description} | {extra} | Suspicious: {suspicious} | {status}"
-                    )
-            logger.mark_as_read()
+            view_logs()
 
         elif choice == "7":
             clear_terminal()
@@ -139,16 +150,7 @@ def superAdmin(user: User):
             manage_scooter()
         elif choice == "5":
             clear_terminal()
-            logs = logger.read_logs()
-            if not logs:
-                print("No logs found.")
-            else:
-                for log in logs:
-                    timestamp, username, description, extra, suspicious, status = log
-                    print(
-                        f"[{timestamp}] {username} | {description} | {extra} | Suspicious: {suspicious} | {status}"
-                    )
-            logger.mark_as_read()
+            view_logs()
         elif choice == "6":
             clear_terminal()
             backup_menu(user)